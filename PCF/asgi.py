@@ -3,6 +3,10 @@ ASGI config for PCF project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with e.g. ``uvicorn PCF.asgi:application --workers 3``. It turns on
+``ASYNC_VIEWS``, so the donation order and the public lists run as async
+views; set ``DJANGO_ASYNC_VIEWS=0`` to keep the sync ones.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -12,5 +16,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'PCF.settings')
+os.environ.setdefault('DJANGO_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
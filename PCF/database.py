@@ -0,0 +1,76 @@
+# PCF/database.py
+"""
+Database profiles, picked with the ``DB_PROFILE`` environment variable.
+
+``sqlite`` (default)
+    The bundled ``db.sqlite3`` (``SQLITE_PATH`` overrides it). Tuning pragmas
+    are applied per connection from ``settings.SQLITE_PRAGMAS``.
+``mysql``
+    ``DB_NAME``, ``DB_USER``, ``DB_PASSWORD``, ``DB_HOST``, ``DB_PORT`` via
+    mysql-connector. Setting ``DB_REPLICA_HOST`` adds a ``replica`` alias that
+    ``foundation_app.routers.PrimaryReplicaRouter`` sends reads to.
+
+Both keep connections open for ``DB_CONN_MAX_AGE`` seconds (default 60) and
+health-check them before reuse. With async views (``DJANGO_ASYNC_VIEWS=1``)
+the default is 0: their queries run in short-lived executor threads, and a
+persistent connection per thread would only pile up unused connections.
+"""
+import os
+
+REPLICA_ALIAS = 'replica'
+
+
+def _common():
+    return {
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0 if os.environ.get('DJANGO_ASYNC_VIEWS') == '1' else 60)),
+        'CONN_HEALTH_CHECKS': True,
+    }
+
+
+def sqlite_profile(base_dir):
+    return {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('SQLITE_PATH', base_dir / 'db.sqlite3'),
+            'OPTIONS': {
+                # Seconds to wait for the write lock instead of failing with "database is locked".
+                'timeout': 20,
+                # Take the write lock when a transaction starts, so two transactions
+                # can't both read and then deadlock upgrading to write.
+                'transaction_mode': 'IMMEDIATE',
+            },
+            **_common(),
+        }
+    }
+
+
+def mysql_profile():
+    primary = {
+        'ENGINE': 'mysql.connector.django',
+        'NAME': os.environ.get('DB_NAME', 'pcf'),
+        'USER': os.environ.get('DB_USER', ''),
+        'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+        'HOST': os.environ.get('DB_HOST', 'localhost'),
+        'PORT': os.environ.get('DB_PORT', '3306'),
+        'OPTIONS': {'charset': 'utf8mb4'},
+        **_common(),
+    }
+    databases = {'default': primary}
+    if os.environ.get('DB_REPLICA_HOST'):
+        databases[REPLICA_ALIAS] = {
+            **primary,
+            'HOST': os.environ['DB_REPLICA_HOST'],
+            'PORT': os.environ.get('DB_REPLICA_PORT', primary['PORT']),
+            # Tests run against the primary only.
+            'TEST': {'MIRROR': 'default'},
+        }
+    return databases
+
+
+def database_settings(base_dir):
+    profile = os.environ.get('DB_PROFILE', 'sqlite')
+    if profile == 'sqlite':
+        return sqlite_profile(base_dir)
+    if profile == 'mysql':
+        return mysql_profile()
+    raise ValueError(f"Unknown DB_PROFILE {profile!r}; expected 'sqlite' or 'mysql'.")
@@ -1,7 +1,10 @@
 
 
+from datetime import timedelta
 from pathlib import Path
 import os
+
+from .database import database_settings
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -47,17 +50,135 @@ STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
 MIDDLEWARE = [
+    'foundation_app.middleware.PerformanceTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'foundation_app.middleware.DualModeWhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'foundation_app.middleware.StaticSiteMiddleware',
+    'foundation_app.middleware.ReplicaPinningMiddleware',
 ]
 
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# Django 5 reads only STORAGES; the DEFAULT_FILE_STORAGE and
+# STATICFILES_STORAGE settings are ignored. Media stays on the filesystem, one
+# copy per distinct file (named by SHA-256, reference-counted); run
+# `manage.py dedupe_media` once to convert files stored before.
+STORAGES = {
+    "default": {"BACKEND": "foundation_app.storage.ContentAddressedStorage"},
+    # WhiteNoise's compressed manifest storage, plus optimised images and AVIF/WebP variants.
+    "staticfiles": {"BACKEND": "foundation_app.storage.OptimizedImageStaticStorage"},
+}
+# ------------------------------------------------ #
+
+# ---------------- Static pictures ---------------- #
+# collectstatic resizes static JPEG/PNG files to these widths as AVIF and WebP
+# for {% static_picture %}. Results are cached by content hash, so only new or
+# changed images are processed.
+STATIC_PICTURE_WIDTHS = (480, 960, 1600)
+STATIC_PICTURE_QUALITY = {"avif": 55, "webp": 80}
+STATIC_PICTURE_CACHE_DIR = os.path.join(BASE_DIR, 'var', 'static-pictures')
+STATIC_PICTURE_WORKERS = None  # process pool size; None means one per CPU
+# ------------------------------------------------ #
+
+# ---------------- Caching ---------------- #
+# Local memory is per process, so with several workers an admin edit only
+# invalidates the worker that handled it. Set REDIS_URL (needs the `redis`
+# package) to share the cache between workers.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        },
+        'sessions': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+            'KEY_PREFIX': 'sessions',
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'pcf-default',
+            # Holds the anonymous page cache and its stamps; Django's default of 300 entries
+            # is too few to keep every public list page warm.
+            'OPTIONS': {'MAX_ENTRIES': 2000},
+        },
+        # Sessions must look the same to every worker, so never local memory.
+        'sessions': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.path.join(BASE_DIR, 'var', 'cache', 'sessions'),
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        },
+    }
+
+# Anonymous page cache, see foundation_app/response_cache.py
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = 60 * 10
+# ------------------------------------------------ #
+
+# ---------------- Sessions ---------------- #
+# Database-backed sessions read through the shared "sessions" cache and a
+# per-process LRU; see foundation_app/sessions.py.
+SESSION_ENGINE = 'foundation_app.sessions'
+SESSION_CACHE_ALIAS = 'sessions'
+SESSION_LOCAL_CACHE_SIZE = 1000
+SESSION_LOCAL_CACHE_TIMEOUT = 2  # seconds; also how long a logout takes to reach other workers
+SESSION_RENEW_AFTER = 60 * 60 * 24  # rewrite an unchanged session's expiry at most daily
+SESSION_CLEANUP_PROBABILITY = 0.01  # share of session writes followed by a cleanup batch
+SESSION_CLEANUP_BATCH = 500
+# ------------------------------------------------ #
+
+# ---------------- Responsive images ---------------- #
+# Widths (px) generated for uploaded images, see foundation_app/imaging.py
+RESPONSIVE_IMAGE_WIDTHS = (320, 640, 960, 1280)
+RESPONSIVE_IMAGE_QUALITY = 80
+# ------------------------------------------------ #
+
+# ---------------- Media serving ---------------- #
+# Uploads are served by foundation_app.media_serving with Range support.
+# Behind nginx set MEDIA_ACCEL=x-accel-redirect and map MEDIA_ACCEL_PREFIX to
+# MEDIA_ROOT in an `internal` location; x-sendfile is for Apache/lighttpd.
+MEDIA_ACCEL = os.environ.get("MEDIA_ACCEL", "")
+MEDIA_ACCEL_PREFIX = "/protected-media/"
+# Names without a content hash may be replaced, so they are only cached briefly.
+MEDIA_CACHE_MAX_AGE = 60 * 60
+# ------------------------------------------------ #
+
+# ---------------- Chunked uploads ---------------- #
+# Large admin files (review videos, scans) are uploaded in resumable chunks,
+# see foundation_app/uploads.py. Keep the directory on the same filesystem
+# as MEDIA_ROOT so finished files are moved into place, not copied.
+CHUNKED_UPLOAD_DIR = os.environ.get("CHUNKED_UPLOAD_DIR", str(BASE_DIR / "var" / "uploads"))
+CHUNKED_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+CHUNKED_UPLOAD_MAX_SIZE = 4 * 1024 ** 3
+CHUNKED_UPLOAD_EXPIRY = timedelta(hours=24)  # unfinished sessions are removed by clear_upload_sessions
+# Finished files are hashed once in a background thread for content-addressed
+# storage; False hashes them inline, in the request that sends the last chunk.
+CHUNKED_UPLOAD_HASH_ASYNC = True
+# ------------------------------------------------ #
+
+# ---------------- Static site export ---------------- #
+# `manage.py build_static_site` writes the public pages here (e.g. var/site)
+# and StaticSiteMiddleware or the proxy serves them to anonymous visitors,
+# see foundation_app/static_site.py. Empty disables the export.
+STATIC_SITE_ROOT = os.environ.get("STATIC_SITE_ROOT", "")
+# Host the pages are rendered for; it must be in ALLOWED_HOSTS.
+STATIC_SITE_HOST = os.environ.get("STATIC_SITE_HOST", "www.puranchandfoundation.org")
+# ------------------------------------------------ #
+
+# ---------------- Video embeds ---------------- #
+# Class fetching title, thumbnail and duration for saved videos, see
+# foundation_app/video_embeds.py. Fetches run in a background thread after
+# the save commits; VIDEO_METADATA_ASYNC = False runs them inline.
+VIDEO_METADATA_FETCHER = 'foundation_app.video_embeds.OEmbedFetcher'
+VIDEO_METADATA_TIMEOUT = (3.05, 5)  # (connect, read) seconds
+VIDEO_METADATA_ASYNC = True
 # ------------------------------------------------ #
 
 
@@ -66,7 +187,7 @@ ROOT_URLCONF = 'PCF.urls'
 # foundation_project/settings.py
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'foundation_app.timing.TimedDjangoTemplates',  # DjangoTemplates + render timing
         'DIRS': [BASE_DIR / "templates"],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -87,11 +208,21 @@ WSGI_APPLICATION = 'PCF.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+# Profile picked with DB_PROFILE (sqlite/mysql), see PCF/database.py
+DATABASES = database_settings(BASE_DIR)
+
+DATABASE_ROUTERS = ['foundation_app.routers.PrimaryReplicaRouter']
+REPLICA_DATABASE_ALIAS = 'replica'
+# How long a client that just wrote keeps reading from the primary
+REPLICA_PIN_SECONDS = 5
+
+# Applied to every new SQLite connection (foundation_app.signals)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',        # readers no longer block on the writer
+    'synchronous': 'NORMAL',      # safe with WAL; fsync at checkpoints only
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -32000,         # in KiB, per connection
+    'temp_store': 'MEMORY',
 }
 
 
@@ -128,9 +259,98 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-# Razorpay credentials
-RAZORPAY_KEY_ID = "rzp_live_RHnSL3uXGp6LQi"
-RAZORPAY_KEY_SECRET = "L57ESuS8DQT4Xb0xXaHHioP2"
+# ---------------- Razorpay ---------------- #
+# Orders were always created with the test key pair, so it stays the default;
+# set the environment variables for live payments. Checkout must use the same
+# key id as the order, so both come from here.
+RAZORPAY_KEY_ID = os.environ.get("RAZORPAY_KEY_ID", "rzp_test_RCeQhXtvZuW3nm")
+RAZORPAY_KEY_SECRET = os.environ.get("RAZORPAY_KEY_SECRET", "8WhtWulOvpImkKNmRM0829Ym")
+# e.g. http://127.0.0.1:8765 for `manage.py run_razorpay_stub`
+RAZORPAY_API_BASE_URL = os.environ.get("RAZORPAY_API_BASE_URL") or None
+# (connect, read) seconds for every API call
+RAZORPAY_TIMEOUT = (3.05, 10)
+# Retries for idempotent calls (fetches) and for connects that never got through
+RAZORPAY_MAX_RETRIES = 2
+# Keep-alive connections per process
+RAZORPAY_POOL_SIZE = 10
+# Open the circuit after this many consecutive failures, try again after RESET seconds
+RAZORPAY_CIRCUIT_FAILURES = 5
+RAZORPAY_CIRCUIT_RESET = 30
+# Secret configured for the webhook in the Razorpay dashboard; the endpoint refuses events without it
+RAZORPAY_WEBHOOK_SECRET = os.environ.get("RAZORPAY_WEBHOOK_SECRET", "")
+# Times an event whose handler raises is retried before it is left with its error.
+PAYMENT_WEBHOOK_MAX_ATTEMPTS = 5
+# Seconds before the first retry of such an event; each further retry waits twice as long.
+PAYMENT_WEBHOOK_RETRY_DELAY = 60
+# ------------------------------------------------ #
+
+# Number of counter rows per campaign total, see foundation_app/donations.py
+CAMPAIGN_TOTAL_SHARDS = 8
+
+# ---------------- Submission write-behind ---------------- #
+# Queue contact/volunteer forms on local disk and insert them in batches,
+# see foundation_app/submissions.py. Off by default; each server needs its
+# own spool directory on a persistent local disk.
+SUBMISSION_WRITE_BEHIND = os.environ.get("SUBMISSION_WRITE_BEHIND", "") == "1"
+SUBMISSION_SPOOL_DIR = os.environ.get("SUBMISSION_SPOOL_DIR", str(BASE_DIR / "var" / "submissions"))
+SUBMISSION_FLUSH_INTERVAL = 2.0  # longest a queued submission waits, in seconds
+SUBMISSION_FLUSH_BATCH = 500
+# ------------------------------------------------ #
+
+# ---------------- Startup ---------------- #
+# Imported in the gunicorn master before workers fork (PCF/startup.py) so
+# workers share them; the app itself imports these lazily, on first use.
+STARTUP_PRELOAD_MODULES = (
+    'foundation_app.views',
+    'razorpay',
+    'numpy',
+)
+# Apps whose templates are compiled before the first request.
+STARTUP_TEMPLATE_APPS = ('foundation_app',)
+# ------------------------------------------------ #
+
+# ---------------- ASGI ---------------- #
+# Route the donation order and the public lists to foundation_app/async_views.py.
+# PCF/asgi.py turns this on; under WSGI the sync views are faster.
+ASYNC_VIEWS = os.environ.get("DJANGO_ASYNC_VIEWS", "0") == "1"
+# ------------------------------------------------ #
+
+# ---------------- Performance timing ---------------- #
+# Sampled requests get a JSON line on the foundation_app.perf logger; slower
+# ones are always logged at WARNING.
+PERF_TIMING_SAMPLE_RATE = float(os.environ.get("PERF_TIMING_SAMPLE_RATE", "0.05"))
+PERF_SLOW_REQUEST_MS = int(os.environ.get("PERF_SLOW_REQUEST_MS", "500"))
+# Who gets the Server-Timing header on sampled requests: "staff" (everyone
+# when DEBUG is on), "all" (e.g. for benchmark_urls against a test server) or "off".
+PERF_SERVER_TIMING_HEADER = os.environ.get("PERF_SERVER_TIMING_HEADER", "staff")
+# Outbound hosts (suffix match) reported under their own Server-Timing entry; others are "http".
+PERF_EXTERNAL_HOSTS = {
+    "cloudinary.com": "cloudinary",
+    "razorpay.com": "razorpay",
+}
+# Every logged request goes to PERF_LOG_FILE as JSON lines; without it only
+# slow requests are logged, to stderr.
+PERF_LOG_FILE = os.environ.get("PERF_LOG_FILE", "")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "message": {"format": "%(message)s"},
+    },
+    "handlers": {
+        "perf": (
+            {"class": "logging.handlers.WatchedFileHandler", "filename": PERF_LOG_FILE, "formatter": "message"}
+            if PERF_LOG_FILE else
+            {"class": "logging.StreamHandler", "formatter": "message", "level": "WARNING"}
+        ),
+    },
+    "loggers": {
+        "foundation_app.perf": {"handlers": ["perf"], "level": "INFO", "propagate": False},
+    },
+}
+# ------------------------------------------------ #
+
 # Redirects for login/logout
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/dashboard/'   # after successful login
@@ -0,0 +1,105 @@
+# PCF/startup.py
+"""
+Work done once before gunicorn forks its workers (see ``gunicorn.conf.py``).
+
+With ``preload_app`` the master imports the project, compiles every
+foundation_app template into the cached loader, fills the URL resolver and
+imports the optional dependencies a request would otherwise pull in
+(``STARTUP_PRELOAD_MODULES``). :func:`freeze` then moves all of it into the
+garbage collector's permanent generation: collections in the workers never
+touch those objects, so their reference counts and GC headers aren't written
+to and the pages stay shared copy-on-write between workers instead of being
+copied into each one.
+"""
+import gc
+import importlib
+import logging
+import os
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.template import TemplateSyntaxError, engines
+from django.urls import NoReverseMatch, get_resolver, reverse
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_SUFFIXES = ('.html', '.txt', '.xml')
+
+
+def import_modules():
+    count = 0
+    for name in getattr(settings, 'STARTUP_PRELOAD_MODULES', ()):
+        try:
+            importlib.import_module(name)
+        except ImportError as exc:
+            logger.warning("Could not preload %s: %s", name, exc)
+        else:
+            count += 1
+    return count
+
+
+def _template_dirs(engine):
+    labels = getattr(settings, 'STARTUP_TEMPLATE_APPS', ('foundation_app',))
+    dirs = [str(d) for d in engine.dirs]
+    dirs += [os.path.join(config.path, 'templates') for config in apps.get_app_configs() if config.label in labels]
+    return dirs
+
+
+def compile_templates():
+    """Load every template of the project and of STARTUP_TEMPLATE_APPS through the cached loader."""
+    count = 0
+    for engine in engines.all():
+        if not hasattr(engine, 'engine'):  # not a DjangoTemplates backend
+            continue
+        for directory in _template_dirs(engine):
+            for root, _, files in os.walk(directory):
+                for filename in sorted(files):
+                    if not filename.endswith(TEMPLATE_SUFFIXES):
+                        continue
+                    name = os.path.relpath(os.path.join(root, filename), directory).replace(os.sep, '/')
+                    try:
+                        engine.get_template(name)
+                    except TemplateSyntaxError as exc:
+                        logger.warning("Could not compile template %s: %s", name, exc)
+                    else:
+                        count += 1
+    return count
+
+
+def warm_urls():
+    """Build the resolver's lookup tables and reverse every URL that takes no arguments."""
+    resolver = get_resolver()
+    resolver.resolve('/')
+    count = 0
+    for namespace, (_, sub_resolver) in resolver.namespace_dict.items():
+        for name in sub_resolver.reverse_dict:
+            if not isinstance(name, str):
+                continue
+            try:
+                reverse(f'{namespace}:{name}')
+            except NoReverseMatch:
+                continue
+            count += 1
+    return count
+
+
+def warm_up():
+    """Do the per-process work a first request would otherwise pay for; returns timings in ms."""
+    timings = {}
+    for step, func in (('imports', import_modules), ('templates', compile_templates), ('urls', warm_urls)):
+        started = time.perf_counter()
+        count = func()
+        timings[step] = round((time.perf_counter() - started) * 1000, 1)
+        logger.info("Startup: %s (%d) in %.1f ms", step, count, timings[step])
+    # A connection opened while warming must not be shared with forked workers.
+    connections.close_all()
+    return timings
+
+
+def freeze():
+    """Collect once, then keep everything that exists now out of future collections."""
+    gc.collect()
+    gc.freeze()
+    logger.info("Startup: %d objects frozen", gc.get_freeze_count())
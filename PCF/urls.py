@@ -1,13 +1,19 @@
+import re
 
 from django.contrib.auth.views import LogoutView
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+
+from foundation_app.media_serving import serve_media
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('foundation_app.urls', namespace='foundation_app')),
 
     ]
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+# Uploads are served by Django (with Range support) unless MEDIA_URL points elsewhere.
+if settings.MEDIA_URL.startswith('/'):
+    urlpatterns += [
+        re_path(rf'^{re.escape(settings.MEDIA_URL.lstrip("/"))}(?P<path>.*)$', serve_media, name='media'),
+    ]
@@ -1,11 +1,23 @@
 from django.contrib import admin
-from .models import ContactMessage, Project, Volunteer, News, Podcast, Video, NewspaperCutting, EventPhoto, Review, Campaign
+from .pagination import EstimatedCountPaginator
+from .search import IndexedSearchAdminMixin
+from .uploads import ChunkedUploadAdminMixin
+from .models import ContactMessage, Project, Volunteer, News, Podcast, Video, NewspaperCutting, EventPhoto, Review, Campaign, Donation, PaymentWebhookEvent
+
+
+
+class FoundationModelAdmin(admin.ModelAdmin):
+    """Changelist defaults for tables that keep growing: no COUNT(*) over the whole table."""
+    paginator = EstimatedCountPaginator
+    # Skips the second, unfiltered count shown as "N results (M total)".
+    show_full_result_count = False
+
 
 # Register the models to be displayed in the Django admin site.
 
 # Admin class for the ContactMessage model
 @admin.register(ContactMessage)
-class ContactMessageAdmin(admin.ModelAdmin):
+class ContactMessageAdmin(IndexedSearchAdminMixin, FoundationModelAdmin):
     # Display these fields in the change list page
     list_display = ('name', 'email', 'subject', 'submitted_at')
     # Make these fields clickable to open the detail view
@@ -18,7 +30,7 @@ class ContactMessageAdmin(admin.ModelAdmin):
 
 # Admin class for the Project model
 @admin.register(Project)
-class ProjectAdmin(admin.ModelAdmin):
+class ProjectAdmin(IndexedSearchAdminMixin, FoundationModelAdmin):
     list_display = ('title', 'created_at', 'updated_at')
     list_display_links = ('title',)
     search_fields = ('title', 'description')
@@ -27,7 +39,7 @@ class ProjectAdmin(admin.ModelAdmin):
 
 # Admin class for the new Volunteer model
 @admin.register(Volunteer)
-class VolunteerAdmin(admin.ModelAdmin):
+class VolunteerAdmin(FoundationModelAdmin):
     list_display = ('full_name', 'email', 'phone', 'availability', 'created_at')
     search_fields = ('full_name', 'email', 'phone')
     list_filter = ('availability', 'created_at')
@@ -35,7 +47,7 @@ class VolunteerAdmin(admin.ModelAdmin):
 
 # Admin class for the News model
 @admin.register(News)
-class NewsAdmin(admin.ModelAdmin):
+class NewsAdmin(IndexedSearchAdminMixin, FoundationModelAdmin):
     list_display = ('title', 'slug')
     list_display_links = ('title',)
     # We prepopulate the slug from the title
@@ -43,19 +55,21 @@ class NewsAdmin(admin.ModelAdmin):
     search_fields = ('title', 'content')
 
 @admin.register(Podcast)
-class PodcastAdmin(admin.ModelAdmin):
+class PodcastAdmin(IndexedSearchAdminMixin, FoundationModelAdmin):
     list_display = ('title', 'created_at')
     search_fields = ('title', 'description')
 
 @admin.register(Video)
-class VideoAdmin(admin.ModelAdmin):
-    list_display = ('title', 'url', 'created_at')
+class VideoAdmin(IndexedSearchAdminMixin, FoundationModelAdmin):
+    list_display = ('title', 'url', 'provider', 'created_at')
     search_fields = ('title', 'url')
-    list_filter = ('created_at',)
+    list_filter = ('provider', 'created_at')
+    readonly_fields = ('provider', 'provider_video_id', 'embed_title', 'duration', 'metadata_fetched_at')
     date_hierarchy = 'created_at'
 
 @admin.register(NewspaperCutting)
-class NewspaperCuttingAdmin(admin.ModelAdmin):
+class NewspaperCuttingAdmin(ChunkedUploadAdminMixin, FoundationModelAdmin):
+    chunked_upload_fields = ('image',)
     list_display = ('title', 'created_at')
     search_fields = ('title',)
     list_filter = ('created_at',)
@@ -63,27 +77,49 @@ class NewspaperCuttingAdmin(admin.ModelAdmin):
 
 
 @admin.register(EventPhoto)
-class EventPhotoAdmin(admin.ModelAdmin):
+class EventPhotoAdmin(ChunkedUploadAdminMixin, FoundationModelAdmin):
+    chunked_upload_fields = ('image',)
     list_display = ('id', 'created_at')
     list_filter = ('created_at',)
     date_hierarchy = 'created_at'
 @admin.register(Review)
-class ReviewAdmin(admin.ModelAdmin):
+class ReviewAdmin(ChunkedUploadAdminMixin, IndexedSearchAdminMixin, FoundationModelAdmin):
+    chunked_upload_fields = ('video',)
     list_display = ("title", "created_at")
     search_fields = ("title",)
     list_filter = ("created_at",)
     date_hierarchy = "created_at"
 @admin.register(Campaign)
-class CampaignAdmin(admin.ModelAdmin):
+class CampaignAdmin(FoundationModelAdmin):
     list_display = ('title', 'goal_amount', 'created_by', 'created_at')
+    list_select_related = ('user',)
+    search_fields = ('title',)
+    autocomplete_fields = ('user',)
 
     def created_by(self, obj):
         return obj.user.username   # or obj.user.get_full_name()
-    created_by.admin_order_field = 'user'   # makes it sortable
+    created_by.admin_order_field = 'user__username'   # makes it sortable
     created_by.short_description = 'Created By'
-from django.contrib import admin
+
+@admin.register(Donation)
+class DonationAdmin(FoundationModelAdmin):
+    list_display = ('razorpay_order_id', 'amount', 'currency', 'status', 'campaign', 'created_at')
+    list_filter = ('status',)
+    list_select_related = ('campaign',)
+    search_fields = ('razorpay_order_id', 'razorpay_payment_id')
+    autocomplete_fields = ('campaign', 'user')
+    readonly_fields = ('razorpay_order_id', 'razorpay_payment_id', 'amount', 'currency', 'created_at', 'updated_at')
+
+
+@admin.register(PaymentWebhookEvent)
+class PaymentWebhookEventAdmin(FoundationModelAdmin):
+    list_display = ('event_id', 'event_type', 'received_at', 'processed_at', 'attempts')
+    list_filter = ('event_type',)
+    search_fields = ('event_id',)
+    readonly_fields = ('event_id', 'event_type', 'payload', 'received_at', 'processed_at', 'attempts', 'next_attempt_at', 'error')
 from .models import GalleryImage
 
 @admin.register(GalleryImage)
-class GalleryImageAdmin(admin.ModelAdmin):
+class GalleryImageAdmin(IndexedSearchAdminMixin, FoundationModelAdmin):
     list_display = ("title", "created_at")
+    search_fields = ("title", "description")
@@ -6,3 +6,7 @@ class FoundationAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'foundation_app' # <--- ENSURE THIS IS 'foundation_app'
     verbose_name = 'Foundation Application' # Optional: A more human-readable name for the admin
+
+    def ready(self):
+        from .signals import connect_signals
+        connect_signals()
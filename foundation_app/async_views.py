@@ -0,0 +1,109 @@
+# foundation_app/async_views.py
+"""
+Async versions of the views that spend their time waiting: the donation
+order (a call to Razorpay) and the paginated public lists (one page query
+each). ``urls.py`` routes to them when ``ASYNC_VIEWS`` is on, which
+``PCF/asgi.py`` does by default; under WSGI they would each run in their own
+event loop, so the sync views stay the default there.
+
+Everything else (forms, the dashboard, uploads) stays sync. Django runs those
+in its thread pool under ASGI, as it would any sync view.
+"""
+from asgiref.sync import sync_to_async
+from django.shortcuts import redirect
+from django.utils.decorators import method_decorator
+from django.views.generic import ListView
+
+from .donations import record_order
+from .models import Campaign, EventPhoto, News, NewspaperCutting, Podcast, Project, Review, Video
+from .pagination import AsyncKeysetListMixin
+from .payments import PaymentGatewayError, get_async_gateway
+from .response_cache import cache_anonymous_page
+from .versions import conditional_page
+from .views import (
+    DONATION_INVALID, DONATION_UNAVAILABLE, _donation_error, _donation_input, _donation_order, _donation_response,
+)
+
+
+async def make_donation(request):
+    """:func:`foundation_app.views.make_donation`, waiting on Razorpay without holding a thread."""
+    if request.method != "POST":
+        return redirect("foundation_app:dashboard")
+
+    wants_json = request.headers.get("X-Requested-With") == "XMLHttpRequest"
+    amount, campaign_id = _donation_input(request)
+    campaign = await Campaign.objects.filter(pk=campaign_id).afirst() if campaign_id.isdigit() else None
+    if amount <= 0 or (campaign_id and campaign is None):
+        return _donation_error(request, wants_json, DONATION_INVALID, 400)
+
+    gateway = get_async_gateway()
+    try:
+        payment = await gateway.create_order(_donation_order(amount, campaign))
+    except PaymentGatewayError:
+        return _donation_error(request, wants_json, DONATION_UNAVAILABLE, 503)
+    user = await request.auser()
+    await sync_to_async(record_order)(payment, amount, campaign=campaign, user=user)
+    return _donation_response(request, wants_json, gateway, payment)
+
+
+@method_decorator(conditional_page, name='dispatch')
+@method_decorator(cache_anonymous_page, name='dispatch')
+class NewsListView(AsyncKeysetListMixin, ListView):
+    model = News
+    paginate_by = 10
+    template_name = 'foundation_app/news_list.html'
+    context_object_name = 'news_list'
+
+
+@method_decorator(conditional_page, name='dispatch')
+@method_decorator(cache_anonymous_page, name='dispatch')
+class AllProjectsView(AsyncKeysetListMixin, ListView):
+    model = Project
+    paginate_by = 12
+    template_name = 'foundation_app/all_projects.html'
+    context_object_name = 'all_projects'
+
+
+@method_decorator(conditional_page, name='dispatch')
+@method_decorator(cache_anonymous_page, name='dispatch')
+class PodcastListView(AsyncKeysetListMixin, ListView):
+    model = Podcast
+    paginate_by = 12
+    template_name = "foundation_app/podcast_list.html"
+    context_object_name = "podcasts"
+
+
+@method_decorator(conditional_page, name='dispatch')
+@method_decorator(cache_anonymous_page, name='dispatch')
+class VideoListView(AsyncKeysetListMixin, ListView):
+    model = Video
+    paginate_by = 9
+    template_name = "foundation_app/video_list.html"
+    context_object_name = "videos"
+
+
+@method_decorator(conditional_page, name='dispatch')
+@method_decorator(cache_anonymous_page, name='dispatch')
+class NewspaperCuttingListView(AsyncKeysetListMixin, ListView):
+    model = NewspaperCutting
+    paginate_by = 18
+    template_name = "foundation_app/newspaper_cuttings.html"
+    context_object_name = "cuttings"
+
+
+@method_decorator(conditional_page, name='dispatch')
+@method_decorator(cache_anonymous_page, name='dispatch')
+class EventPhotoListView(AsyncKeysetListMixin, ListView):
+    model = EventPhoto
+    paginate_by = 24
+    template_name = "foundation_app/event_photos.html"
+    context_object_name = "photos"
+
+
+@method_decorator(conditional_page, name='dispatch')
+@method_decorator(cache_anonymous_page, name='dispatch')
+class ReviewListView(AsyncKeysetListMixin, ListView):
+    model = Review
+    paginate_by = 12
+    template_name = "foundation_app/review_list.html"
+    context_object_name = "reviews"
@@ -0,0 +1,260 @@
+# foundation_app/benchmark.py
+"""
+Latency benchmark for every named foundation_app route.
+
+Each route is requested concurrently either through Django's test client
+(in-process, with SQL query counts) or over HTTP against a running server
+such as gunicorn (``base_url``), where query counts come from the
+``Server-Timing`` header if the server sends one (``PERF_SERVER_TIMING_HEADER=all``
+and ``PERF_TIMING_SAMPLE_RATE=1``). Routes that redirect anonymous visitors to
+``LOGIN_URL`` are retried as a logged-in user. Results are plain dicts ready
+for JSON; ``compare_runs`` diffs two of them.
+"""
+import os
+import platform
+import re
+import statistics
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+from django.conf import settings
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+
+from . import urls as app_urls
+from .models import News, Project
+
+# Routes that only accept POST or change data, and staff-only endpoints (a GET
+# as a visitor or donor only measures the admin-login redirect).
+SKIP_ROUTES = {
+    'logout', 'make_donation', 'payment_success', 'payment_webhook', 'volunteer_submit',
+    'upload_session_create', 'upload_session_detail',
+}
+
+_SERVER_TIMING_QUERIES = re.compile(r'(?:^|,)\s*db;[^,]*desc="(\d+) queries"')
+
+# URL kwargs for parameterised routes: the newest row of the model is used.
+ROUTE_OBJECTS = {
+    'news_detail': News,
+    'project_detail': Project,
+}
+
+
+def named_routes(only=None):
+    """``[(name, path)]`` for every named GET route; routes with missing data are left out."""
+    routes = []
+    for pattern in app_urls.urlpatterns:
+        if not isinstance(pattern, URLPattern) or not pattern.name or pattern.name in SKIP_ROUTES:
+            continue
+        if only and pattern.name not in only:
+            continue
+        kwargs = {}
+        if pattern.pattern.converters:
+            model = ROUTE_OBJECTS.get(pattern.name)
+            pk = model._default_manager.values_list('pk', flat=True).first() if model else None
+            if pk is None:
+                continue
+            kwargs = {name: pk for name in pattern.pattern.converters}
+        routes.append((pattern.name, reverse(f'{app_urls.app_name}:{pattern.name}', kwargs=kwargs)))
+    return routes
+
+
+# Drivers -----------------------------------------------------------------------
+
+class TestClientDriver:
+    """In-process requests through the test client; one per thread."""
+
+    def __init__(self, host='localhost', user=None):
+        from django.test import Client
+
+        self.client = Client(HTTP_HOST=host, raise_request_exception=False)
+        if user is not None:
+            self.client.force_login(user)
+
+    def fetch(self, path):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = self.client.get(path)
+            body = b''.join(response) if response.streaming else response.content
+            elapsed = time.perf_counter() - started
+        return response.status_code, response.get('Location', ''), elapsed, len(body), len(queries)
+
+    def close(self):
+        connections.close_all()
+
+
+class HTTPDriver:
+    """Real HTTP against ``base_url`` with a keep-alive session; one per thread."""
+
+    def __init__(self, base_url, credentials=None):
+        import requests
+
+        self.base_url = base_url
+        self.session = requests.Session()
+        if credentials is not None:
+            self._login(*credentials)
+
+    def _login(self, username, password):
+        login_url = urljoin(self.base_url, settings.LOGIN_URL)
+        self.session.get(login_url, timeout=30)
+        response = self.session.post(login_url, data={
+            'username': username,
+            'password': password,
+            'csrfmiddlewaretoken': self.session.cookies.get('csrftoken', ''),
+        }, headers={'Referer': login_url}, allow_redirects=False, timeout=30)
+        if 'sessionid' not in self.session.cookies:
+            raise RuntimeError(f"Logging in as {username!r} failed (HTTP {response.status_code}).")
+
+    def fetch(self, path):
+        started = time.perf_counter()
+        response = self.session.get(urljoin(self.base_url, path), allow_redirects=False, timeout=60)
+        body = response.content
+        elapsed = time.perf_counter() - started
+        match = _SERVER_TIMING_QUERIES.search(response.headers.get('Server-Timing', ''))
+        queries = int(match.group(1)) if match else None
+        return response.status_code, response.headers.get('Location', ''), elapsed, len(body), queries
+
+    def close(self):
+        self.session.close()
+
+
+# Running -------------------------------------------------------------------------
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def _summarise(path, samples, wall_time, authenticated):
+    latencies = sorted(s[2] * 1000 for s in samples)
+    statuses = sorted({s[0] for s in samples})
+    queries = [s[4] for s in samples if s[4] is not None]
+    return {
+        'path': path,
+        'authenticated': authenticated,
+        'requests': len(samples),
+        'status': statuses,
+        'errors': sum(1 for s in samples if s[0] >= 500),
+        'p50_ms': round(_percentile(latencies, 0.50), 3),
+        'p95_ms': round(_percentile(latencies, 0.95), 3),
+        'p99_ms': round(_percentile(latencies, 0.99), 3),
+        'mean_ms': round(statistics.fmean(latencies), 3),
+        'rps': round(len(samples) / wall_time, 1) if wall_time else None,
+        'queries': max(queries) if queries else None,
+        'bytes': round(statistics.fmean(s[3] for s in samples)),
+    }
+
+
+def _redirects_to_login(sample):
+    status, location = sample[0], sample[1]
+    return status in (301, 302) and settings.LOGIN_URL in location
+
+
+def _run_route(path, make_driver, requests_per_route, concurrency, warmup):
+    def worker(count):
+        driver = make_driver()
+        try:
+            for _ in range(warmup):
+                driver.fetch(path)
+            return [driver.fetch(path) for _ in range(count)]
+        finally:
+            driver.close()
+
+    shares = [requests_per_route // concurrency + (1 if i < requests_per_route % concurrency else 0) for i in range(concurrency)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(worker, [share for share in shares if share]))
+    wall_time = time.perf_counter() - started
+    return [sample for samples in results for sample in samples], wall_time
+
+
+def run_benchmark(requests_per_route=50, concurrency=4, warmup=2, only=None, base_url=None,
+                  host='localhost', user=None, credentials=None, log=None):
+    """
+    Benchmark every route and return ``{"meta": {...}, "routes": {name: stats}}``.
+
+    ``user`` (test client) or ``credentials`` (HTTP) are used for routes that
+    require login.
+    """
+    if base_url:
+        def make_driver(authenticated):
+            return lambda: HTTPDriver(base_url, credentials if authenticated else None)
+    else:
+        def make_driver(authenticated):
+            return lambda: TestClientDriver(host, user if authenticated else None)
+
+    routes = {}
+    for name, path in named_routes(only):
+        probe = make_driver(False)()
+        try:
+            authenticated = _redirects_to_login(probe.fetch(path))
+        finally:
+            probe.close()
+        if authenticated and user is None and credentials is None:
+            if log:
+                log(f"skip {name}: needs login")
+            continue
+        samples, wall_time = _run_route(path, make_driver(authenticated), requests_per_route, concurrency, warmup)
+        routes[name] = _summarise(path, samples, wall_time, authenticated)
+        if log:
+            stats = routes[name]
+            log(f"{name:<22} p50 {stats['p50_ms']:>8.2f}ms  p95 {stats['p95_ms']:>8.2f}ms  "
+                f"{stats['rps'] or 0:>7.1f} req/s  queries {stats['queries']}")
+
+    return {'meta': _metadata(requests_per_route, concurrency, base_url), 'routes': routes}
+
+
+def _metadata(requests_per_route, concurrency, base_url):
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'commit': commit,
+        'mode': 'http' if base_url else 'test-client',
+        'base_url': base_url,
+        'requests_per_route': requests_per_route,
+        'concurrency': concurrency,
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+    }
+
+
+# Comparing -----------------------------------------------------------------------
+
+def compare_runs(baseline, current, threshold_pct=10.0, min_delta_ms=1.0, metric='p95_ms'):
+    """
+    Return ``(rows, regressions)``. A route regresses when ``metric`` grows by
+    more than ``threshold_pct`` percent *and* ``min_delta_ms`` (so sub-millisecond
+    noise doesn't fail a run), or when it issues more SQL queries.
+    """
+    rows, regressions = [], []
+    for name, now in current['routes'].items():
+        before = baseline['routes'].get(name)
+        if before is None:
+            rows.append((name, None, now[metric], None, 'new'))
+            continue
+        delta = now[metric] - before[metric]
+        change = (delta / before[metric] * 100) if before[metric] else 0.0
+        problems = []
+        if change > threshold_pct and delta > min_delta_ms:
+            problems.append(f'{metric} +{change:.0f}%')
+        if before.get('queries') is not None and now.get('queries') is not None and now['queries'] > before['queries']:
+            problems.append(f"queries {before['queries']}→{now['queries']}")
+        if now['errors'] > before['errors']:
+            problems.append(f"errors {before['errors']}→{now['errors']}")
+        rows.append((name, before[metric], now[metric], change, ', '.join(problems) or 'ok'))
+        if problems:
+            regressions.append(name)
+    for name in baseline['routes'].keys() - current['routes'].keys():
+        rows.append((name, baseline['routes'][name][metric], None, None, 'missing'))
+    return rows, regressions
@@ -0,0 +1,110 @@
+# foundation_app/donations.py
+"""
+Donation ledger and campaign totals.
+
+Confirmed donations are never added to ``Campaign.raised_amount`` directly.
+Each confirmation increments one of ``CAMPAIGN_TOTAL_SHARDS`` counter rows picked
+at random, so a burst of confirmations for the same campaign spreads over
+several rows instead of queueing on one. Reads sum the shards
+(``Campaign.objects.with_totals()``) and ``fold_campaign_totals`` moves shard
+amounts into ``raised_amount`` from time to time.
+"""
+import random
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Campaign, CampaignTotalShard, Donation
+
+
+def shard_count():
+    return getattr(settings, 'CAMPAIGN_TOTAL_SHARDS', 8)
+
+
+def add_to_campaign_total(campaign_id, amount):
+    """Add ``amount`` to a random shard of the campaign's total."""
+    shard = random.randrange(shard_count())
+    shards = CampaignTotalShard.objects.filter(campaign_id=campaign_id, shard=shard)
+    if shards.update(amount=F('amount') + amount):
+        return
+    try:
+        with transaction.atomic():
+            CampaignTotalShard.objects.create(campaign_id=campaign_id, shard=shard, amount=amount)
+    except IntegrityError:
+        # Another confirmation created the shard first.
+        shards.update(amount=F('amount') + amount)
+
+
+def record_order(order, amount, campaign=None, user=None):
+    """Create the ledger row for a freshly created Razorpay order."""
+    return Donation.objects.create(
+        razorpay_order_id=order['id'],
+        amount=Decimal(amount),
+        currency=order.get('currency', 'INR'),
+        campaign=campaign,
+        user=user if user is not None and user.is_authenticated else None,
+    )
+
+
+def capture_donation(order_id, payment_id):
+    """
+    Mark the donation for ``order_id`` as captured and count it towards its
+    campaign. Safe to call more than once for the same payment. A failed
+    donation can still be captured: checkout lets the donor retry a failed
+    attempt on the same order. Returns True if this call did the capture.
+    """
+    with transaction.atomic():
+        captured = Donation.objects.filter(
+            razorpay_order_id=order_id,
+            status__in=[Donation.STATUS_CREATED, Donation.STATUS_FAILED],
+        ).update(status=Donation.STATUS_CAPTURED, razorpay_payment_id=payment_id)
+        if not captured:
+            return False
+        donation = Donation.objects.only('campaign_id', 'amount').get(razorpay_order_id=order_id)
+        if donation.campaign_id:
+            add_to_campaign_total(donation.campaign_id, donation.amount)
+    return True
+
+
+def fail_donation(order_id, payment_id=None):
+    return bool(
+        Donation.objects.filter(razorpay_order_id=order_id, status=Donation.STATUS_CREATED).update(
+            status=Donation.STATUS_FAILED, razorpay_payment_id=payment_id
+        )
+    )
+
+
+def fold_campaign_totals():
+    """
+    Move shard amounts into ``Campaign.raised_amount``.
+
+    Each shard is decremented by the amount that was read rather than reset to
+    zero, so increments that land while folding are kept. Returns the number
+    of campaigns touched.
+    """
+    shards = list(CampaignTotalShard.objects.exclude(amount=0).values_list('pk', 'campaign_id', 'amount'))
+    totals = {}
+    for _, campaign_id, amount in shards:
+        totals[campaign_id] = totals.get(campaign_id, Decimal('0')) + amount
+
+    with transaction.atomic():
+        for pk, _, amount in shards:
+            CampaignTotalShard.objects.filter(pk=pk).update(amount=F('amount') - amount)
+        for campaign_id, total in totals.items():
+            Campaign.objects.filter(pk=campaign_id).update(raised_amount=F('raised_amount') + total)
+    return len(totals)
+
+
+def rebuild_campaign_totals():
+    """Recompute every campaign's ``raised_amount`` from captured donations in one UPDATE."""
+    captured = Donation.objects.filter(
+        campaign=OuterRef('pk'), status=Donation.STATUS_CAPTURED,
+    ).values('campaign').annotate(total=Sum('amount')).values('total')
+    with transaction.atomic():
+        CampaignTotalShard.objects.all().delete()
+        return Campaign.objects.update(
+            raised_amount=Coalesce(Subquery(captured), Value(Decimal('0')), output_field=DecimalField())
+        )
@@ -0,0 +1,169 @@
+# foundation_app/imaging.py
+"""
+Responsive image derivatives.
+
+Uploaded photos are re-encoded at a fixed set of widths in WebP and JPEG so the
+templates can hand the browser a ``srcset`` instead of the multi-megabyte
+original. The generated names are stored on the row in ``image_derivatives``.
+"""
+import io
+import logging
+import os
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Models whose ``image`` field gets derivatives (stored in ``image_derivatives``)
+RESPONSIVE_IMAGE_MODELS = (
+    'foundation_app.GalleryImage',
+    'foundation_app.EventPhoto',
+    'foundation_app.NewspaperCutting',
+    'foundation_app.Project',
+    'foundation_app.Review',
+)
+
+# (key in image_derivatives, Pillow format name, file extension)
+DERIVATIVE_FORMATS = (
+    ('webp', 'WEBP', 'webp'),
+    ('jpeg', 'JPEG', 'jpg'),
+)
+
+
+def derivative_widths():
+    return tuple(sorted(getattr(settings, 'RESPONSIVE_IMAGE_WIDTHS', (320, 640, 960, 1280))))
+
+
+def derivative_quality():
+    return getattr(settings, 'RESPONSIVE_IMAGE_QUALITY', 80)
+
+
+def responsive_image_models():
+    return [apps.get_model(label) for label in RESPONSIVE_IMAGE_MODELS]
+
+
+def _target_widths(original_width):
+    """Widths smaller than the original, plus the original itself when it is below the largest step."""
+    steps = derivative_widths()
+    widths = [w for w in steps if w < original_width]
+    if original_width <= steps[-1]:
+        widths.append(original_width)
+    return widths
+
+
+def _derivative_name(name, width, extension):
+    directory, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, 'derivatives', f'{stem}-{width}w.{extension}')
+
+
+def _encode(image, pillow_format):
+    if pillow_format == 'JPEG' and image.mode != 'RGB':
+        if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+            rgba = image.convert('RGBA')
+            background = Image.new('RGB', rgba.size, (255, 255, 255))
+            background.paste(rgba, mask=rgba.getchannel('A'))
+            image = background
+        else:
+            image = image.convert('RGB')
+    buffer = io.BytesIO()
+    options = {'quality': derivative_quality()}
+    if pillow_format == 'JPEG':
+        options.update(optimize=True, progressive=True)
+    else:
+        options.update(method=4)
+    image.save(buffer, pillow_format, **options)
+    return buffer.getvalue()
+
+
+def generate_derivatives(name, storage=None):
+    """
+    Build every width/format for the stored image ``name``.
+
+    Returns the dict that goes into ``image_derivatives``::
+
+        {"source": name, "width": 4000, "height": 3000,
+         "webp": [[320, "event_photos/derivatives/1-320w.webp"], ...],
+         "jpeg": [[320, "event_photos/derivatives/1-320w.jpg"], ...]}
+    """
+    storage = storage or default_storage
+    with storage.open(name, 'rb') as fh:
+        with Image.open(fh) as source:
+            image = ImageOps.exif_transpose(source)
+            image.load()
+
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+
+    width, height = image.size
+    derivatives = {'source': name, 'width': width, 'height': height}
+    for key, _, _ in DERIVATIVE_FORMATS:
+        derivatives[key] = []
+
+    # Work from the largest width down so each resize starts from a smaller image.
+    resized = image
+    for target in sorted(_target_widths(width), reverse=True):
+        if target != resized.width:
+            target_height = max(1, round(height * target / width))
+            resized = resized.resize((target, target_height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        for key, pillow_format, extension in DERIVATIVE_FORMATS:
+            saved_name = storage.save(
+                _derivative_name(name, target, extension),
+                ContentFile(_encode(resized, pillow_format)),
+            )
+            derivatives[key].append([target, saved_name])
+
+    for key, _, _ in DERIVATIVE_FORMATS:
+        derivatives[key].sort()
+    return derivatives
+
+
+def derivative_names(derivatives):
+    """Stored names listed in an ``image_derivatives`` dict ("source" is the original's, not listed)."""
+    return [name for key, _, _ in DERIVATIVE_FORMATS for _, name in (derivatives or {}).get(key, [])]
+
+
+def delete_derivatives(derivatives, storage=None):
+    """Remove the files listed in an ``image_derivatives`` dict."""
+    storage = storage or default_storage
+    for name in derivative_names(derivatives):
+        try:
+            storage.delete(name)
+        except OSError:
+            logger.warning("Could not delete image derivative %s", name)
+
+
+def rebuild_derivatives(name, previous=None):
+    """Drop the previous derivatives and generate fresh ones (used by the backfill workers)."""
+    delete_derivatives(previous)
+    return generate_derivatives(name)
+
+
+def refresh_instance_derivatives(instance, force=False):
+    """
+    Regenerate derivatives for ``instance`` when its image changed.
+
+    The result is written with a queryset ``update()`` so no further
+    ``post_save`` signal is sent.
+    """
+    name = instance.image.name if instance.image else ''
+    current = instance.image_derivatives or {}
+    if not force and current.get('source', '') == name:
+        return current
+
+    derivatives = {}
+    if name:
+        try:
+            derivatives = rebuild_derivatives(name, current)
+        except (OSError, Image.DecompressionBombError) as exc:
+            logger.warning("Could not build derivatives for %s: %s", name, exc)
+    else:
+        delete_derivatives(current)
+
+    type(instance)._default_manager.filter(pk=instance.pk).update(image_derivatives=derivatives)
+    instance.image_derivatives = derivatives
+    return derivatives
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image
+
+from foundation_app import placeholders, response_cache
+
+
+class Command(BaseCommand):
+    help = "Compute BlurHash, dominant colour and size for images stored before placeholders existed."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model', action='append', dest='models', default=[],
+            help="Limit to a model, e.g. --model GalleryImage (repeatable).",
+        )
+        parser.add_argument('--batch-size', type=int, default=200, help="Rows read and updated per batch.")
+        parser.add_argument('--force', action='store_true', help="Recompute rows that already have a placeholder.")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        models = placeholders.placeholder_models()
+        if options['models']:
+            wanted = {name.lower() for name in options['models']}
+            models = [m for m in models if m._meta.model_name in wanted]
+            if not models:
+                raise CommandError(f"No placeholder model matches {', '.join(options['models'])}.")
+
+        for model in models:
+            rows = model._default_manager.exclude(image='').exclude(image__isnull=True)
+            if not options['force']:
+                rows = rows.filter(image_blurhash='')
+            rows = rows.order_by('pk').only('pk', 'image', *placeholders.PLACEHOLDER_FIELDS)
+
+            done = failed = 0
+            last_pk = 0
+            while True:
+                batch = list(rows.filter(pk__gt=last_pk)[:options['batch_size']])
+                if not batch:
+                    break
+                last_pk = batch[-1].pk
+                for obj in batch:
+                    try:
+                        values = placeholders.placeholder_from_storage(obj.image.name)
+                    except (OSError, Image.DecompressionBombError) as exc:
+                        failed += 1
+                        self.stderr.write(f"{model._meta.label} #{obj.pk} ({obj.image.name}): {exc}")
+                        continue
+                    for field, value in values.items():
+                        setattr(obj, field, value)
+                    done += 1
+                model._default_manager.bulk_update(batch, placeholders.PLACEHOLDER_FIELDS)
+                self.stdout.write(f"{model._meta.label}: {done} done, {failed} failed so far")
+
+            if done:
+                response_cache.invalidate_model(model)
+            self.stdout.write(self.style.SUCCESS(f"{model._meta.label}: {done} placeholder(s), {failed} failed."))
@@ -0,0 +1,99 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from foundation_app import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark every named foundation_app route and print p50/p95/p99 latency, throughput, "
+        "SQL queries and response size as JSON. With --compare, diff two saved runs instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help="Measured requests per route.")
+        parser.add_argument('--concurrency', type=int, default=4, help="Parallel clients per route.")
+        parser.add_argument('--warmup', type=int, default=2, help="Unmeasured requests per client first.")
+        parser.add_argument('--route', action='append', dest='routes', default=[], help="Only this route name (repeatable).")
+        parser.add_argument(
+            '--base-url',
+            help="Benchmark a running server (e.g. http://127.0.0.1:8000) over HTTP instead of the test client. "
+                 "Query counts are read from the Server-Timing header when the server sends it.",
+        )
+        parser.add_argument('--host', default='localhost', help="Host header for the test client.")
+        parser.add_argument(
+            '--username',
+            help="Existing user for routes that need login; without it those routes are skipped.",
+        )
+        parser.add_argument('--password', help="Password for --username, required with --base-url.")
+        parser.add_argument('--output', help="Write the JSON report here instead of stdout.")
+        parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'), help="Diff two JSON reports.")
+        parser.add_argument('--threshold', type=float, default=10.0, help="Allowed slowdown in percent for --compare.")
+        parser.add_argument('--min-delta-ms', type=float, default=1.0, help="Ignore slowdowns smaller than this.")
+        parser.add_argument('--metric', default='p95_ms', choices=['p50_ms', 'p95_ms', 'p99_ms', 'mean_ms'])
+
+    def handle(self, *args, **options):
+        if options['compare']:
+            return self.compare(*options['compare'], options)
+        if options['concurrency'] < 1 or options['requests'] < 1:
+            raise CommandError("--requests and --concurrency must be at least 1.")
+
+        user = credentials = None
+        username = options['username']
+        if options['password'] and not username:
+            raise CommandError("--password needs --username.")
+        if options['base_url']:
+            if options['password']:
+                credentials = (username, options['password'])
+        elif username:
+            # Never create one: this runs against whatever database is configured.
+            User = get_user_model()
+            try:
+                user = User.objects.get_by_natural_key(username)
+            except User.DoesNotExist:
+                raise CommandError(f"No user named {username!r}; --username must name an existing account.")
+
+        report = benchmark.run_benchmark(
+            requests_per_route=options['requests'],
+            concurrency=options['concurrency'],
+            warmup=options['warmup'],
+            only=set(options['routes']) or None,
+            base_url=options['base_url'],
+            host=options['host'],
+            user=user,
+            credentials=credentials,
+            log=self.stderr.write,
+        )
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+            self.stderr.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+    def compare(self, baseline_path, current_path, options):
+        try:
+            with open(baseline_path) as handle:
+                baseline = json.load(handle)
+            with open(current_path) as handle:
+                current = json.load(handle)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Could not read reports: {exc}")
+
+        metric = options['metric']
+        rows, regressions = benchmark.compare_runs(
+            baseline, current, options['threshold'], options['min_delta_ms'], metric,
+        )
+        self.stdout.write(f"{'route':<22} {'before':>10} {'after':>10} {'change':>8}  {metric}")
+        for name, before, after, change, verdict in sorted(rows):
+            self.stdout.write(
+                f"{name:<22} {'-' if before is None else f'{before:.2f}':>10} "
+                f"{'-' if after is None else f'{after:.2f}':>10} "
+                f"{'-' if change is None else f'{change:+.1f}%':>8}  {verdict}"
+            )
+        if regressions:
+            raise CommandError(f"{len(regressions)} route(s) regressed: {', '.join(sorted(regressions))}")
+        self.stdout.write(self.style.SUCCESS("No regressions."))
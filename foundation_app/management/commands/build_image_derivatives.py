@@ -0,0 +1,64 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from foundation_app import imaging
+
+
+class Command(BaseCommand):
+    help = "Generate responsive WebP/JPEG derivatives for images that don't have them yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model', action='append', dest='models', default=[],
+            help="Limit to a model, e.g. --model EventPhoto (repeatable).",
+        )
+        parser.add_argument('--force', action='store_true', help="Rebuild even when derivatives are current.")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Size of the process pool.")
+
+    def handle(self, *args, **options):
+        models = imaging.responsive_image_models()
+        if options['models']:
+            wanted = {name.lower() for name in options['models']}
+            models = [m for m in models if m._meta.model_name in wanted]
+            if not models:
+                raise CommandError(f"No responsive image model matches {', '.join(options['models'])}.")
+
+        jobs = []
+        for model in models:
+            rows = model._default_manager.exclude(image='').exclude(image__isnull=True).only('pk', 'image', 'image_derivatives')
+            for obj in rows.iterator():
+                derivatives = obj.image_derivatives or {}
+                if options['force'] or derivatives.get('source') != obj.image.name:
+                    jobs.append((model._meta.label, obj.pk, obj.image.name, derivatives))
+
+        if not jobs:
+            self.stdout.write("All derivatives are up to date.")
+            return
+
+        self.stdout.write(f"Building derivatives for {len(jobs)} image(s) with {options['workers']} worker(s)...")
+        # Forked workers must not share the parent's database connections.
+        connections.close_all()
+
+        built = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup) as pool:
+            futures = {
+                pool.submit(imaging.rebuild_derivatives, name, previous): (label, pk, name)
+                for label, pk, name, previous in jobs
+            }
+            for future in as_completed(futures):
+                label, pk, name = futures[future]
+                try:
+                    derivatives = future.result()
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f"{label} #{pk} ({name}): {exc}")
+                    continue
+                apps.get_model(label)._default_manager.filter(pk=pk).update(image_derivatives=derivatives)
+                built += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Built derivatives for {built} image(s), {failed} failed."))
@@ -0,0 +1,50 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from foundation_app import static_site
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the public pages to STATIC_SITE_ROOT as <path>/index.html. Only pages that are new "
+        "or that show a model changed since they were rendered are built, unless --all is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Render every page, not just stale ones.")
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help="Processes rendering in parallel (default: one per CPU).",
+        )
+        parser.add_argument('--batch-size', type=int, default=500, help="Pages recorded as rendered per transaction.")
+
+    def handle(self, *args, **options):
+        if not static_site.enabled():
+            raise CommandError("Set STATIC_SITE_ROOT to the directory the pages are written to.")
+        if options['workers'] < 1 or options['batch_size'] < 1:
+            raise CommandError("--workers and --batch-size must be at least 1.")
+
+        pages = static_site.sync_pages()
+        paths = sorted(pages) if options['all'] else static_site.stale_paths()
+        self.stdout.write(f"{len(pages):,} page(s), {len(paths):,} to render with {options['workers']} worker(s).")
+
+        started = time.perf_counter()
+        results, counts = [], {}
+        for result in static_site.render_pages(paths, workers=options['workers']):
+            path, status, _ = result
+            counts[status] = counts.get(status, 0) + 1
+            if status not in (200, 404):
+                self.stderr.write(f"{path}: HTTP {status}, left stale")
+            results.append(result)
+            if len(results) >= options['batch_size']:
+                static_site.record_results(results)
+                results = []
+        static_site.record_results(results)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Rendered {counts.get(200, 0):,} page(s) in {elapsed:.1f}s; "
+            f"removed {counts.get(404, 0):,} gone, {len(paths) - counts.get(200, 0) - counts.get(404, 0):,} failed."
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from foundation_app import uploads
+
+
+class Command(BaseCommand):
+    help = "Delete chunked upload sessions (and their partial files) untouched for CHUNKED_UPLOAD_EXPIRY."
+
+    def handle(self, *args, **options):
+        deleted = uploads.clear_expired_sessions()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired upload session(s)."))
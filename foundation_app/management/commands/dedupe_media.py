@@ -0,0 +1,123 @@
+import hashlib
+import os
+import shutil
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from foundation_app import imaging, response_cache, storage
+
+
+class Command(BaseCommand):
+    help = (
+        "Move media stored before content addressing into blobs/, one file per distinct content, "
+        "point every file field and image_derivatives entry at the blob, and recount references."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report what would be merged without changing anything.")
+        parser.add_argument('--batch-size', type=int, default=500, help="Rows updated per query.")
+        parser.add_argument(
+            '--prune', action='store_true',
+            help="Also delete blobs nothing refers to any more (otherwise they are only listed).",
+        )
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, storage.ContentAddressedStorage):
+            raise CommandError("The default storage isn't foundation_app.storage.ContentAddressedStorage.")
+
+        counts = storage.referenced_names()
+        legacy = sorted(name for name in counts if not storage.is_blob_name(name))
+        self.stdout.write(f"{len(counts):,} stored name(s) referenced, {len(legacy):,} not content-addressed yet.")
+
+        mapping, blobs, missing, saved = {}, set(), 0, 0
+        for name in legacy:
+            path = default_storage.path(name)
+            try:
+                digest = self.file_digest(path)
+            except FileNotFoundError:
+                missing += 1
+                self.stderr.write(f"Missing: {name}")
+                continue
+            blob = storage.blob_name(digest, name)
+            blob_path = default_storage.path(blob)
+            if os.path.exists(blob_path) or blob in blobs:
+                saved += os.path.getsize(path)
+            elif not options['dry_run']:
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                try:
+                    os.link(path, blob_path)  # same inode: nothing is copied, and the old name keeps working
+                except OSError:
+                    shutil.copy2(path, blob_path)
+            mapping[name] = blob
+            blobs.add(blob)
+
+        distinct = len(blobs)
+        self.stdout.write(
+            f"{len(mapping):,} file(s) map to {distinct:,} blob(s); {saved / 1024 ** 2:,.1f} MiB of duplicates"
+            f"{' would be' if options['dry_run'] else ''} freed. {missing:,} missing."
+        )
+        if options['dry_run']:
+            return
+
+        self.rewrite_references(mapping, options['batch_size'])
+        # Only now that no row refers to them can the old names go.
+        for name in mapping:
+            try:
+                os.remove(default_storage.path(name))
+            except FileNotFoundError:
+                pass
+
+        orphans = storage.recount_blobs()
+        if orphans and options['prune']:
+            for name in orphans:
+                default_storage.delete(name)
+            self.stdout.write(f"Deleted {len(orphans):,} unreferenced blob(s).")
+        elif orphans:
+            self.stdout.write(f"{len(orphans):,} blob(s) have no references; --prune deletes them.")
+        response_cache.invalidate_all()
+        self.stdout.write(self.style.SUCCESS("Reference counts rebuilt."))
+
+    @staticmethod
+    def file_digest(path):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as fh:
+            for block in iter(lambda: fh.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def rewrite_references(self, mapping, batch_size):
+        for model, fields in storage.content_addressed_fields():
+            columns = [field.attname for field in fields]
+            has_derivatives = any(field.name == 'image_derivatives' for field in model._meta.concrete_fields)
+            update_fields = columns + (['image_derivatives'] if has_derivatives else [])
+            changed = []
+            for obj in model._default_manager.only('pk', *update_fields).order_by('pk').iterator(chunk_size=2000):
+                dirty = False
+                for column in columns:
+                    name = getattr(obj, column).name
+                    if name in mapping:
+                        setattr(obj, column, mapping[name])
+                        dirty = True
+                if has_derivatives and obj.image_derivatives:
+                    derivatives = self.remap_derivatives(obj.image_derivatives, mapping)
+                    if derivatives != obj.image_derivatives:
+                        obj.image_derivatives = derivatives
+                        dirty = True
+                if dirty:
+                    changed.append(obj)
+            with transaction.atomic():
+                model._default_manager.bulk_update(changed, update_fields, batch_size=batch_size)
+            if changed:
+                self.stdout.write(f"{model._meta.label}: {len(changed):,} row(s) updated")
+
+    @staticmethod
+    def remap_derivatives(derivatives, mapping):
+        result = dict(derivatives)
+        if result.get('source') in mapping:
+            result['source'] = mapping[result['source']]
+        for key, _, _ in imaging.DERIVATIVE_FORMATS:
+            if key in result:
+                result[key] = [[width, mapping.get(name, name)] for width, name in result[key]]
+        return result
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from foundation_app import submissions
+
+
+class Command(BaseCommand):
+    help = (
+        "Insert contact/volunteer submissions queued by write-behind mode, including "
+        "batches left behind by a crashed worker. Run once after a restart, or with --loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Keep flushing every SUBMISSION_FLUSH_INTERVAL seconds.")
+
+    def handle(self, *args, **options):
+        if submissions.fcntl is None:
+            raise CommandError("Write-behind needs fcntl, which this platform lacks.")
+        total = 0
+        try:
+            while True:
+                total += submissions.flush()
+                if not options['loop']:
+                    break
+                time.sleep(submissions.flush_interval())
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Flushed {total} submission(s) from {submissions.spool_dir()}."))
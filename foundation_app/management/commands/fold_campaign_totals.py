@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from foundation_app.donations import fold_campaign_totals, rebuild_campaign_totals
+
+
+class Command(BaseCommand):
+    help = "Fold campaign total shards into Campaign.raised_amount (run periodically, e.g. every minute)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help="Recompute every campaign total from the donation ledger instead of folding shards.",
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            updated = rebuild_campaign_totals()
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt totals for {updated} campaign(s) from the ledger."))
+        else:
+            folded = fold_campaign_totals()
+            self.stdout.write(self.style.SUCCESS(f"Folded shard totals for {folded} campaign(s)."))
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from foundation_app.webhooks import process_pending_events
+
+
+class Command(BaseCommand):
+    help = "Apply received Razorpay webhook events to the donation ledger in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--loop', action='store_true', help="Keep polling the inbox instead of exiting when it is empty.")
+        parser.add_argument('--interval', type=float, default=2.0, help="Seconds to sleep between polls with --loop.")
+
+    def handle(self, *args, **options):
+        total = failures = 0
+        try:
+            while True:
+                applied, failed = process_pending_events(options['batch_size'])
+                total += applied
+                failures += failed
+                if applied == options['batch_size']:
+                    continue  # more waiting, don't sleep
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Processed {total} webhook event(s)."))
+        if failures:
+            self.stdout.write(self.style.WARNING(f"{failures} event(s) failed; see their error in the admin."))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from foundation_app import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index from scratch (SQLite only)."
+
+    def handle(self, *args, **options):
+        if not search.search_available():
+            raise CommandError("The search index needs SQLite with FTS5; other databases use plain lookups.")
+        indexed = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} document(s)."))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from foundation_app import response_cache, video_embeds
+from foundation_app.models import Video
+
+
+class Command(BaseCommand):
+    help = "Fetch oEmbed title, thumbnail and duration for videos that don't have them (failed or older rows)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help="Rows read per batch.")
+        parser.add_argument('--force', action='store_true', help="Refetch rows that already have metadata.")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        rows = Video.objects.exclude(provider='')
+        if not options['force']:
+            rows = rows.filter(metadata_fetched_at__isnull=True)
+        rows = rows.order_by('pk').only('pk', 'provider', 'provider_video_id')
+
+        done = failed = 0
+        last_pk = 0
+        while True:
+            batch = list(rows.filter(pk__gt=last_pk)[:options['batch_size']])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            for video in batch:
+                if video_embeds.refresh_metadata(video):
+                    done += 1
+                else:
+                    failed += 1
+            self.stdout.write(f"{done} fetched, {failed} failed so far")
+
+        if done:
+            response_cache.invalidate_model(Video)
+        self.stdout.write(self.style.SUCCESS(f"Fetched metadata for {done} video(s), {failed} failed."))
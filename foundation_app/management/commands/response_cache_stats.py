@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from foundation_app.response_cache import reset_response_cache_stats, response_cache_stats
+
+
+class Command(BaseCommand):
+    help = "Show hit/miss counters of the anonymous page cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help="Zero the counters after printing them.")
+
+    def handle(self, *args, **options):
+        stats = response_cache_stats()
+        self.stdout.write(f"{'view':<22}{'hits':>10}{'misses':>10}{'hit rate':>10}")
+        for url_name, counts in stats.items():
+            total = counts['hit'] + counts['miss']
+            rate = f"{100 * counts['hit'] / total:.1f}%" if total else '-'
+            self.stdout.write(f"{url_name:<22}{counts['hit']:>10}{counts['miss']:>10}{rate:>10}")
+        if options['reset']:
+            reset_response_cache_stats()
+            self.stdout.write("Counters reset.")
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from foundation_app.razorpay_stub import RazorpayStubServer
+
+
+class Command(BaseCommand):
+    help = "Serve a fake Razorpay API for offline and load testing of the donation flow."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency', type=float, default=0.0, help="Seconds to wait before answering each call.")
+        parser.add_argument(
+            '--failure-rate', type=float, default=0.0,
+            help="Fraction of calls (0-1) that fail with a 500, to exercise retries and the circuit breaker.",
+        )
+
+    def handle(self, *args, **options):
+        if not 0 <= options['failure_rate'] <= 1:
+            raise CommandError("--failure-rate must be between 0 and 1.")
+        server = RazorpayStubServer(
+            (options['host'], options['port']),
+            latency=options['latency'],
+            failure_rate=options['failure_rate'],
+            verbose=options['verbosity'] > 1,
+        )
+        self.stdout.write(f"Fake Razorpay API on {server.base_url}")
+        self.stdout.write(f"Run the site with RAZORPAY_API_BASE_URL={server.base_url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
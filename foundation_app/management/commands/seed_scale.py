@@ -0,0 +1,72 @@
+import time
+from datetime import datetime, timezone
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from foundation_app import response_cache, search, seeding, storage
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill every foundation_app model (and auth users) with deterministic synthetic data at "
+        "production scale. Counts are DEFAULT_COUNTS times --scale; --scale 1 is a million contact "
+        "messages and volunteers and 20k campaigns."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=42, help="Same seed and counts give the same rows.")
+        parser.add_argument(
+            '--scale', type=float, default=0.01,
+            help="Multiplier for every default count; 0 seeds only the models given with --count.",
+        )
+        parser.add_argument(
+            '--count', action='append', default=[], metavar='MODEL=N',
+            help="Exact row count for one model, e.g. --count contactmessage=2000000 (repeatable).",
+        )
+        parser.add_argument(
+            '--until', type=datetime.fromisoformat,
+            help="Newest timestamp to generate (ISO date, UTC); defaults to today's midnight.",
+        )
+        parser.add_argument('--chunk-size', type=int, default=10_000, help="Rows built and inserted per batch.")
+        parser.add_argument(
+            '--skip-index', action='store_true',
+            help="Don't rebuild the search index afterwards (bulk inserts bypass the signals that maintain it).",
+        )
+
+    def handle(self, *args, **options):
+        if options['scale'] < 0 or options['chunk_size'] < 1:
+            raise CommandError("--scale can't be negative and --chunk-size must be at least 1.")
+        counts = {name: int(rows * options['scale']) for name, rows in seeding.DEFAULT_COUNTS.items()}
+        for item in options['count']:
+            name, _, rows = item.partition('=')
+            name = name.strip().lower()
+            if name not in counts or not rows.isdigit():
+                raise CommandError(f"Bad --count {item!r}; expected MODEL=N with MODEL one of {', '.join(counts)}.")
+            counts[name] = int(rows)
+
+        until = options['until']
+        if until is not None and until.tzinfo is None:
+            until = until.replace(tzinfo=timezone.utc)
+
+        started = time.perf_counter()
+        seeder = seeding.Seeder(
+            seed=options['seed'], chunk_size=options['chunk_size'], until=until, log=self.stdout.write,
+        )
+        total = seeder.run(counts)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Inserted {total:,} rows in {elapsed:.1f}s ({total / elapsed if elapsed else 0:,.0f} rows/s)."
+        ))
+
+        if isinstance(default_storage, storage.ContentAddressedStorage):
+            # Rows share the placeholder images without going through storage.save().
+            storage.recount_blobs()
+        response_cache.invalidate_all()
+        if not options['skip_index'] and search.search_available():
+            self.stdout.write("Rebuilding the search index...")
+            self.stdout.write(f"Indexed {search.rebuild_index():,} document(s).")
+        self.stdout.write(
+            f"Seeded users log in with the password {seeding.SEED_PASSWORD!r}. "
+            "Run build_image_derivatives and backfill_image_placeholders for the placeholder images."
+        )
@@ -0,0 +1,173 @@
+# foundation_app/media_serving.py
+"""
+Serving uploads from ``MEDIA_ROOT``.
+
+Replaces ``django.conf.urls.static`` for media. A single byte range is
+answered with ``206 Partial Content`` (honouring ``If-Range``), so ``<video>``
+can seek and resume without downloading the whole file. Responses carry an
+ETag and Last-Modified for revalidation, and content-addressed blobs
+(``blobs/<xx>/<sha256>.<ext>``, see :mod:`foundation_app.storage`) are marked
+immutable.
+
+Bytes go out through ``FileResponse``: an open file positioned at the start
+of the range, which servers with a ``wsgi.file_wrapper`` (gunicorn) send with
+``sendfile``. With ``MEDIA_ACCEL`` set the front proxy sends the file instead,
+and handles ranges itself.
+"""
+import mimetypes
+import os
+import stat
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from .storage import is_blob_name
+
+STREAM_BLOCK_SIZE = 256 * 1024
+
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """
+    ``(start, end)`` (inclusive) for a single-range ``Range`` header, or None to
+    send the whole file (no header, a syntax we don't handle, or several
+    ranges, which a server may ignore). Raises :class:`RangeNotSatisfiable`.
+    """
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    first, sep, last = header[len('bytes='):].strip().partition('-')
+    if not sep or not (first or last) or not all(part.isdigit() for part in (first, last) if part):
+        return None
+    if not first:
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise RangeNotSatisfiable
+        return max(0, size - suffix), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size:
+        raise RangeNotSatisfiable
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def _if_range_matches(request, etag, last_modified):
+    value = request.headers.get('If-Range')
+    if value is None:
+        return True
+    if value.startswith(('"', 'W/')):
+        return value == etag  # strong comparison; weak tags never match
+    return parse_http_date_safe(value) == last_modified
+
+
+class _RangeFile:
+    """Reads at most ``length`` bytes of ``fh``. No ``fileno``, so it is streamed, not sendfile'd."""
+
+    def __init__(self, fh, length):
+        self.fh = fh
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        size = self.remaining if size < 0 else min(size, self.remaining)
+        data = self.fh.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.fh.close()
+
+
+def is_hashed_name(path):
+    """Only blobs are named by their content; a name like IMG_20240101123045.jpg can be replaced."""
+    return is_blob_name(path)
+
+
+def _set_cache_headers(response, path, etag, last_modified):
+    response.headers['ETag'] = etag
+    response.headers['Last-Modified'] = http_date(last_modified)
+    if is_hashed_name(path):
+        response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    else:
+        response.headers['Cache-Control'] = f"public, max-age={getattr(settings, 'MEDIA_CACHE_MAX_AGE', 3600)}"
+    return response
+
+
+def _accel_response(path, fullpath, content_type):
+    accel = getattr(settings, 'MEDIA_ACCEL', '')
+    response = HttpResponse(content_type=content_type)
+    if accel == 'x-accel-redirect':
+        prefix = getattr(settings, 'MEDIA_ACCEL_PREFIX', '/protected-media/')
+        response.headers['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + path.lstrip('/')
+    elif accel == 'x-sendfile':
+        response.headers['X-Sendfile'] = fullpath
+    else:
+        raise ValueError(f"MEDIA_ACCEL must be '', 'x-accel-redirect' or 'x-sendfile', not {accel!r}")
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("Not found")
+    try:
+        st = os.stat(fullpath)
+    except OSError:
+        raise Http404("Not found")
+    if not stat.S_ISREG(st.st_mode):
+        raise Http404("Not found")
+
+    size, last_modified = st.st_size, int(st.st_mtime)
+    etag = f'"{size:x}-{st.st_mtime_ns:x}"'
+    content_type, encoding = mimetypes.guess_type(fullpath)
+    if encoding or not content_type:
+        # Never let a browser transparently decompress a .gz download.
+        content_type = 'application/octet-stream'
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return _set_cache_headers(not_modified, path, etag, last_modified)
+
+    if getattr(settings, 'MEDIA_ACCEL', ''):
+        return _set_cache_headers(_accel_response(path, fullpath, content_type), path, etag, last_modified)
+
+    byte_range = None
+    if _if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range(request.headers.get('Range'), size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response.headers['Content-Range'] = f'bytes */{size}'
+            response.headers['Accept-Ranges'] = 'bytes'
+            return response
+
+    fh = open(fullpath, 'rb')
+    if byte_range is None:
+        response = FileResponse(fh, content_type=content_type)
+    else:
+        start, end = byte_range
+        fh.seek(start)
+        if end == size - 1:
+            # Open-ended ranges (what players send) keep the real file, so sendfile still applies.
+            response = FileResponse(fh, content_type=content_type, status=206)
+        else:
+            response = FileResponse(_RangeFile(fh, end - start + 1), content_type=content_type, status=206)
+            response.headers['Content-Length'] = end - start + 1
+        response.headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response.block_size = STREAM_BLOCK_SIZE
+    response.headers['Accept-Ranges'] = 'bytes'
+    return _set_cache_headers(response, path, etag, last_modified)
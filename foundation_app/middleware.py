@@ -0,0 +1,291 @@
+# foundation_app/middleware.py
+"""
+Every middleware here runs in whichever mode the handler is in: called
+directly under WSGI and awaited under ASGI, so Django never has to put a
+thread hop around it.
+"""
+import json
+import logging
+import os
+import random
+import time
+from abc import ABC, abstractmethod
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from . import static_site, timing
+from .response_cache import ais_cacheable_request, is_cacheable_request
+from .routers import pinned_to_primary, replica_alias, wrote_to_primary
+
+PIN_COOKIE = 'pcf_db_pin'
+
+perf_logger = logging.getLogger('foundation_app.perf')
+
+
+class DualModeMiddleware(ABC):
+    """
+    Base for middleware that runs in the handler's own mode.
+
+    Subclasses implement both ``handle(request)``, called under WSGI, and
+    ``async def ahandle(request)``, awaited under ASGI. Each takes the request,
+    calls ``self.get_response`` (awaiting it in ``ahandle``) and returns the
+    response. Django builds the middleware chain at startup, so a subclass
+    missing either method fails then rather than on its first request.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.ahandle(request)
+        return self.handle(request)
+
+    @abstractmethod
+    def handle(self, request):
+        """Return the response for ``request`` when the handler is sync."""
+
+    @abstractmethod
+    async def ahandle(self, request):
+        """Return the response for ``request`` when the handler is async."""
+
+
+class ReplicaPinningMiddleware(DualModeMiddleware):
+    """
+    Read-your-writes for the primary/replica router.
+
+    A request that writes gets a short-lived cookie; while it is valid the
+    client's reads go to the primary. A cookie rather than the session keeps
+    anonymous visitors (contact form, volunteer signup) from creating session
+    rows. Does nothing unless a replica is configured.
+    """
+
+    def _start(self, request):
+        try:
+            pinned = float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            pinned = False
+        return pinned_to_primary.set(pinned), wrote_to_primary.set(False)
+
+    def _finish(self, request, response):
+        if wrote_to_primary.get():
+            seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+            response.set_cookie(
+                PIN_COOKIE, str(time.time() + seconds), max_age=seconds,
+                httponly=True, samesite='Lax', secure=request.is_secure(),
+            )
+        return response
+
+    def handle(self, request):
+        if replica_alias() is None:
+            return self.get_response(request)
+
+        pin_token, wrote_token = self._start(request)
+        try:
+            return self._finish(request, self.get_response(request))
+        finally:
+            pinned_to_primary.reset(pin_token)
+            wrote_to_primary.reset(wrote_token)
+
+    async def ahandle(self, request):
+        if replica_alias() is None:
+            return await self.get_response(request)
+
+        # Context variables reach the sync_to_async threads the ORM runs in, and come back.
+        pin_token, wrote_token = self._start(request)
+        try:
+            return self._finish(request, await self.get_response(request))
+        finally:
+            pinned_to_primary.reset(pin_token)
+            wrote_to_primary.reset(wrote_token)
+
+
+class PerformanceTimingMiddleware(DualModeMiddleware):
+    """
+    Where a request's time went: SQL (count and time), template rendering,
+    external services and the rest ("app").
+
+    A ``PERF_TIMING_SAMPLE_RATE`` fraction of requests is instrumented; those
+    get a JSON line on the ``foundation_app.perf`` logger and, for staff (or
+    everyone with ``DEBUG`` on, see ``PERF_SERVER_TIMING_HEADER``), a
+    ``Server-Timing`` header visible in the browser's network panel. Requests slower than
+    ``PERF_SLOW_REQUEST_MS`` are always logged, at WARNING, with whatever
+    detail their sampling allowed. Keep this first in ``MIDDLEWARE`` so the
+    total covers the other middleware too.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        timing.install_http_hook()
+
+    def _sampled(self):
+        sample_rate = getattr(settings, 'PERF_TIMING_SAMPLE_RATE', 1.0)
+        return sample_rate > 0 and random.random() < sample_rate
+
+    def _header_mode(self):
+        mode = getattr(settings, 'PERF_SERVER_TIMING_HEADER', 'staff')
+        return 'all' if mode == 'staff' and settings.DEBUG else mode
+
+    def _finish(self, request, response, timings, total, show_header):
+        if timings is not None and show_header:
+            response['Server-Timing'] = timing.server_timing(timings, total)
+        self.report(request, response, timings, total)
+        return response
+
+    def _show_header(self, request):
+        mode = self._header_mode()
+        if mode == 'staff':
+            user = getattr(request, 'user', None)  # absent if a response came before the auth middleware
+            return user is not None and user.is_staff
+        return mode == 'all'
+
+    async def _ashow_header(self, request):
+        mode = self._header_mode()
+        if mode == 'staff':
+            return hasattr(request, 'auser') and (await request.auser()).is_staff
+        return mode == 'all'
+
+    def handle(self, request):
+        if not self._sampled():
+            started = time.perf_counter()
+            response = self.get_response(request)
+            return self._finish(request, response, None, time.perf_counter() - started, False)
+
+        with timing.collect() as timings:
+            response = self.get_response(request)
+        total = time.perf_counter() - timings.started
+        return self._finish(request, response, timings, total, self._show_header(request))
+
+    async def ahandle(self, request):
+        if not self._sampled():
+            started = time.perf_counter()
+            response = await self.get_response(request)
+            return self._finish(request, response, None, time.perf_counter() - started, False)
+
+        with timing.collect() as timings:
+            response = await self.get_response(request)
+        total = time.perf_counter() - timings.started
+        return self._finish(request, response, timings, total, await self._ashow_header(request))
+
+    def report(self, request, response, timings, total):
+        slow = total * 1000 >= getattr(settings, 'PERF_SLOW_REQUEST_MS', 500)
+        if not slow and timings is None:
+            return
+        level = logging.WARNING if slow else logging.INFO
+        if perf_logger.isEnabledFor(level):
+            entry = timing.record(request, response, timings, total)
+            entry['slow'] = slow
+            perf_logger.log(level, json.dumps(entry, separators=(',', ':')))
+
+
+class StaticSiteMiddleware(DualModeMiddleware):
+    """
+    Answer anonymous GETs without a query string from the pages exported by
+    ``manage.py build_static_site``, before any view or query runs. Pages with
+    no file (never built, or removed because their content changed) go to the
+    view as usual. Needs the auth and messages middleware before it; does
+    nothing unless ``STATIC_SITE_ROOT`` is set.
+    """
+
+    def __init__(self, get_response):
+        if not static_site.enabled():
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def _open(self, request):
+        if request.GET or getattr(request, 'rendering_static_site', False):
+            return None
+        filename = static_site.file_for(request.path_info)
+        try:
+            return open(filename, 'rb') if filename else None
+        except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+            return None
+
+    def _respond(self, request, fh, make_response):
+        st = os.fstat(fh.fileno())
+        etag = f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+        response = get_conditional_response(request, etag=etag, last_modified=int(st.st_mtime))
+        if response is None:
+            response = make_response(fh)
+        else:
+            fh.close()
+        response.headers['ETag'] = etag
+        response.headers['Last-Modified'] = http_date(st.st_mtime)
+        patch_cache_control(response, no_cache=True)
+        response.headers['X-Static-Site'] = 'HIT'
+        return response
+
+    def handle(self, request):
+        fh = self._open(request) if is_cacheable_request(request) else None
+        if fh is None:
+            return self.get_response(request)
+        return self._respond(request, fh, lambda fh: FileResponse(fh, content_type='text/html; charset=utf-8'))
+
+    async def ahandle(self, request):
+        fh = self._open(request) if await ais_cacheable_request(request) else None
+        if fh is None:
+            return await self.get_response(request)
+
+        def read(fh):
+            # Pages are small; one read beats streaming them through a thread.
+            with fh:
+                return HttpResponse(fh.read(), content_type='text/html; charset=utf-8')
+
+        return self._respond(request, fh, read)
+
+
+async def _file_chunks(filelike, block_size):
+    read = sync_to_async(filelike.read, thread_sensitive=False)
+    while True:
+        data = await read(block_size)
+        if not data:
+            break
+        yield data
+
+
+class DualModeWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise that can also sit in an async middleware chain. Under ASGI it
+    turns file responses (static files here, and media from views further
+    down) into async iterators read a block at a time in a worker thread;
+    Django would otherwise read a synchronous file iterator into memory whole
+    before sending it.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings=settings)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            response = self.serve(static_file, request)
+        else:
+            response = await self.get_response(request)
+        filelike = getattr(response, 'file_to_stream', None)
+        if filelike is not None:
+            response.streaming_content = _file_chunks(filelike, response.block_size)
+        return response
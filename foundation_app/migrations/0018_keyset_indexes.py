@@ -0,0 +1,92 @@
+# Generated by Django 5.2.3 on 2026-10-18 09:26
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foundation_app', '0017_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='eventphoto',
+            options={'ordering': ['-created_at', '-id']},
+        ),
+        migrations.AlterModelOptions(
+            name='galleryimage',
+            options={'ordering': ['-created_at', '-id']},
+        ),
+        migrations.AlterModelOptions(
+            name='news',
+            options={'ordering': ['-created_at', '-id'], 'verbose_name_plural': 'News'},
+        ),
+        migrations.AlterModelOptions(
+            name='newspapercutting',
+            options={'ordering': ['-created_at', '-id']},
+        ),
+        migrations.AlterModelOptions(
+            name='podcast',
+            options={'ordering': ['-created_at', '-id']},
+        ),
+        migrations.AlterModelOptions(
+            name='project',
+            options={'ordering': ['-created_at', '-id'], 'verbose_name': 'Foundation Project', 'verbose_name_plural': 'Foundation Projects'},
+        ),
+        migrations.AlterModelOptions(
+            name='review',
+            options={'ordering': ['-created_at', '-id']},
+        ),
+        migrations.AlterModelOptions(
+            name='video',
+            options={'ordering': ['-created_at', '-id']},
+        ),
+        migrations.AlterModelOptions(
+            name='volunteer',
+            options={'ordering': ['-created_at', '-id']},
+        ),
+        migrations.AddField(
+            model_name='news',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='eventphoto',
+            index=models.Index(fields=['-created_at', '-id'], name='eventphoto_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='galleryimage',
+            index=models.Index(fields=['-created_at', '-id'], name='gallery_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(fields=['-created_at', '-id'], name='news_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='newspapercutting',
+            index=models.Index(fields=['-created_at', '-id'], name='cutting_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='podcast',
+            index=models.Index(fields=['-created_at', '-id'], name='podcast_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['-created_at', '-id'], name='project_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['-created_at', '-id'], name='review_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['-created_at', '-id'], name='video_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='volunteer',
+            index=models.Index(fields=['-created_at', '-id'], name='volunteer_created_id_idx'),
+        ),
+    ]
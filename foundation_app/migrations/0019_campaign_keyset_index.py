@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-18 09:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foundation_app', '0018_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='campaign',
+            options={'ordering': ['-created_at', '-id']},
+        ),
+        migrations.AddIndex(
+            model_name='campaign',
+            index=models.Index(fields=['-created_at', '-id'], name='campaign_created_id_idx'),
+        ),
+    ]
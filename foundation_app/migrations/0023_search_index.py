@@ -0,0 +1,43 @@
+from django.db import migrations
+
+# Mirrors foundation_app.search.SEARCHABLE at the time of writing:
+# (table, kind, title expression, body expression)
+INITIAL_ROWS = [
+    ('foundation_app_news', 1, 'title', 'content'),
+    ('foundation_app_project', 2, 'title', 'description'),
+    ('foundation_app_podcast', 3, 'title', 'description'),
+    ('foundation_app_video', 4, 'title', "COALESCE(url, '')"),
+    ('foundation_app_galleryimage', 5, 'title', "COALESCE(description, '')"),
+    ('foundation_app_review', 6, 'title', "''"),
+    ('foundation_app_contactmessage', 7, "name || ' ' || email || ' ' || COALESCE(subject, '')", 'message'),
+]
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS foundation_app_search USING fts5("
+        "title, body, tokenize = 'porter unicode61 remove_diacritics 2')"
+    )
+    for table, kind, title, body in INITIAL_ROWS:
+        schema_editor.execute(
+            f"INSERT INTO foundation_app_search (rowid, title, body) "
+            f"SELECT id * 16 + {kind}, {title}, {body} FROM {table}"
+        )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS foundation_app_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foundation_app', '0022_submission_ids'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
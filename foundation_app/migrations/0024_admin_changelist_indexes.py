@@ -0,0 +1,39 @@
+# Generated by Django 5.2.3 on 2026-10-18 09:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foundation_app', '0023_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='contactmessage',
+            options={'ordering': ['-submitted_at', '-id'], 'verbose_name': 'Contact Message', 'verbose_name_plural': 'Contact Messages'},
+        ),
+        migrations.AddIndex(
+            model_name='contactmessage',
+            index=models.Index(fields=['-submitted_at', '-id'], name='contact_submitted_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['-created_at', '-id'], name='donation_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['status', '-created_at'], name='donation_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paymentwebhookevent',
+            index=models.Index(fields=['event_type'], name='webhook_event_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='volunteer',
+            index=models.Index(fields=['availability'], name='volunteer_availability_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.3 on 2026-10-18 09:59
+
+from django.db import migrations, models
+
+from foundation_app.video_embeds import default_thumbnail, parse_video_url
+
+
+def parse_existing_urls(apps, schema_editor):
+    # Metadata is left to `manage.py refresh_video_metadata`; this only parses.
+    Video = apps.get_model('foundation_app', 'Video')
+    videos = []
+    for video in Video.objects.only('pk', 'url').iterator(chunk_size=2000):
+        provider, video_id = parse_video_url(video.url)
+        if provider:
+            video.provider, video.provider_video_id = provider, video_id
+            video.thumbnail_url = default_thumbnail(provider, video_id)
+            videos.append(video)
+    Video.objects.bulk_update(videos, ['provider', 'provider_video_id', 'thumbnail_url'], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foundation_app', '0025_image_placeholders'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='duration',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='embed_title',
+            field=models.CharField(blank=True, editable=False, max_length=300),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='metadata_fetched_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='provider',
+            field=models.CharField(blank=True, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='provider_video_id',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='thumbnail_url',
+            field=models.URLField(blank=True, editable=False, max_length=500),
+        ),
+        migrations.RunPython(parse_existing_urls, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+STAMPED_MODELS = ('News', 'Podcast', 'Video', 'EventPhoto', 'GalleryImage')
+
+
+def copy_created_at(apps, schema_editor):
+    # Rows haven't changed since they were created as far as we know.
+    for name in STAMPED_MODELS:
+        apps.get_model('foundation_app', name).objects.update(updated_at=models.F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foundation_app', '0028_media_blob'),
+    ]
+
+    operations = [
+        *[
+            migrations.AddField(
+                model_name=name.lower(),
+                name='updated_at',
+                field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+                preserve_default=False,
+            )
+            for name in STAMPED_MODELS
+        ],
+        migrations.RunPython(copy_created_at, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='ModelVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('label', models.CharField(max_length=100, unique=True)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('changed_at', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-18 10:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foundation_app', '0029_conditional_get'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StaticPage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=255, unique=True)),
+                ('url_name', models.CharField(db_index=True, max_length=100)),
+                ('changed_at', models.DateTimeField()),
+                ('rendered_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 10:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foundation_app', '0030_static_page'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paymentwebhookevent',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 10:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foundation_app', '0031_webhook_attempts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paymentwebhookevent',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 10:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foundation_app', '0032_webhook_next_attempt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='sha256',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
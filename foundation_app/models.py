@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 from django.urls import reverse
 from django.contrib.auth.models import User
@@ -12,11 +14,14 @@ class ContactMessage(models.Model):
     subject = models.CharField(max_length=200, blank=True, null=True)
     message = models.TextField()
     submitted_at = models.DateTimeField(auto_now_add=True)
+    # Set on rows saved through the write-behind spool so replays can't duplicate them.
+    submission_id = models.UUIDField(unique=True, blank=True, null=True, editable=False)
 
     class Meta:
         verbose_name = "Contact Message"
         verbose_name_plural = "Contact Messages"
-        ordering = ['-submitted_at'] # Order by most recent messages first
+        ordering = ['-submitted_at', '-id'] # Order by most recent messages first
+        indexes = [models.Index(fields=['-submitted_at', '-id'], name='contact_submitted_id_idx')]
 
     def __str__(self):
         """String representation for a ContactMessage."""
@@ -31,13 +36,15 @@ class Project(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField()
     image = models.ImageField(upload_to='project_images/', blank=True, null=True)
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)  # filled by foundation_app.imaging
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "Foundation Project"
         verbose_name_plural = "Foundation Projects"
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
+        indexes = [models.Index(fields=['-created_at', '-id'], name='project_created_id_idx')]
 
     def __str__(self):
         """String representation for a Project."""
@@ -60,6 +67,14 @@ class Volunteer(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
+    submission_id = models.UUIDField(unique=True, blank=True, null=True, editable=False)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='volunteer_created_id_idx'),
+            models.Index(fields=['availability'], name='volunteer_availability_idx'),
+        ]
 
     def __str__(self):
         return self.full_name
@@ -69,8 +84,13 @@ class News(models.Model):
     slug = models.SlugField(unique=True)
     content = models.TextField()
     link = models.URLField(blank=True, null=True)  # <-- Add this line
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
     class Meta:
         verbose_name_plural = "News"
+        ordering = ['-created_at', '-id']
+        indexes = [models.Index(fields=['-created_at', '-id'], name='news_created_id_idx')]
 
     def __str__(self):
         return self.title
@@ -79,9 +99,11 @@ class Podcast(models.Model):
     description = models.TextField()
     link = models.URLField()  # Spotify, YouTube, Anchor, etc.
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        ordering = ['-created_at']  # newest first
+        ordering = ['-created_at', '-id']  # newest first
+        indexes = [models.Index(fields=['-created_at', '-id'], name='podcast_created_id_idx')]
 
     def __str__(self):
         return self.title
@@ -95,6 +117,18 @@ class Video(models.Model):
     title = models.CharField(max_length=200)
     url = models.URLField(max_length=500, blank=True, null=True)
     created_at = models.DateTimeField(default=timezone.now)  # ✅ gives default automatically
+    updated_at = models.DateTimeField(auto_now=True)
+    # Parsed from url on save and filled in by foundation_app.video_embeds
+    provider = models.CharField(max_length=20, blank=True, editable=False)
+    provider_video_id = models.CharField(max_length=64, blank=True, editable=False)
+    embed_title = models.CharField(max_length=300, blank=True, editable=False)
+    thumbnail_url = models.URLField(max_length=500, blank=True, editable=False)
+    duration = models.PositiveIntegerField(blank=True, null=True, editable=False)  # seconds
+    metadata_fetched_at = models.DateTimeField(blank=True, null=True, editable=False)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [models.Index(fields=['-created_at', '-id'], name='video_created_id_idx')]
 
     def __str__(self):
         return self.title
@@ -102,10 +136,16 @@ class Video(models.Model):
 class NewspaperCutting(models.Model):
     title = models.CharField(max_length=200)  # Optional, just to identify image
     image = models.ImageField(upload_to='newspaper_cuttings/')
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)  # filled by foundation_app.imaging
+    image_blurhash = models.CharField(max_length=64, blank=True, editable=False)  # filled by foundation_app.placeholders
+    image_color = models.CharField(max_length=7, blank=True, editable=False)
+    image_width = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    image_height = models.PositiveIntegerField(blank=True, null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
+        indexes = [models.Index(fields=['-created_at', '-id'], name='cutting_created_id_idx')]
 
     def __str__(self):
         return self.title or f"Newspaper Cutting {self.id}"
@@ -113,29 +153,70 @@ class NewspaperCutting(models.Model):
 
 class EventPhoto(models.Model):
     image = models.ImageField(upload_to='event_photos/')
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)  # filled by foundation_app.imaging
+    image_blurhash = models.CharField(max_length=64, blank=True, editable=False)  # filled by foundation_app.placeholders
+    image_color = models.CharField(max_length=7, blank=True, editable=False)
+    image_width = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    image_height = models.PositiveIntegerField(blank=True, null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
+        indexes = [models.Index(fields=['-created_at', '-id'], name='eventphoto_created_id_idx')]
 
     def __str__(self):
         return f"Event Photo {self.id}"
 class Review(models.Model):
     title = models.CharField(max_length=200)
     image = models.ImageField(upload_to="reviews/images/", blank=True, null=True)
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)  # filled by foundation_app.imaging
     video = models.FileField(upload_to="reviews/videos/", blank=True, null=True)  # MP4, etc.
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
+        indexes = [models.Index(fields=['-created_at', '-id'], name='review_created_id_idx')]
 
     def __str__(self):
         return self.title
 
 # foundation_app/models.py
 from django.db import models
+from django.db.models.functions import Coalesce, Least
 from django.contrib.auth.models import User
 
+class CampaignQuerySet(models.QuerySet):
+    def with_totals(self):
+        """
+        Annotate ``total_raised``: the folded ``raised_amount`` plus whatever is
+        still sitting in the campaign's total shards (see foundation_app.donations).
+        """
+        pending = CampaignTotalShard.objects.filter(campaign=models.OuterRef('pk')).values('campaign').annotate(
+            total=models.Sum('amount')
+        ).values('total')
+        return self.annotate(
+            total_raised=models.ExpressionWrapper(
+                models.F('raised_amount') + Coalesce(models.Subquery(pending), models.Value(0), output_field=models.DecimalField()),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            )
+        )
+
+    def with_progress(self):
+        """Annotate ``total_raised`` and ``progress`` (percent of goal raised, capped at 100) in the database."""
+        percent = models.ExpressionWrapper(
+            models.F('total_raised') * 100 / models.F('goal_amount'),
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        )
+        return self.with_totals().annotate(
+            progress=models.Case(
+                models.When(goal_amount__gt=0, then=Least(percent, models.Value(100))),
+                default=models.Value(0),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            )
+        )
+
+
 class Campaign(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="campaigns")
     title = models.CharField(max_length=200)
@@ -144,6 +225,12 @@ class Campaign(models.Model):
     raised_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = CampaignQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [models.Index(fields=['-created_at', '-id'], name='campaign_created_id_idx')]
+
     @property
     def progress_percentage(self):
         if self.goal_amount > 0:
@@ -156,10 +243,171 @@ class GalleryImage(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True, null=True)
     image = models.ImageField(upload_to="gallery/")  # stored in Cloudinary or media/
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)  # filled by foundation_app.imaging
+    image_blurhash = models.CharField(max_length=64, blank=True, editable=False)  # filled by foundation_app.placeholders
+    image_color = models.CharField(max_length=7, blank=True, editable=False)
+    image_width = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    image_height = models.PositiveIntegerField(blank=True, null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        ordering = ["-created_at"]
+        ordering = ["-created_at", "-id"]
+        indexes = [models.Index(fields=["-created_at", "-id"], name="gallery_created_id_idx")]
 
     def __str__(self):
         return self.title
+
+
+class CampaignTotalShard(models.Model):
+    """
+    One of several counter rows per campaign. Confirmed donations add to a
+    random shard so concurrent confirmations don't all update the same row;
+    ``fold_campaign_totals`` periodically moves shard amounts into
+    ``Campaign.raised_amount``.
+    """
+    campaign = models.ForeignKey(Campaign, on_delete=models.CASCADE, related_name="total_shards")
+    shard = models.PositiveSmallIntegerField()
+    amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["campaign", "shard"], name="unique_campaign_total_shard"),
+        ]
+
+    def __str__(self):
+        return f"{self.campaign_id}/{self.shard}: {self.amount}"
+
+
+class Donation(models.Model):
+    """
+    Ledger entry for a single Razorpay order. The ledger is the source of truth
+    for campaign totals (see ``donations.rebuild_campaign_totals``).
+    """
+    STATUS_CREATED = "created"
+    STATUS_CAPTURED = "captured"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_CREATED, "Created"),
+        (STATUS_CAPTURED, "Captured"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    campaign = models.ForeignKey(Campaign, on_delete=models.SET_NULL, blank=True, null=True, related_name="donations")
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True, related_name="donations")
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    currency = models.CharField(max_length=3, default="INR")
+    razorpay_order_id = models.CharField(max_length=64, unique=True)
+    razorpay_payment_id = models.CharField(max_length=64, unique=True, blank=True, null=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_CREATED)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-created_at", "-id"]
+        indexes = [
+            models.Index(fields=["campaign", "status"], name="donation_campaign_status_idx"),
+            models.Index(fields=["-created_at", "-id"], name="donation_created_id_idx"),
+            models.Index(fields=["status", "-created_at"], name="donation_status_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.razorpay_order_id} ({self.amount} {self.currency}, {self.status})"
+
+
+class PaymentWebhookEvent(models.Model):
+    """
+    Inbox of verified Razorpay webhook deliveries, stored as received.
+    ``manage.py process_payment_webhooks`` applies them to the ledger.
+    """
+    event_id = models.CharField(max_length=64, unique=True)
+    event_type = models.CharField(max_length=64)
+    payload = models.TextField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+    # Failed applications so far; the event is retried until PAYMENT_WEBHOOK_MAX_ATTEMPTS.
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # A failed event is left alone until then (PAYMENT_WEBHOOK_RETRY_DELAY, doubling per attempt).
+    next_attempt_at = models.DateTimeField(blank=True, null=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["processed_at", "id"], name="webhook_pending_idx"),
+            models.Index(fields=["event_type"], name="webhook_event_type_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} ({self.event_id})"
+
+
+class UploadSession(models.Model):
+    """
+    A resumable chunked upload from the admin, see foundation_app/uploads.py.
+    Chunks are appended in order to ``CHUNKED_UPLOAD_DIR/<id>.part``.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="upload_sessions")
+    target = models.CharField(max_length=100)  # "app_label.Model.field" the file is for
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    size = models.PositiveBigIntegerField()
+    received = models.PositiveBigIntegerField(default=0)
+    chunk_checksums = models.TextField(blank=True)  # hex SHA-256 of each chunk, one per line
+    checksum = models.CharField(max_length=64, blank=True)  # SHA-256 over the chunk checksums, once complete
+    sha256 = models.CharField(max_length=64, blank=True)  # SHA-256 of the whole file, hashed after completion
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["updated_at"], name="upload_session_updated_idx")]
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size} bytes)"
+
+    @property
+    def complete(self):
+        return self.received == self.size
+
+
+class MediaBlob(models.Model):
+    """
+    A file in ContentAddressedStorage (named by its SHA-256) and how many
+    file fields point at it, see foundation_app/storage.py.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    sha256 = models.CharField(max_length=64, db_index=True)
+    size = models.PositiveBigIntegerField()
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} references)"
+
+
+class ModelVersion(models.Model):
+    """
+    Change counter per model, bumped whenever its rows are saved or deleted.
+    Pages build their ETag and Last-Modified from it, see foundation_app/versions.py.
+    """
+    label = models.CharField(max_length=100, unique=True)  # "app_label.Model"
+    version = models.PositiveBigIntegerField(default=0)
+    changed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.label} v{self.version}"
+
+
+class StaticPage(models.Model):
+    """
+    A public page exported by ``manage.py build_static_site``. It is stale when
+    it has never been rendered or a model it shows changed after it was.
+    """
+    path = models.CharField(max_length=255, unique=True)
+    url_name = models.CharField(max_length=100, db_index=True)
+    changed_at = models.DateTimeField()
+    rendered_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return self.path
@@ -0,0 +1,252 @@
+# foundation_app/pagination.py
+"""
+Keyset (cursor) pagination.
+
+Pages are fetched by seeking past the last row seen on ``(created_at, id)``
+instead of using OFFSET, and no COUNT(*) is ever issued, so every page costs
+the same no matter how deep into the table it is.
+
+``EstimatedCountPaginator`` is for the admin, whose page-number changelists
+can't use keysets: it only avoids COUNT(*) over whole large tables.
+"""
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, connections
+from django.db.models import Q, QuerySet
+from django.http import Http404
+from django.utils.functional import cached_property
+
+DEFAULT_KEYSET = ('-created_at', '-id')
+CURSOR_PARAM = 'cursor'
+
+
+class KeysetPage:
+    """One page of results plus opaque cursors for the neighbouring pages."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def _field_name(ordering):
+    return ordering.lstrip('-')
+
+
+def _reverse(keyset):
+    return tuple(o[1:] if o.startswith('-') else f'-{o}' for o in keyset)
+
+
+class _CursorEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder, but keeping microseconds: a cursor has to match its row exactly."""
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(direction, obj, keyset):
+    values = [obj.serializable_value(_field_name(o)) for o in keyset]
+    raw = json.dumps([direction, values], cls=_CursorEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, model, keyset):
+    """Return ``(direction, values)``; raise Http404 for anything malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        direction, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if direction not in ('next', 'previous') or len(values) != len(keyset):
+            raise ValueError(cursor)
+        values = [
+            model._meta.get_field(_field_name(o)).to_python(value)
+            for o, value in zip(keyset, values)
+        ]
+    except (ValueError, TypeError, binascii.Error, ValidationError):
+        raise Http404("Invalid page cursor.")
+    return direction, values
+
+
+def _seek(ordering, values):
+    """Rows strictly after ``values`` in ``ordering`` (a row-value comparison spelled out with Q)."""
+    condition = Q()
+    for i, o in enumerate(ordering):
+        lookup = 'lt' if o.startswith('-') else 'gt'
+        term = Q(**{f'{_field_name(o)}__{lookup}': values[i]})
+        for prev, value in zip(ordering[:i], values[:i]):
+            term &= Q(**{_field_name(prev): value})
+        condition |= term
+    return condition
+
+
+def _keyset_query(queryset, cursor, per_page, keyset):
+    direction, values = ('next', None)
+    if cursor:
+        direction, values = decode_cursor(cursor, queryset.model, keyset)
+
+    ordering = keyset if direction == 'next' else _reverse(keyset)
+    queryset = queryset.order_by(*ordering)
+    if values is not None:
+        queryset = queryset.filter(_seek(ordering, values))
+    return direction, values, queryset[:per_page + 1]
+
+
+def _keyset_page(rows, direction, values, per_page, keyset):
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if direction == 'next':
+        has_next, has_previous = has_more, values is not None
+    else:
+        rows.reverse()
+        has_next, has_previous = True, has_more
+
+    if not rows:
+        return KeysetPage(rows)
+    return KeysetPage(
+        rows,
+        next_cursor=encode_cursor('next', rows[-1], keyset) if has_next else None,
+        previous_cursor=encode_cursor('previous', rows[0], keyset) if has_previous else None,
+    )
+
+
+def keyset_paginate(queryset, cursor=None, per_page=20, keyset=DEFAULT_KEYSET):
+    """
+    Return a :class:`KeysetPage` of ``queryset`` ordered by ``keyset``.
+
+    Fetches ``per_page + 1`` rows to learn whether another page exists.
+    """
+    direction, values, queryset = _keyset_query(queryset, cursor, per_page, keyset)
+    return _keyset_page(list(queryset), direction, values, per_page, keyset)
+
+
+async def akeyset_paginate(queryset, cursor=None, per_page=20, keyset=DEFAULT_KEYSET):
+    """:func:`keyset_paginate` with the rows fetched through the async ORM."""
+    direction, values, queryset = _keyset_query(queryset, cursor, per_page, keyset)
+    return _keyset_page([obj async for obj in queryset], direction, values, per_page, keyset)
+
+
+class KeysetPaginationMixin:
+    """
+    Drop-in replacement for ListView's page-number pagination.
+
+    The template gets ``page_obj`` (a :class:`KeysetPage`) and ``is_paginated``
+    as usual; ``foundation_app/partials/pager.html`` renders the links.
+    """
+    paginate_by = 12
+    keyset = DEFAULT_KEYSET
+    cursor_param = CURSOR_PARAM
+
+    def paginate_queryset(self, queryset, page_size):
+        page = keyset_paginate(queryset, self.request.GET.get(self.cursor_param), page_size, self.keyset)
+        return None, page, page.object_list, page.has_other_pages()
+
+
+class AsyncKeysetListMixin(KeysetPaginationMixin):
+    """
+    For a ListView whose page is fetched with the async ORM. ``dispatch`` is a
+    coroutine, so decorators applied with ``method_decorator`` take their
+    async path.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        return await super().dispatch(request, *args, **kwargs)
+
+    async def get(self, request, *args, **kwargs):
+        self.object_list = self.get_queryset()
+        self.page = await akeyset_paginate(
+            self.object_list, request.GET.get(self.cursor_param), self.get_paginate_by(self.object_list), self.keyset,
+        )
+        # The template gets the fetched rows, so rendering (in a thread) runs no page query.
+        return self.render_to_response(self.get_context_data())
+
+    def paginate_queryset(self, queryset, page_size):
+        return None, self.page, self.page.object_list, self.page.has_other_pages()
+
+
+def estimated_row_count(queryset):
+    """
+    The table's row count from database statistics, or None if ``queryset``
+    is filtered or the backend has no cheap estimate.
+    """
+    if not isinstance(queryset, QuerySet) or queryset.query.where or queryset.query.distinct:
+        return None
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    if connection.vendor == 'sqlite':
+        return _sqlite_row_count(connection, table)
+    elif connection.vendor == 'mysql':
+        sql = 'SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s'
+        params = [table]
+    elif connection.vendor == 'postgresql':
+        sql, params = 'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table]
+    else:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    return int(row[0]) if row and row[0] is not None and row[0] >= 0 else None
+
+
+def _sqlite_row_count(connection, table):
+    """
+    The row count ANALYZE (or ``PRAGMA optimize``) last recorded in
+    ``sqlite_stat1``; without statistics, ``MAX(rowid)``, which never shrinks
+    after deletes.
+    """
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+            row = cursor.fetchone()
+        except DatabaseError:  # no sqlite_stat1 until the first ANALYZE
+            row = None
+        if row and row[0] and row[0].split()[0].isdigit():
+            return int(row[0].split()[0])
+        cursor.execute(f'SELECT MAX(rowid) FROM {connection.ops.quote_name(table)}')
+        row = cursor.fetchone()
+    return int(row[0]) if row and row[0] is not None else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Uses :func:`estimated_row_count` instead of COUNT(*) for unfiltered lists
+    of ``exact_below`` rows or more. Filtered lists are still counted exactly.
+
+    Statistics lag behind deletes, so the estimate is checked with a COUNT(*)
+    that stops after ``exact_below`` rows: a table that has shrunk below that
+    is counted exactly instead of showing pages past its end.
+    """
+    exact_below = 10000
+
+    @cached_property
+    def count(self):
+        estimate = estimated_row_count(self.object_list)
+        if estimate is None or estimate < self.exact_below:
+            return super().count
+        if self.exact_below > 0:
+            bounded = self.object_list[:self.exact_below].count()
+            if bounded < self.exact_below:
+                return bounded
+        return estimate
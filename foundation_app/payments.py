@@ -0,0 +1,306 @@
+# foundation_app/payments.py
+"""
+Process-wide Razorpay client.
+
+One ``RazorpayGateway`` per process reuses a pooled ``requests`` session (so
+donors don't pay a TLS handshake per order), bounds every call with
+connect/read timeouts, retries idempotent calls with exponential backoff and
+stops calling a failing gateway for a while via a circuit breaker.
+
+Async views (ASGI) get the same from :class:`AsyncRazorpayGateway`, built on httpx.
+
+Point ``RAZORPAY_API_BASE_URL`` at ``manage.py run_razorpay_stub`` to exercise
+the donation flow offline.
+"""
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+import weakref
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from . import timing
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentGatewayError(Exception):
+    """Razorpay could not be reached, timed out or returned a server error."""
+
+
+class CircuitOpenError(PaymentGatewayError):
+    """Calls are being short-circuited after repeated gateway failures."""
+
+
+class InvalidSignature(Exception):
+    """A checkout callback whose signature doesn't match the order and payment."""
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after ``failure_threshold`` consecutive failures. Once
+    ``reset_timeout`` seconds have passed a single trial call is let through
+    (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self._opened_at is not None
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial_running or time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+class TimeoutSession(requests.Session):
+    """A session that applies a default ``timeout`` to every request."""
+
+    def __init__(self, timeout):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, *args, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return super().request(*args, **kwargs)
+
+
+class RazorpayGateway:
+    def __init__(self, key_id, key_secret, base_url=None, timeout=(3.05, 10), max_retries=2,
+                 backoff=0.3, pool_size=10, failure_threshold=5, reset_timeout=30):
+        import razorpay
+
+        self.key_id = key_id
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+        self.session = TimeoutSession(timeout)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        options = {'base_url': base_url} if base_url else {}
+        self.client = razorpay.Client(session=self.session, auth=(key_id, key_secret), **options)
+        self._server_error = razorpay.errors.ServerError
+        self._signature_error = razorpay.errors.SignatureVerificationError
+
+    # Public API -------------------------------------------------------------
+
+    def create_order(self, data):
+        return self._call(self.client.order.create, data, idempotent=False)
+
+    def fetch_order(self, order_id):
+        return self._call(self.client.order.fetch, order_id, idempotent=True)
+
+    def fetch_payment(self, payment_id):
+        return self._call(self.client.payment.fetch, payment_id, idempotent=True)
+
+    def verify_payment_signature(self, params):
+        """Check the checkout callback signature locally; raises :class:`InvalidSignature`."""
+        try:
+            return self.client.utility.verify_payment_signature(params)
+        except self._signature_error as exc:
+            raise InvalidSignature(str(exc)) from exc
+
+    # Internals --------------------------------------------------------------
+
+    def _retryable(self, exc, idempotent):
+        if isinstance(exc, requests.exceptions.ConnectTimeout):
+            # The request never reached Razorpay, so even a POST can be resent.
+            return True
+        return idempotent
+
+    def _call(self, func, *args, idempotent):
+        if not self.breaker.allow():
+            raise CircuitOpenError("Payment gateway temporarily unavailable.")
+
+        attempt = 0
+        while True:
+            try:
+                with timing.track('razorpay'):
+                    result = func(*args)
+            except (requests.exceptions.RequestException, self._server_error) as exc:
+                if attempt < self.max_retries and self._retryable(exc, idempotent):
+                    delay = self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+                    logger.warning("Razorpay call failed (%s), retrying in %.2fs", exc, delay)
+                    time.sleep(delay)
+                    attempt += 1
+                    continue
+                self.breaker.record_failure()
+                raise PaymentGatewayError(str(exc) or exc.__class__.__name__) from exc
+            except Exception:
+                # Razorpay answered (e.g. a 4xx), so the gateway itself is healthy.
+                self.breaker.record_success()
+                raise
+            self.breaker.record_success()
+            return result
+
+
+class AsyncRazorpayGateway:
+    """
+    :class:`RazorpayGateway` for async views, on a pooled ``httpx.AsyncClient``
+    calling the REST API directly (the Razorpay SDK is blocking). Same timeouts,
+    retries, circuit breaking and exceptions; one gateway holds any number of
+    concurrent calls without a thread each.
+    """
+
+    def __init__(self, key_id, key_secret, base_url=None, timeout=(3.05, 10), max_retries=2,
+                 backoff=0.3, pool_size=10, failure_threshold=5, reset_timeout=30):
+        import httpx
+        import razorpay
+
+        self.key_id = key_id
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        connect_timeout, read_timeout = timeout
+        self.client = httpx.AsyncClient(
+            base_url=(base_url or razorpay.Client.DEFAULTS['base_url']).rstrip('/') + '/v1',
+            auth=(key_id, key_secret),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+        self._httpx = httpx
+        self._errors = razorpay.errors
+
+    async def create_order(self, data):
+        return await self._call('POST', '/orders', json=data, idempotent=False)
+
+    async def fetch_order(self, order_id):
+        return await self._call('GET', f'/orders/{order_id}', idempotent=True)
+
+    async def fetch_payment(self, payment_id):
+        return await self._call('GET', f'/payments/{payment_id}', idempotent=True)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    def _raise_for_status(self, response):
+        if response.status_code < 400:
+            return
+        try:
+            error = response.json().get('error', {})
+        except ValueError:
+            error = {}
+        description = error.get('description', '') or f'HTTP {response.status_code}'
+        if response.status_code < 500 and str(error.get('code', '')).upper() == 'BAD_REQUEST_ERROR':
+            raise self._errors.BadRequestError(description)
+        if response.status_code < 500:
+            raise self._errors.GatewayError(description)
+        raise self._errors.ServerError(description)
+
+    async def _call(self, method, path, *, idempotent, **kwargs):
+        if not self.breaker.allow():
+            raise CircuitOpenError("Payment gateway temporarily unavailable.")
+
+        attempt = 0
+        while True:
+            try:
+                with timing.track('razorpay'):
+                    response = await self.client.request(method, path, **kwargs)
+                self._raise_for_status(response)
+            except (self._httpx.TransportError, self._errors.ServerError) as exc:
+                # A connect timeout means the request never reached Razorpay, so even a POST can be resent.
+                retryable = idempotent or isinstance(exc, self._httpx.ConnectTimeout)
+                if attempt < self.max_retries and retryable:
+                    delay = self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+                    logger.warning("Razorpay call failed (%s), retrying in %.2fs", exc, delay)
+                    await asyncio.sleep(delay)
+                    attempt += 1
+                    continue
+                self.breaker.record_failure()
+                raise PaymentGatewayError(str(exc) or exc.__class__.__name__) from exc
+            except Exception:
+                self.breaker.record_success()
+                raise
+            self.breaker.record_success()
+            return response.json()
+
+
+_gateway = None
+_gateway_pid = None
+_gateway_lock = threading.Lock()
+
+# One per event loop. A collected loop drops its gateway; a closed one that is
+# still referenced (pooled transports point back at it) is pruned on next use.
+_async_gateways = weakref.WeakKeyDictionary()
+
+
+def _gateway_kwargs():
+    """Connection, retry and circuit-breaker options shared by both gateways."""
+    return {
+        'base_url': getattr(settings, 'RAZORPAY_API_BASE_URL', None),
+        'timeout': getattr(settings, 'RAZORPAY_TIMEOUT', (3.05, 10)),
+        'max_retries': getattr(settings, 'RAZORPAY_MAX_RETRIES', 2),
+        'pool_size': getattr(settings, 'RAZORPAY_POOL_SIZE', 10),
+        'failure_threshold': getattr(settings, 'RAZORPAY_CIRCUIT_FAILURES', 5),
+        'reset_timeout': getattr(settings, 'RAZORPAY_CIRCUIT_RESET', 30),
+    }
+
+
+def get_gateway():
+    """
+    Return this process's gateway, creating it on first use. A forked worker
+    builds its own so pooled sockets are never shared across processes.
+    """
+    global _gateway, _gateway_pid
+    pid = os.getpid()
+    if _gateway is None or _gateway_pid != pid:
+        with _gateway_lock:
+            if _gateway is None or _gateway_pid != pid:
+                _gateway = RazorpayGateway(
+                    settings.RAZORPAY_KEY_ID,
+                    settings.RAZORPAY_KEY_SECRET,
+                    **_gateway_kwargs(),
+                )
+                _gateway_pid = pid
+    return _gateway
+
+
+def get_async_gateway():
+    """
+    Return the :class:`AsyncRazorpayGateway` for the running event loop (one
+    per process under an ASGI server); its connection pool belongs to that loop.
+    """
+    loop = asyncio.get_running_loop()
+    for stale in [other for other in list(_async_gateways) if other.is_closed()]:
+        _async_gateways.pop(stale, None)
+    gateway = _async_gateways.get(loop)
+    if gateway is None:
+        gateway = _async_gateways[loop] = AsyncRazorpayGateway(
+            settings.RAZORPAY_KEY_ID,
+            settings.RAZORPAY_KEY_SECRET,
+            **_gateway_kwargs(),
+        )
+    return gateway
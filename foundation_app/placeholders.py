@@ -0,0 +1,163 @@
+# foundation_app/placeholders.py
+"""
+Low-quality image placeholders.
+
+For each photo we store a BlurHash (a ~30 character string a few lines of
+JavaScript turn into a blurred preview), the dominant colour, and the
+intrinsic size, so grids can reserve the right space and paint something
+before the real image arrives. Values are computed once, from the upload in
+``pre_save`` or by ``manage.py backfill_image_placeholders``.
+
+The maths runs on a thumbnail of at most ``SAMPLE_SIZE`` pixels with NumPy;
+NumPy is imported on first use so it doesn't slow down startup.
+"""
+import logging
+
+from django.apps import apps
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+PLACEHOLDER_MODELS = (
+    'foundation_app.GalleryImage',
+    'foundation_app.EventPhoto',
+    'foundation_app.NewspaperCutting',
+)
+PLACEHOLDER_FIELDS = ('image_blurhash', 'image_color', 'image_width', 'image_height')
+
+SAMPLE_SIZE = 64
+MAX_COMPONENTS = 4
+
+_BASE83 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~'
+
+
+def placeholder_models():
+    return [apps.get_model(label) for label in PLACEHOLDER_MODELS]
+
+
+def _base83(value, length):
+    return ''.join(_BASE83[(value // 83 ** (length - i - 1)) % 83] for i in range(length))
+
+
+def _srgb_to_linear(np, values):
+    v = values / 255.0
+    return np.where(v <= 0.04045, v / 12.92, ((v + 0.055) / 1.055) ** 2.4)
+
+
+def _linear_to_srgb(value):
+    v = min(1.0, max(0.0, value))
+    if v <= 0.0031308:
+        return int(v * 12.92 * 255 + 0.5)
+    return int((1.055 * v ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def blurhash(pixels, x_components, y_components):
+    """BlurHash of an ``(height, width, 3)`` uint8 array (https://blurha.sh)."""
+    import numpy as np
+
+    height, width = pixels.shape[:2]
+    linear = _srgb_to_linear(np, pixels.astype(np.float64))
+    basis_x = np.cos(np.pi * np.outer(np.arange(x_components), np.arange(width)) / width)
+    basis_y = np.cos(np.pi * np.outer(np.arange(y_components), np.arange(height)) / height)
+    # factors[j, i] = mean over pixels of basis_y[j, y] * basis_x[i, x] * colour
+    factors = np.einsum('jy,ix,yxc->jic', basis_y, basis_x, linear) / (width * height)
+    factors *= 2
+    factors[0, 0] /= 2
+    factors = factors.reshape(-1, 3)  # row by row, as the format expects
+    dc, ac = factors[0], factors[1:]
+
+    result = _base83((x_components - 1) + (y_components - 1) * 9, 1)
+    if len(ac):
+        quantised_max = int(max(0, min(82, np.floor(np.abs(ac).max() * 166 - 0.5))))
+        maximum = (quantised_max + 1) / 166
+        result += _base83(quantised_max, 1)
+    else:
+        maximum = 1.0
+        result += _base83(0, 1)
+
+    r, g, b = (_linear_to_srgb(c) for c in dc)
+    result += _base83((r << 16) + (g << 8) + b, 4)
+
+    scaled = np.sign(ac / maximum) * np.abs(ac / maximum) ** 0.5
+    quantised = np.clip(np.floor(scaled * 9 + 9.5), 0, 18).astype(int)
+    for qr, qg, qb in quantised:
+        result += _base83(int(qr) * 19 * 19 + int(qg) * 19 + int(qb), 2)
+    return result
+
+
+def dominant_color(pixels):
+    """Hex colour of the most common 4-bit-per-channel bucket, averaged within the bucket."""
+    import numpy as np
+
+    flat = pixels.reshape(-1, 3).astype(np.int64)
+    buckets = (flat[:, 0] >> 4) << 8 | (flat[:, 1] >> 4) << 4 | (flat[:, 2] >> 4)
+    winner = np.bincount(buckets, minlength=4096).argmax()
+    r, g, b = flat[buckets == winner].mean(axis=0).round().astype(int)
+    return f'#{r:02x}{g:02x}{b:02x}'
+
+
+def compute_placeholder(fileobj):
+    """``{field: value}`` for :data:`PLACEHOLDER_FIELDS` from an open image file."""
+    import numpy as np
+
+    with Image.open(fileobj) as image:
+        width, height = image.size
+        if image.getexif().get(0x0112) in (5, 6, 7, 8):  # EXIF orientation rotated by 90°
+            width, height = height, width
+        # JPEGs can be decoded straight at 1/2..1/8 scale, which skips most of the work.
+        image.draft('RGB', (SAMPLE_SIZE * 2, SAMPLE_SIZE * 2))
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info):
+            rgba = image.convert('RGBA')
+            image = Image.new('RGB', rgba.size, (255, 255, 255))
+            image.paste(rgba, mask=rgba.getchannel('A'))
+        else:
+            image = image.convert('RGB')
+        image.thumbnail((SAMPLE_SIZE, SAMPLE_SIZE), Image.Resampling.BILINEAR)
+        pixels = np.asarray(image)
+
+    ratio = width / height
+    x_components = MAX_COMPONENTS if ratio >= 1 else max(1, round(MAX_COMPONENTS * ratio))
+    y_components = MAX_COMPONENTS if ratio <= 1 else max(1, round(MAX_COMPONENTS / ratio))
+    return {
+        'image_blurhash': blurhash(pixels, x_components, y_components),
+        'image_color': dominant_color(pixels),
+        'image_width': width,
+        'image_height': height,
+    }
+
+
+def empty_placeholder():
+    return {'image_blurhash': '', 'image_color': '', 'image_width': None, 'image_height': None}
+
+
+def placeholder_from_storage(name, storage=None):
+    with (storage or default_storage).open(name, 'rb') as fh:
+        return compute_placeholder(fh)
+
+
+def fill_from_upload(instance):
+    """
+    Set the placeholder fields from a newly assigned, not yet stored upload, so
+    they are written by the same save. Returns False if nothing changed.
+    """
+    image = instance.image
+    if not image:
+        if instance.image_blurhash or instance.image_width:
+            for field, value in empty_placeholder().items():
+                setattr(instance, field, value)
+            return True
+        return False
+    if image._committed:
+        return False
+    try:
+        values = compute_placeholder(image.file)
+    except (OSError, Image.DecompressionBombError) as exc:
+        logger.warning("Could not compute a placeholder for %s: %s", image.name, exc)
+        values = empty_placeholder()
+    finally:
+        image.file.seek(0)
+    for field, value in values.items():
+        setattr(instance, field, value)
+    return True
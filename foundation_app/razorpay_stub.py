@@ -0,0 +1,144 @@
+# foundation_app/razorpay_stub.py
+"""
+A fake Razorpay API for offline and load testing.
+
+Implements just enough of ``/v1/orders`` and ``/v1/payments`` for the donation
+flow. Orders live in memory and are gone when the server stops. ``latency`` and
+``failure_rate`` simulate a slow or flaky gateway.
+
+Start it with ``manage.py run_razorpay_stub``, or in-process with
+``start_stub_server()``, and set ``RAZORPAY_API_BASE_URL`` to its address.
+"""
+import json
+import random
+import re
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _new_id(prefix):
+    return f'{prefix}_{secrets.token_hex(7)}'
+
+
+class RazorpayStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+
+    order_path = re.compile(r'^/v1/orders/(?P<id>[\w-]+)$')
+    payment_path = re.compile(r'^/v1/payments/(?P<id>[\w-]+)$')
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status, code, description):
+        self._send(status, {'error': {'code': code, 'description': description}})
+
+    def _simulate(self):
+        """Apply the configured latency; return False if this call should fail."""
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if self.server.failure_rate and random.random() < self.server.failure_rate:
+            self._error(500, 'SERVER_ERROR', 'Simulated gateway failure.')
+            return False
+        return True
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        if self.path.rstrip('/') != '/v1/orders':
+            return self._error(404, 'BAD_REQUEST_ERROR', 'The requested URL was not found on the server.')
+        if not self._simulate():
+            return
+        try:
+            data = json.loads(raw or b'{}')
+            amount = int(data['amount'])
+        except (ValueError, KeyError, TypeError):
+            return self._error(400, 'BAD_REQUEST_ERROR', 'The amount field is required.')
+        if amount < 100:
+            return self._error(400, 'BAD_REQUEST_ERROR', 'Order amount less than minimum amount allowed')
+
+        order = {
+            'id': _new_id('order'),
+            'entity': 'order',
+            'amount': amount,
+            'amount_paid': 0,
+            'amount_due': amount,
+            'currency': data.get('currency', 'INR'),
+            'receipt': data.get('receipt'),
+            'status': 'created',
+            'attempts': 0,
+            'notes': data.get('notes') or [],
+            'created_at': int(time.time()),
+        }
+        with self.server.lock:
+            self.server.orders[order['id']] = order
+        self._send(200, order)
+
+    def do_GET(self):
+        match = self.order_path.match(self.path)
+        store = self.server.orders
+        if match is None:
+            match = self.payment_path.match(self.path)
+            store = self.server.payments
+        if match is None:
+            return self._error(404, 'BAD_REQUEST_ERROR', 'The requested URL was not found on the server.')
+        if not self._simulate():
+            return
+        with self.server.lock:
+            entity = store.get(match['id'])
+        if entity is None:
+            return self._error(400, 'BAD_REQUEST_ERROR', 'The id provided does not exist')
+        self._send(200, entity)
+
+
+class RazorpayStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, failure_rate=0.0, verbose=False):
+        super().__init__(address, RazorpayStubHandler)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.verbose = verbose
+        self.orders = {}
+        self.payments = {}
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def capture(self, order_id):
+        """Record a captured payment against ``order_id``, as checkout would."""
+        with self.lock:
+            order = self.orders[order_id]
+            payment = {
+                'id': _new_id('pay'),
+                'entity': 'payment',
+                'amount': order['amount'],
+                'currency': order['currency'],
+                'status': 'captured',
+                'order_id': order_id,
+                'captured': True,
+                'created_at': int(time.time()),
+            }
+            order.update(status='paid', amount_paid=order['amount'], amount_due=0, attempts=order['attempts'] + 1)
+            self.payments[payment['id']] = payment
+        return payment
+
+
+def start_stub_server(host='127.0.0.1', port=0, **options):
+    """Run a stub server on a background thread. Call ``shutdown()`` on the result to stop it."""
+    server = RazorpayStubServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, name='razorpay-stub', daemon=True).start()
+    return server
@@ -0,0 +1,254 @@
+# foundation_app/response_cache.py
+"""
+Whole-page cache for anonymous GET requests.
+
+Entries are keyed by URL name, URL arguments and the query parameters the
+views read (CACHE_KEY_PARAMS); tracking tags such as ``utm_*`` or ``fbclid``
+share the untagged page's entry instead of each filling the cache with a copy
+of it. Every URL name
+has a generation stamp that is part of the key; saving or deleting a model bumps
+the stamp of each view that reads it (see VIEW_DEPENDENCIES), which orphans
+exactly those entries and leaves the rest of the cache warm. The same saves
+bump the model's version stamp, from which foundation_app/versions.py derives
+the ETag browsers revalidate with.
+"""
+import hashlib
+import json
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import caches
+
+# URL name -> models the view reads. Only views listed here are cached.
+VIEW_DEPENDENCIES = {
+    'home': ('foundation_app.Project',),
+    'about_us': (),
+    'team': (),
+    'media_centre': ('foundation_app.Podcast',),
+    'gallery': ('foundation_app.GalleryImage',),
+    'news_list': ('foundation_app.News',),
+    'news_detail': ('foundation_app.News',),
+    'all_projects': ('foundation_app.Project',),
+    'project_detail': ('foundation_app.Project',),
+    'podcast_list': ('foundation_app.Podcast',),
+    'video_list': ('foundation_app.Video',),
+    'newspaper_cuttings': ('foundation_app.NewspaperCutting',),
+    'event_photos': ('foundation_app.EventPhoto',),
+    'reviews': ('foundation_app.Review',),
+    'search': (
+        'foundation_app.News', 'foundation_app.Project', 'foundation_app.Podcast',
+        'foundation_app.Video', 'foundation_app.GalleryImage', 'foundation_app.Review',
+    ),
+}
+
+# Free-text parameters: a page carrying one isn't cached (it still gets an
+# ETag), or every visitor's query would get its own entry and evict the pages
+# the cache is for.
+UNCACHED_PARAMS = {
+    'search': ('q',),
+}
+
+# Query parameters the cached views read; nothing else varies a cached page.
+# A cached view that starts reading another parameter must be listed here.
+CACHE_KEY_PARAMS = ('cursor', 'page', 'q')
+
+KEY_PREFIX = 'pcf:resp'
+
+
+def _cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def _timeout():
+    return getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+
+
+def views_for_model(model):
+    label = model._meta.label
+    return [name for name, labels in VIEW_DEPENDENCIES.items() if label in labels]
+
+
+def dependent_models():
+    labels = {label for labels in VIEW_DEPENDENCIES.values() for label in labels}
+    return [apps.get_model(label) for label in sorted(labels)]
+
+
+def _generation(url_name):
+    # Stamps are timestamps rather than counters, so an evicted stamp can never
+    # come back with a value that matches entries written before it was bumped.
+    cache = _cache()
+    key = f'{KEY_PREFIX}:gen:{url_name}'
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def invalidate_views(url_names):
+    cache = _cache()
+    stamp = time.time_ns()
+    cache.set_many({f'{KEY_PREFIX}:gen:{name}': stamp for name in url_names}, None)
+
+
+def invalidate_model(model, instance=None):
+    """
+    Drop cached pages of every view that depends on ``model``, bump its version
+    stamp and mark its exported static pages stale (only ``instance``'s own
+    detail page, when given).
+    """
+    from . import static_site, versions
+
+    invalidate_views(views_for_model(model))
+    if views_for_model(model):
+        versions.bump(model)
+        static_site.mark_stale(model, instance)
+
+
+def invalidate_all():
+    """For bulk changes that skip signals: drop every cached page, version stamp and static page."""
+    from . import static_site, versions
+
+    invalidate_views(VIEW_DEPENDENCIES)
+    versions.bump(*dependent_models())
+    static_site.mark_all_stale()
+
+
+def _count(url_name, outcome):
+    cache = _cache()
+    key = f'{KEY_PREFIX}:stats:{url_name}:{outcome}'
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr(); losing one sample is fine.
+        pass
+
+
+def response_cache_stats():
+    """``{url_name: {"hit": n, "miss": n}}`` for every cached view."""
+    cache = _cache()
+    keys = [f'{KEY_PREFIX}:stats:{name}:{outcome}' for name in VIEW_DEPENDENCIES for outcome in ('hit', 'miss')]
+    values = cache.get_many(keys)
+    return {
+        name: {outcome: values.get(f'{KEY_PREFIX}:stats:{name}:{outcome}', 0) for outcome in ('hit', 'miss')}
+        for name in VIEW_DEPENDENCIES
+    }
+
+
+def reset_response_cache_stats():
+    _cache().delete_many(
+        [f'{KEY_PREFIX}:stats:{name}:{outcome}' for name in VIEW_DEPENDENCIES for outcome in ('hit', 'miss')]
+    )
+
+
+def page_query(request):
+    """The part of the query string that decides what a cached view renders."""
+    return [[name, request.GET.getlist(name)] for name in CACHE_KEY_PARAMS if name in request.GET]
+
+
+def _cache_key(url_name, args, kwargs, request):
+    identity = json.dumps(
+        [request.method == 'HEAD', list(args), sorted(kwargs.items()), page_query(request)],
+        default=str,
+    )
+    digest = hashlib.md5(identity.encode(), usedforsecurity=False).hexdigest()
+    return f'{KEY_PREFIX}:page:{url_name}:{_generation(url_name)}:{digest}'
+
+
+def _caches(url_name, request):
+    if url_name not in VIEW_DEPENDENCIES:
+        return False
+    return not any(request.GET.get(name, '').strip() for name in UNCACHED_PARAMS.get(url_name, ()))
+
+
+def is_cacheable_request(request):
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if request.user.is_authenticated:
+        return False
+    # Pages carrying flash messages are one-off.
+    return len(get_messages(request)) == 0
+
+
+async def ais_cacheable_request(request):
+    """:func:`is_cacheable_request` for async code."""
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if (await request.auser()).is_authenticated:
+        return False
+    # auser() loaded the session, so reading messages stored in it runs no query.
+    return len(get_messages(request)) == 0
+
+
+def _is_cacheable_response(request, response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        # A CSRF token was rendered into the page; it must not be shared.
+        and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+    )
+
+
+def _lookup(url_name, args, kwargs, request):
+    """``(key, cached response or None)``, counting the hit or miss."""
+    key = _cache_key(url_name, args, kwargs, request)
+    response = _cache().get(key)
+    if response is not None:
+        _count(url_name, 'hit')
+        response['X-Response-Cache'] = 'HIT'
+    else:
+        _count(url_name, 'miss')
+    return key, response
+
+
+def _remember(key, request, response):
+    def _store(rendered):
+        if _is_cacheable_response(request, rendered):
+            _cache().set(key, rendered, _timeout())
+
+    if hasattr(response, 'render') and callable(response.render) and not response.is_rendered:
+        response.add_post_render_callback(_store)
+    else:
+        _store(response)
+    response['X-Response-Cache'] = 'MISS'
+    return response
+
+
+def cache_anonymous_page(view_func):
+    """
+    Serve anonymous GETs of a view listed in VIEW_DEPENDENCIES from the cache
+    (except those with an UNCACHED_PARAMS parameter set).
+
+    Adds an ``X-Response-Cache: HIT|MISS`` header and keeps per-view hit/miss
+    counters (see ``manage.py response_cache_stats``). Works on async views too.
+    """
+    if iscoroutinefunction(view_func):
+        async def _wrapped_view(request, *args, **kwargs):
+            match = request.resolver_match
+            url_name = match.url_name if match else None
+            if not _caches(url_name, request) or not await ais_cacheable_request(request):
+                return await view_func(request, *args, **kwargs)
+
+            key, response = await sync_to_async(_lookup)(url_name, args, kwargs, request)
+            if response is not None:
+                return response
+            return _remember(key, request, await view_func(request, *args, **kwargs))
+    else:
+        def _wrapped_view(request, *args, **kwargs):
+            match = request.resolver_match
+            url_name = match.url_name if match else None
+            if not _caches(url_name, request) or not is_cacheable_request(request):
+                return view_func(request, *args, **kwargs)
+
+            key, response = _lookup(url_name, args, kwargs, request)
+            if response is not None:
+                return response
+            return _remember(key, request, view_func(request, *args, **kwargs))
+
+    return wraps(view_func)(_wrapped_view)
@@ -0,0 +1,46 @@
+# foundation_app/routers.py
+"""
+Primary/replica routing for foundation_app.
+
+Reads go to the replica alias when one is configured; writes, migrations and
+anything inside a transaction go to the primary. After a client writes,
+``ReplicaPinningMiddleware`` pins its reads to the primary for
+``REPLICA_PIN_SECONDS`` so people see their own changes despite replica lag.
+"""
+import contextvars
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# True while the current request must read from the primary.
+pinned_to_primary = contextvars.ContextVar('pinned_to_primary', default=False)
+# Set by the router when the current request writes.
+wrote_to_primary = contextvars.ContextVar('wrote_to_primary', default=False)
+
+
+def replica_alias():
+    alias = getattr(settings, 'REPLICA_DATABASE_ALIAS', 'replica')
+    return alias if alias in settings.DATABASES else None
+
+
+class PrimaryReplicaRouter:
+    app_label = 'foundation_app'
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != self.app_label:
+            return None
+        replica = replica_alias()
+        if replica is None or pinned_to_primary.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return replica
+
+    def db_for_write(self, model, **hints):
+        wrote_to_primary.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,229 @@
+# foundation_app/search.py
+"""
+Site search on an SQLite FTS5 index.
+
+All searchable models share one FTS5 table. A row's rowid is
+``pk * KIND_SLOTS + kind`` so updating or removing a document is a rowid
+lookup, and results can be grouped back into models without a join. Save and
+delete signals keep the index current; ``manage.py rebuild_search_index``
+recreates it from scratch.
+
+On other databases ``search_available()`` is False and callers fall back to
+plain ``icontains`` lookups.
+"""
+import html
+import re
+from collections import namedtuple
+
+from django.apps import apps
+from django.db import connections, router
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.urls import reverse
+
+TABLE = 'foundation_app_search'
+KIND_SLOTS = 16
+
+# kind is part of every rowid: never renumber an entry, only add new ones.
+Searchable = namedtuple('Searchable', 'kind title_fields body_fields public')
+
+SEARCHABLE = {
+    'foundation_app.News': Searchable(1, ('title',), ('content',), True),
+    'foundation_app.Project': Searchable(2, ('title',), ('description',), True),
+    'foundation_app.Podcast': Searchable(3, ('title',), ('description',), True),
+    'foundation_app.Video': Searchable(4, ('title',), ('url',), True),
+    'foundation_app.GalleryImage': Searchable(5, ('title',), ('description',), True),
+    'foundation_app.Review': Searchable(6, ('title',), (), True),
+    # Admin search only.
+    'foundation_app.ContactMessage': Searchable(7, ('name', 'email', 'subject'), ('message',), False),
+}
+
+# Sentinels around matches; swapped for <mark> after the text is escaped.
+_OPEN, _CLOSE = '\x02', '\x03'
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def searchable_models():
+    return [apps.get_model(label) for label in SEARCHABLE]
+
+
+def _config(model):
+    return SEARCHABLE.get(model._meta.label)
+
+
+def _connection(model, write=False):
+    # Only index maintenance asks for the write alias: the router pins a
+    # client's reads to the primary once a request has asked for it.
+    return connections[router.db_for_write(model) if write else router.db_for_read(model)]
+
+
+def search_available(model=None):
+    model = model or apps.get_model('foundation_app.News')
+    return _connection(model).vendor == 'sqlite'
+
+
+def _text(obj, fields):
+    return ' '.join(str(value) for value in (getattr(obj, f) for f in fields) if value)
+
+
+def _rowid(kind, pk):
+    return pk * KIND_SLOTS + kind
+
+
+# Index maintenance ----------------------------------------------------------------
+
+def index_objects(model, objs):
+    config = _config(model)
+    if config is None or not search_available(model):
+        return
+    rows = [(_rowid(config.kind, obj.pk), _text(obj, config.title_fields), _text(obj, config.body_fields)) for obj in objs]
+    if not rows:
+        return
+    with _connection(model, write=True).cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {TABLE} WHERE rowid = %s', [(rowid,) for rowid, _, _ in rows])
+        cursor.executemany(f'INSERT INTO {TABLE} (rowid, title, body) VALUES (%s, %s, %s)', rows)
+
+
+def unindex_object(model, pk):
+    config = _config(model)
+    if config is None or not search_available(model):
+        return
+    with _connection(model, write=True).cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [_rowid(config.kind, pk)])
+
+
+def rebuild_index(chunk_size=500):
+    """Empty the index and re-add every searchable row. Returns the number indexed."""
+    total = 0
+    models = searchable_models()
+    if not search_available(models[0]):
+        return 0
+    with _connection(models[0], write=True).cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+    for model in models:
+        config = _config(model)
+        fields = ('pk',) + config.title_fields + config.body_fields
+        batch = []
+        for obj in model._default_manager.only(*fields).iterator(chunk_size=chunk_size):
+            batch.append(obj)
+            if len(batch) >= chunk_size:
+                index_objects(model, batch)
+                total += len(batch)
+                batch = []
+        index_objects(model, batch)
+        total += len(batch)
+    with _connection(models[0], write=True).cursor() as cursor:
+        cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+    return total
+
+
+# Querying ----------------------------------------------------------------------
+
+def to_match_query(text):
+    """
+    Turn free text into a safe FTS5 query: every word must match, the last
+    one as a prefix so results appear while typing. Returns '' if nothing
+    searchable is left.
+    """
+    tokens = _TOKEN_RE.findall(text)[:16]
+    if not tokens:
+        return ''
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def _marked(fragment):
+    return html.escape(fragment).replace(_OPEN, '<mark>').replace(_CLOSE, '</mark>')
+
+
+SearchResult = namedtuple('SearchResult', 'object kind title_html snippet_html url')
+
+RESULT_URLS = {
+    'foundation_app.News': lambda obj: reverse('foundation_app:news_detail', args=[obj.pk]),
+    'foundation_app.Project': lambda obj: reverse('foundation_app:project_detail', args=[obj.pk]),
+    'foundation_app.Podcast': lambda obj: obj.link,
+    'foundation_app.Video': lambda obj: obj.url or reverse('foundation_app:video_list'),
+    'foundation_app.GalleryImage': lambda obj: reverse('foundation_app:gallery'),
+    'foundation_app.Review': lambda obj: reverse('foundation_app:reviews'),
+}
+
+
+def search(text, limit=20, offset=0):
+    """
+    Ranked public results for ``text`` as a list of :class:`SearchResult`.
+    Titles weigh ten times more than body text in the ranking.
+    """
+    query = to_match_query(text)
+    if not query:
+        return []
+    public = {config.kind: label for label, config in SEARCHABLE.items() if config.public}
+    kinds = ', '.join(str(kind) for kind in public)
+    sql = (
+        f"SELECT rowid, highlight({TABLE}, 0, %s, %s), snippet({TABLE}, 1, %s, %s, '…', 24) "
+        f"FROM {TABLE} WHERE {TABLE} MATCH %s AND (rowid %% {KIND_SLOTS}) IN ({kinds}) "
+        f"ORDER BY bm25({TABLE}, 10.0, 1.0) LIMIT %s OFFSET %s"
+    )
+    with _connection(apps.get_model('foundation_app.News')).cursor() as cursor:
+        cursor.execute(sql, [_OPEN, _CLOSE, _OPEN, _CLOSE, query, limit, offset])
+        hits = cursor.fetchall()
+
+    wanted = {}
+    for rowid, _, _ in hits:
+        wanted.setdefault(rowid % KIND_SLOTS, []).append(rowid // KIND_SLOTS)
+    objects = {
+        kind: apps.get_model(public[kind])._default_manager.in_bulk(pks)
+        for kind, pks in wanted.items()
+    }
+
+    results = []
+    for rowid, title, snippet in hits:
+        kind, pk = rowid % KIND_SLOTS, rowid // KIND_SLOTS
+        obj = objects[kind].get(pk)
+        if obj is None:
+            continue  # deleted since it was indexed
+        results.append(SearchResult(
+            obj, obj._meta.verbose_name, _marked(title), _marked(snippet), RESULT_URLS[public[kind]](obj),
+        ))
+    return results
+
+
+def fallback_search(text, limit=20, offset=0):
+    """``icontains`` search for databases without FTS5; newest first within each model."""
+    text = text.strip()
+    if not text:
+        return []
+    results = []
+    for label, config in SEARCHABLE.items():
+        if not config.public:
+            continue
+        model = apps.get_model(label)
+        condition = Q()
+        for field in config.title_fields + config.body_fields:
+            condition |= Q(**{f'{field}__icontains': text})
+        for obj in model._default_manager.filter(condition)[:limit + offset]:
+            title = html.escape(_text(obj, config.title_fields))
+            body = html.escape(_text(obj, config.body_fields)[:200])
+            results.append(SearchResult(obj, model._meta.verbose_name, title, body, RESULT_URLS[label](obj)))
+    return results[offset:offset + limit]
+
+
+def filter_queryset(queryset, text):
+    """Restrict ``queryset`` to rows of its model matching ``text``, using one indexed subquery."""
+    config = _config(queryset.model)
+    query = to_match_query(text)
+    if not query:
+        return queryset.none()
+    return queryset.filter(pk__in=RawSQL(
+        f'SELECT rowid / {KIND_SLOTS} FROM {TABLE} WHERE {TABLE} MATCH %s AND rowid %% {KIND_SLOTS} = %s',
+        [query, config.kind],
+    ))
+
+
+class IndexedSearchAdminMixin:
+    """Admin search through the FTS5 index instead of ``LIKE '%…%'`` over ``search_fields``."""
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term or _config(queryset.model) is None or not search_available(queryset.model):
+            return super().get_search_results(request, queryset, search_term)
+        return filter_queryset(queryset, search_term), False
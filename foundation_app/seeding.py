@@ -0,0 +1,412 @@
+# foundation_app/seeding.py
+"""
+Synthetic data at production scale for ``manage.py seed_scale``.
+
+Every model gets its own ``random.Random`` derived from the seed, so the
+same seed and counts on the same database produce the same rows, and changing
+one model's count doesn't reshuffle the others.
+
+Rows are plain dicts inserted in chunks by :func:`bulk_insert`, which skips
+model instances and per-object SQL compilation (``bulk_create`` tops out
+around 10k rows/s here) but still prepares values through each field, so
+dates and decimals are stored exactly as the ORM would store them. Dates
+follow a recent-heavy spread rather than all being "now", and text is sliced
+from one pre-built corpus; together that keeps a million rows under a minute.
+"""
+import io
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from .models import (
+    Campaign, CampaignTotalShard, ContactMessage, Donation, EventPhoto, GalleryImage, News,
+    NewspaperCutting, PaymentWebhookEvent, Podcast, Project, Review, Video, Volunteer,
+)
+
+# Rows per model at --scale 1.
+DEFAULT_COUNTS = {
+    'user': 20_000,
+    'contactmessage': 1_000_000,
+    'volunteer': 1_000_000,
+    'campaign': 20_000,
+    'donation': 200_000,
+    'news': 5_000,
+    'project': 2_000,
+    'podcast': 1_000,
+    'video': 2_000,
+    'newspapercutting': 2_000,
+    'eventphoto': 10_000,
+    'review': 2_000,
+    'galleryimage': 5_000,
+}
+
+SEED_PASSWORD = 'seed-password'
+HISTORY_DAYS = 5 * 365
+PLACEHOLDER_DIR = 'seed'
+
+_WORDS = (
+    "water school village health camp children education women support community food ration "
+    "clean drive volunteer teacher books library solar lamp farmer seeds training skills medical "
+    "doctor clinic blood donation tree plantation awareness rally meeting district block panchayat "
+    "girls scholarship computer literacy nutrition mid-day meal hygiene sanitation toilet well "
+    "borewell pump filter monsoon relief flood shelter blankets winter clothes festival celebration "
+    "elderly care pension widow livelihood tailoring stitching self-help group savings loan market "
+    "rural urban slum street animals stray shelter vaccination sports coaching cricket football"
+).split()
+_FIRST_NAMES = (
+    "Aarav Vivaan Aditya Vihaan Arjun Sai Reyansh Krishna Ishaan Rohan Ananya Diya Aadhya Saanvi "
+    "Pari Anika Navya Myra Sara Priya Rahul Amit Sunita Pooja Neha Vikram Kavita Ravi Anjali Deepak"
+).split()
+_LAST_NAMES = (
+    "Sharma Verma Gupta Singh Kumar Yadav Patel Jain Agarwal Mehta Chauhan Joshi Mishra Pandey "
+    "Reddy Nair Iyer Das Bose Khan Saxena Thakur Rawat Bansal Malhotra"
+).split()
+_SUBJECTS = [
+    None, "Partnership", "Volunteering", "Donation receipt", "Media enquiry", "Internship",
+    "Feedback", "CSR collaboration", "Event invitation",
+]
+_AVAILABILITY = [("Weekends", 45), ("Evenings", 25), ("Weekdays", 15), ("Full-time", 5), (None, 10)]
+
+
+# Helpers ---------------------------------------------------------------------------
+
+def rng_for(seed, name):
+    return random.Random(f'{seed}:{name}')
+
+
+class Corpus:
+    """A long pseudo-sentence stream; text of any length is a slice of it."""
+
+    def __init__(self, rng, words=200_000):
+        self.text = ' '.join(rng.choices(_WORDS, k=words))
+        self.size = len(self.text)
+
+    def take(self, rng, length):
+        length = max(1, min(length, self.size - 1))
+        start = self.text.find(' ', rng.randrange(self.size - length)) + 1  # begin on a word
+        return self.text[start:start + length].strip().capitalize() or 'Text'
+
+
+def lognormal_length(rng, median, sigma=0.8, cap=20_000):
+    """Sizes with a long tail: most rows short, a few very long."""
+    return min(cap, int(rng.lognormvariate(0, sigma) * median) + 1)
+
+
+def recent_heavy_dates(rng, count, until, days=HISTORY_DAYS):
+    """``count`` datetimes in ascending order up to ``until``, denser towards it (like a growing site)."""
+    # rng.random() ** 2 piles ages up near zero, i.e. most rows are recent.
+    ages = sorted((rng.random() ** 2 * days for _ in range(count)), reverse=True)
+    return [until - timedelta(days=age) for age in ages]
+
+
+# Columns whose Python values the database drivers take as they are.
+_PASSTHROUGH_TYPES = {
+    'AutoField', 'BigAutoField', 'BigIntegerField', 'BooleanField', 'CharField', 'EmailField',
+    'FileField', 'ForeignKey', 'ImageField', 'IntegerField', 'PositiveSmallIntegerField',
+    'SlugField', 'TextField', 'URLField',
+}
+
+
+def bulk_insert(model, rows):
+    """
+    Insert ``rows`` (dicts keyed by field attname, all with the same keys) in one
+    ``executemany``. Fields missing from the rows get their default, evaluated
+    once per call. No signals are sent and no instances are created.
+    """
+    if not rows:
+        return
+    using = router.db_for_write(model)
+    connection = connections[using]
+    given = rows[0].keys()
+    fields = [f for f in model._meta.concrete_fields if f.attname in given or not f.primary_key]
+    columns, getters = [], []
+    for field in fields:
+        value = None if field.attname in given else field.get_db_prep_save(field.get_default(), connection)
+        prepare = None if field.get_internal_type() in _PASSTHROUGH_TYPES else field.get_db_prep_save
+        columns.append(connection.ops.quote_name(field.column))
+        getters.append((field.attname, value, prepare))
+
+    values = [
+        tuple(
+            (prepare(row[name], connection) if prepare else row[name]) if name in row else default
+            for name, default, prepare in getters
+        )
+        for row in rows
+    ]
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        connection.ops.quote_name(model._meta.db_table), ', '.join(columns), ', '.join(['%s'] * len(columns)),
+    )
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        cursor.executemany(sql, values)
+
+
+def placeholder_images(rng, count=24):
+    """
+    Create (once) a pool of JPEG placeholders of assorted sizes in default
+    storage and return their names. Image rows share the pool.
+    """
+    from PIL import Image, ImageDraw
+
+    names = []
+    for index in range(count):
+        name = f'{PLACEHOLDER_DIR}/placeholder_{index:02d}.jpg'
+        width = rng.choice([640, 800, 1024, 1280, 1600, 1920])
+        height = int(width * rng.choice([0.5625, 0.66, 0.75, 1.0, 1.33]))
+        colour = tuple(rng.randrange(40, 220) for _ in range(3))
+        if not default_storage.exists(name):
+            image = Image.new('RGB', (width, height), colour)
+            draw = ImageDraw.Draw(image)
+            for _ in range(6):
+                x, y = rng.randrange(width), rng.randrange(height)
+                r = rng.randrange(20, max(21, width // 4))
+                draw.ellipse((x - r, y - r, x + r, y + r), fill=tuple(min(255, c + rng.randrange(20, 60)) for c in colour))
+            buffer = io.BytesIO()
+            image.save(buffer, 'JPEG', quality=80)
+            # Content-addressed storage returns a different name than the one asked for.
+            name = default_storage.save(name, ContentFile(buffer.getvalue()))
+        names.append(name)
+    return names
+
+
+def _person(rng):
+    return rng.choice(_FIRST_NAMES), rng.choice(_LAST_NAMES)
+
+
+def _weighted(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights=weights)[0]
+
+
+def _skewed_pick(rng, values, power=3):
+    """Pick from ``values`` favouring the start (a few popular items, a long tail)."""
+    return values[int(len(values) * rng.random() ** power)]
+
+
+# Seeder ----------------------------------------------------------------------------
+
+class Seeder:
+    def __init__(self, seed=42, chunk_size=10_000, until=None, log=None):
+        self.seed = seed
+        # Dates count back from ``until`` (default: today's midnight UTC) so a seed
+        # reproduces the same timestamps all day, and exactly with a fixed ``until``.
+        self.until = until or timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.chunk_size = chunk_size
+        self.log = log or (lambda message: None)
+        self.corpus = Corpus(rng_for(seed, 'corpus'))
+        self._images = None
+
+    def images(self):
+        if self._images is None:
+            self._images = placeholder_images(rng_for(self.seed, 'images'))
+        return self._images
+
+    def _insert(self, model, count, build):
+        """Build and insert ``count`` rows in chunks; ``build(rng, index, created)`` returns one row dict."""
+        if count <= 0:
+            return 0
+        rng = rng_for(self.seed, model._meta.label)
+        offset = model._default_manager.count()  # keeps unique fields unique across runs
+        dates = recent_heavy_dates(rng, count, self.until)
+        for start in range(0, count, self.chunk_size):
+            bulk_insert(model, [build(rng, offset + i, dates[i]) for i in range(start, min(count, start + self.chunk_size))])
+        self.log(f"{model._meta.label}: {count:,} rows")
+        return count
+
+    # One method per model, in dependency order.
+
+    def users(self, count):
+        # Hashing is slow, so every seeded user shares one hash; a fixed salt keeps it reproducible.
+        password = make_password(SEED_PASSWORD, salt=f'seedscale{self.seed}')
+
+        def build(rng, i, created):
+            first, last = _person(rng)
+            return dict(
+                username=f'seed{self.seed}_{i}', first_name=first, last_name=last,
+                email=f'{first.lower()}.{last.lower()}{i}@example.org', password=password, date_joined=created,
+            )
+        return self._insert(User, count, build)
+
+    def contact_messages(self, count):
+        def build(rng, i, created):
+            first, last = _person(rng)
+            return dict(
+                name=f'{first} {last}', email=f'{first.lower()}{i}@example.com', subject=rng.choice(_SUBJECTS),
+                message=self.corpus.take(rng, lognormal_length(rng, 300)), submitted_at=created,
+            )
+        return self._insert(ContactMessage, count, build)
+
+    def volunteers(self, count):
+        def build(rng, i, created):
+            first, last = _person(rng)
+            return dict(
+                full_name=f'{first} {last}', email=f'{first.lower()}.{last.lower()}{i}@example.com',
+                phone=f'9{rng.randrange(10 ** 8, 10 ** 9)}' if rng.random() < 0.8 else None,
+                availability=_weighted(rng, _AVAILABILITY),
+                message=self.corpus.take(rng, lognormal_length(rng, 150)) if rng.random() < 0.6 else None,
+                created_at=created, is_active=rng.random() < 0.9,
+            )
+        return self._insert(Volunteer, count, build)
+
+    def campaigns(self, count):
+        user_ids = list(User.objects.values_list('pk', flat=True))
+        if not user_ids:
+            return 0
+
+        def build(rng, i, created):
+            goal = Decimal(min(10_000_000, int(rng.lognormvariate(0, 0.9) * 500) * 100 + 1000))
+            raised = (goal * Decimal(round(rng.betavariate(1.2, 2.5), 4))).quantize(Decimal('1.00'))
+            return dict(
+                user_id=_skewed_pick(rng, user_ids, power=2), title=self.corpus.take(rng, rng.randint(20, 80)),
+                description=self.corpus.take(rng, lognormal_length(rng, 600)), goal_amount=goal,
+                raised_amount=raised, created_at=created,
+            )
+        return self._insert(Campaign, count, build)
+
+    def donations(self, count):
+        campaign_ids = list(Campaign.objects.values_list('pk', flat=True))
+        user_ids = list(User.objects.values_list('pk', flat=True))
+
+        def build(rng, i, created):
+            status = _weighted(rng, [(Donation.STATUS_CAPTURED, 80), (Donation.STATUS_CREATED, 15), (Donation.STATUS_FAILED, 5)])
+            return dict(
+                campaign_id=_skewed_pick(rng, campaign_ids) if campaign_ids and rng.random() < 0.85 else None,
+                user_id=rng.choice(user_ids) if user_ids and rng.random() < 0.7 else None,
+                amount=Decimal(max(10, int(rng.lognormvariate(0, 1.1) * 50) * 10)),
+                razorpay_order_id=f'order_seed{self.seed}_{i}',
+                razorpay_payment_id=f'pay_seed{self.seed}_{i}' if status != Donation.STATUS_CREATED else None,
+                status=status, created_at=created, updated_at=created,
+            )
+        last_pk = Donation.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        inserted = self._insert(Donation, count, build)
+        self._webhook_events(last_pk)
+        self._total_shards(campaign_ids)
+        return inserted
+
+    def _webhook_events(self, after_pk):
+        """One processed inbox row per settled donation seeded by this run."""
+        settled = Donation.objects.filter(pk__gt=after_pk).exclude(status=Donation.STATUS_CREATED).values_list('razorpay_order_id', 'razorpay_payment_id', 'status', 'created_at')
+        existing = PaymentWebhookEvent.objects.count()
+        batch = []
+        for index, (order_id, payment_id, status, created) in enumerate(settled.iterator(chunk_size=self.chunk_size)):
+            event_type = 'payment.captured' if status == Donation.STATUS_CAPTURED else 'payment.failed'
+            batch.append(dict(
+                event_id=f'evt_seed{self.seed}_{existing + index}', event_type=event_type,
+                payload=f'{{"event":"{event_type}","payload":{{"payment":{{"entity":{{"id":"{payment_id}","order_id":"{order_id}"}}}}}}}}',
+                received_at=created, processed_at=created,
+            ))
+            if len(batch) >= self.chunk_size:
+                bulk_insert(PaymentWebhookEvent, batch)
+                batch = []
+        bulk_insert(PaymentWebhookEvent, batch)
+
+    def _total_shards(self, campaign_ids):
+        """Unfolded shard rows for a slice of campaigns, as between two fold runs."""
+        rng = rng_for(self.seed, 'shards')
+        shards = [
+            CampaignTotalShard(campaign_id=campaign_id, shard=shard, amount=Decimal(rng.randrange(100, 5000)))
+            for campaign_id in campaign_ids[:len(campaign_ids) // 10]
+            for shard in rng.sample(range(8), 2)
+        ]
+        CampaignTotalShard.objects.bulk_create(shards, ignore_conflicts=True)
+
+    def news(self, count):
+        def build(rng, i, created):
+            return dict(
+                title=self.corpus.take(rng, rng.randint(30, 110)), slug=f'seed-{self.seed}-{i}',
+                content=self.corpus.take(rng, lognormal_length(rng, 2500)),
+                link='https://example.org/news' if rng.random() < 0.3 else None, created_at=created, updated_at=created,
+            )
+        return self._insert(News, count, build)
+
+    def projects(self, count):
+        images = self.images()
+
+        def build(rng, i, created):
+            return dict(
+                title=self.corpus.take(rng, rng.randint(15, 60)),
+                description=self.corpus.take(rng, lognormal_length(rng, 1200)),
+                image=rng.choice(images) if rng.random() < 0.9 else None,
+                created_at=created, updated_at=created,
+            )
+        return self._insert(Project, count, build)
+
+    def podcasts(self, count):
+        def build(rng, i, created):
+            return dict(
+                title=self.corpus.take(rng, rng.randint(20, 80)),
+                description=self.corpus.take(rng, lognormal_length(rng, 400)),
+                link=f'https://example.org/podcasts/{i}', created_at=created, updated_at=created,
+            )
+        return self._insert(Podcast, count, build)
+
+    def videos(self, count):
+        def build(rng, i, created):
+            return dict(
+                title=self.corpus.take(rng, rng.randint(20, 80)),
+                url=f'https://www.youtube.com/watch?v=seed{i:07d}', created_at=created, updated_at=created,
+                provider='youtube', provider_video_id=f'seed{i:07d}',
+                thumbnail_url=f'https://i.ytimg.com/vi/seed{i:07d}/hqdefault.jpg',
+            )
+        return self._insert(Video, count, build)
+
+    def newspaper_cuttings(self, count):
+        images = self.images()
+
+        def build(rng, i, created):
+            return dict(title=self.corpus.take(rng, rng.randint(15, 60)), image=rng.choice(images), created_at=created)
+        return self._insert(NewspaperCutting, count, build)
+
+    def event_photos(self, count):
+        images = self.images()
+
+        def build(rng, i, created):
+            return dict(image=rng.choice(images), created_at=created, updated_at=created)
+        return self._insert(EventPhoto, count, build)
+
+    def reviews(self, count):
+        images = self.images()
+
+        def build(rng, i, created):
+            return dict(
+                title=self.corpus.take(rng, rng.randint(20, 90)),
+                image=rng.choice(images) if rng.random() < 0.5 else None, created_at=created,
+            )
+        return self._insert(Review, count, build)
+
+    def gallery_images(self, count):
+        images = self.images()
+
+        def build(rng, i, created):
+            return dict(
+                title=self.corpus.take(rng, rng.randint(10, 50)),
+                description=self.corpus.take(rng, lognormal_length(rng, 120)) if rng.random() < 0.6 else None,
+                image=rng.choice(images), created_at=created, updated_at=created,
+            )
+        return self._insert(GalleryImage, count, build)
+
+    STEPS = [
+        ('user', 'users'),
+        ('contactmessage', 'contact_messages'),
+        ('volunteer', 'volunteers'),
+        ('campaign', 'campaigns'),
+        ('donation', 'donations'),
+        ('news', 'news'),
+        ('project', 'projects'),
+        ('podcast', 'podcasts'),
+        ('video', 'videos'),
+        ('newspapercutting', 'newspaper_cuttings'),
+        ('eventphoto', 'event_photos'),
+        ('review', 'reviews'),
+        ('galleryimage', 'gallery_images'),
+    ]
+
+    def run(self, counts):
+        """Seed ``{model_name: rows}``; returns the total number of rows inserted."""
+        return sum(getattr(self, method)(counts.get(name, 0)) for name, method in self.STEPS)
@@ -0,0 +1,198 @@
+# foundation_app/sessions.py
+"""
+Session engine (``SESSION_ENGINE = 'foundation_app.sessions'``): the database
+is the record, the ``SESSION_CACHE_ALIAS`` cache is shared by all processes,
+and each process keeps the sessions it used last in a small LRU in front of it.
+
+- Reads come from the LRU (for ``SESSION_LOCAL_CACHE_TIMEOUT`` seconds), then
+  the shared cache, then ``django_session``.
+- A save writes the row only if the session data changed, or its expiry is
+  due for renewal. Expiry is renewed lazily: once the stored expiry is more
+  than ``SESSION_RENEW_AFTER`` seconds old, the next request saves it again.
+  In between, a session can end up to that long before its cookie does.
+- Expired rows are deleted ``SESSION_CLEANUP_BATCH`` at a time, now and then
+  after a write (``SESSION_CLEANUP_PROBABILITY``) and by ``clearsessions``,
+  instead of in one statement over the whole table.
+
+A session deleted in one process (logout) can still be read from another
+process's LRU until its entry times out, so keep that timeout short.
+"""
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+KEY_PREFIX = 'foundation_app.sessions'
+
+
+class LocalSessionCache:
+    """Thread-safe LRU of ``session_key -> (payload, expires)`` whose entries live ``timeout`` seconds."""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        size = getattr(settings, 'SESSION_LOCAL_CACHE_SIZE', 1000)
+        timeout = getattr(settings, 'SESSION_LOCAL_CACHE_TIMEOUT', 2)
+        if size <= 0 or timeout <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_cache = LocalSessionCache()
+
+
+def _renew_after():
+    return getattr(settings, 'SESSION_RENEW_AFTER', 60 * 60 * 24)
+
+
+class SessionStore(DBStore):
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key=None):
+        self._cache = caches[settings.SESSION_CACHE_ALIAS]
+        super().__init__(session_key)
+        # Serialized data as loaded, to tell whether a save changes anything.
+        self._loaded_payload = None
+        self._renewal_due = False
+
+    def _cache_key(self, session_key):
+        return self.cache_key_prefix + session_key
+
+    def _fetch(self, session_key):
+        """``(payload, expires)`` from the LRU, the shared cache or the database; None if there's no row."""
+        entry = local_cache.get(session_key)
+        if entry is not None:
+            return entry
+        try:
+            entry = self._cache.get(self._cache_key(session_key))
+        except Exception:
+            # Some backends raise on invalid keys; treat it as a miss (as cached_db does).
+            entry = None
+        if entry is None:
+            s = self._get_session_from_db()
+            if s is None:
+                return None
+            entry = (self.serializer().dumps(self.decode(s.session_data)), s.expire_date.timestamp())
+            self._cache.set(self._cache_key(session_key), entry, self.get_expiry_age(expiry=s.expire_date))
+        local_cache.set(session_key, entry)
+        return entry
+
+    def _due_for_renewal(self, data, expires):
+        expiry = data.get('_session_expiry')
+        if expiry is not None and not isinstance(expiry, int):
+            return False  # a fixed date (set_expiry(datetime)) is never renewed
+        age = expiry or self.get_session_cookie_age()
+        return expires - time.time() < age - _renew_after()
+
+    def load(self):
+        session_key = self.session_key
+        entry = self._fetch(session_key) if session_key else None
+        if entry is None or entry[1] <= time.time():
+            self._session_key = None
+            return {}
+        payload, expires = entry
+        data = self.serializer().loads(payload)
+        self._loaded_payload = payload
+        if self._due_for_renewal(data, expires):
+            # The session middleware saves modified sessions, which renews the row and the cookie.
+            self._renewal_due = self.modified = True
+        return data
+
+    def exists(self, session_key):
+        if local_cache.get(session_key) is not None or self._cache.has_key(self._cache_key(session_key)):
+            return True
+        return super().exists(session_key)
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        data = self._get_session(no_load=must_create)
+        payload = self.serializer().dumps(data)
+        if not must_create and not self._renewal_due and payload == self._loaded_payload:
+            return
+        super().save(must_create=must_create)
+        expiry = self.get_expiry_date()
+        entry = (payload, expiry.timestamp())
+        self._cache.set(self._cache_key(self.session_key), entry, self.get_expiry_age(expiry=expiry))
+        local_cache.set(self.session_key, entry)
+        self._loaded_payload = payload
+        self._renewal_due = False
+        if random.random() < getattr(settings, 'SESSION_CLEANUP_PROBABILITY', 0.01):
+            transaction.on_commit(self.delete_expired_batch)
+
+    def delete(self, session_key=None):
+        if session_key is None:
+            if self.session_key is None:
+                return
+            session_key = self.session_key
+        super().delete(session_key)
+        self._cache.delete(self._cache_key(session_key))
+        local_cache.delete(session_key)
+
+    # The async API (request.auser() under ASGI) goes through the same layers.
+    async def aload(self):
+        return await sync_to_async(self.load)()
+
+    async def aexists(self, session_key):
+        return await sync_to_async(self.exists)(session_key)
+
+    async def asave(self, must_create=False):
+        return await sync_to_async(self.save)(must_create)
+
+    async def adelete(self, session_key=None):
+        return await sync_to_async(self.delete)(session_key)
+
+    @classmethod
+    def delete_expired_batch(cls, batch_size=None):
+        """Delete up to ``batch_size`` expired rows, oldest first; returns how many went."""
+        batch_size = batch_size or getattr(settings, 'SESSION_CLEANUP_BATCH', 500)
+        manager = cls.get_model_class().objects
+        keys = list(
+            manager.filter(expire_date__lt=timezone.now())
+            .order_by('expire_date').values_list('pk', flat=True)[:batch_size]
+        )
+        if not keys:
+            return 0
+        return manager.filter(pk__in=keys).delete()[0]
+
+    @classmethod
+    def clear_expired(cls):
+        """Used by ``manage.py clearsessions``; a batch per statement keeps each write lock short."""
+        while cls.delete_expired_batch():
+            pass
+
+    @classmethod
+    async def aclear_expired(cls):
+        await sync_to_async(cls.clear_expired)()
@@ -0,0 +1,115 @@
+# foundation_app/signals.py
+from django.apps import apps
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from . import imaging, placeholders, response_cache, search, storage, timing, video_embeds
+
+
+def refresh_image_derivatives(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    imaging.refresh_instance_derivatives(instance)
+
+
+def remove_image_derivatives(sender, instance, **kwargs):
+    imaging.delete_derivatives(instance.image_derivatives)
+
+
+def remember_replaced_files(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        return
+    fields = storage.blob_fields(sender)
+    old = sender._default_manager.filter(pk=instance.pk).values(*[f.attname for f in fields]).first()
+    if old:
+        instance._replaced_files = [
+            (field, old[field.attname]) for field in fields
+            if old[field.attname] and old[field.attname] != getattr(instance, field.attname).name
+        ]
+
+
+def release_replaced_files(sender, instance, raw=False, **kwargs):
+    for field, name in instance.__dict__.pop('_replaced_files', ()):
+        field.storage.delete(name)
+
+
+def release_files(sender, instance, **kwargs):
+    for field in storage.blob_fields(sender):
+        name = getattr(instance, field.attname).name
+        if name:
+            field.storage.delete(name)
+
+
+def fill_image_placeholder(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    placeholders.fill_from_upload(instance)
+
+
+def parse_video_url(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    instance._fetch_video_metadata = video_embeds.parse_on_save(instance)
+
+
+def fetch_video_metadata(sender, instance, raw=False, **kwargs):
+    if raw or not getattr(instance, '_fetch_video_metadata', False):
+        return
+    instance._fetch_video_metadata = False
+    video_embeds.schedule_refresh(instance.pk)
+
+
+def invalidate_cached_pages(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    response_cache.invalidate_model(sender, instance)
+
+
+def update_search_index(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    search.index_objects(sender, [instance])
+
+
+def remove_from_search_index(sender, instance, **kwargs):
+    search.unindex_object(sender, instance.pk)
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def connect_signals():
+    connection_created.connect(apply_sqlite_pragmas, dispatch_uid='sqlite-pragmas')
+    # Before any connection opens, so connections held by sync_to_async threads are timed too.
+    connection_created.connect(timing.attach_query_timer, dispatch_uid='request-timings-queries')
+
+    for model in imaging.responsive_image_models():
+        post_save.connect(refresh_image_derivatives, sender=model, dispatch_uid=f'derivatives-save-{model._meta.label}')
+        post_delete.connect(remove_image_derivatives, sender=model, dispatch_uid=f'derivatives-delete-{model._meta.label}')
+
+    # Blobs are shared, so files are only released through their reference counts.
+    for model, _ in storage.content_addressed_fields():
+        pre_save.connect(remember_replaced_files, sender=model, dispatch_uid=f'blob-replace-{model._meta.label}')
+        post_save.connect(release_replaced_files, sender=model, dispatch_uid=f'blob-release-{model._meta.label}')
+        post_delete.connect(release_files, sender=model, dispatch_uid=f'blob-delete-{model._meta.label}')
+
+    for model in placeholders.placeholder_models():
+        pre_save.connect(fill_image_placeholder, sender=model, dispatch_uid=f'placeholder-save-{model._meta.label}')
+
+    Video = apps.get_model('foundation_app', 'Video')
+    pre_save.connect(parse_video_url, sender=Video, dispatch_uid='video-embed-parse')
+    post_save.connect(fetch_video_metadata, sender=Video, dispatch_uid='video-embed-fetch')
+
+    for model in response_cache.dependent_models():
+        post_save.connect(invalidate_cached_pages, sender=model, dispatch_uid=f'response-cache-save-{model._meta.label}')
+        post_delete.connect(invalidate_cached_pages, sender=model, dispatch_uid=f'response-cache-delete-{model._meta.label}')
+
+    for model in search.searchable_models():
+        post_save.connect(update_search_index, sender=model, dispatch_uid=f'search-save-{model._meta.label}')
+        post_delete.connect(remove_from_search_index, sender=model, dispatch_uid=f'search-delete-{model._meta.label}')
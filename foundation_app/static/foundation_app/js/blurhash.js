@@ -0,0 +1,103 @@
+// Paints <img data-blurhash="..."> with its blurred preview until the real image loads.
+// Decoder follows the reference implementation at https://blurha.sh.
+(function () {
+    const DIGITS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~';
+    const PREVIEW_SIZE = 32;
+
+    function decode83(text) {
+        let value = 0;
+        for (const character of text) {
+            value = value * 83 + DIGITS.indexOf(character);
+        }
+        return value;
+    }
+
+    function toLinear(value) {
+        const v = value / 255;
+        return v <= 0.04045 ? v / 12.92 : Math.pow((v + 0.055) / 1.055, 2.4);
+    }
+
+    function toSRGB(value) {
+        const v = Math.max(0, Math.min(1, value));
+        return v <= 0.0031308 ? Math.round(v * 12.92 * 255 + 0.5) : Math.round((1.055 * Math.pow(v, 1 / 2.4) - 0.055) * 255 + 0.5);
+    }
+
+    function signPow(value, exponent) {
+        return Math.sign(value) * Math.pow(Math.abs(value), exponent);
+    }
+
+    function decode(hash, width, height) {
+        const sizeFlag = decode83(hash[0]);
+        const xComponents = (sizeFlag % 9) + 1;
+        const yComponents = Math.floor(sizeFlag / 9) + 1;
+        const maximum = (decode83(hash[1]) + 1) / 166;
+
+        const colors = [];
+        for (let i = 0; i < xComponents * yComponents; i++) {
+            if (i === 0) {
+                const dc = decode83(hash.substring(2, 6));
+                colors.push([toLinear(dc >> 16), toLinear((dc >> 8) & 255), toLinear(dc & 255)]);
+            } else {
+                const ac = decode83(hash.substring(4 + i * 2, 6 + i * 2));
+                colors.push([
+                    signPow((Math.floor(ac / 361) - 9) / 9, 2) * maximum,
+                    signPow(((Math.floor(ac / 19) % 19) - 9) / 9, 2) * maximum,
+                    signPow(((ac % 19) - 9) / 9, 2) * maximum,
+                ]);
+            }
+        }
+
+        const pixels = new Uint8ClampedArray(width * height * 4);
+        for (let y = 0; y < height; y++) {
+            for (let x = 0; x < width; x++) {
+                let r = 0, g = 0, b = 0;
+                for (let j = 0; j < yComponents; j++) {
+                    for (let i = 0; i < xComponents; i++) {
+                        const basis = Math.cos((Math.PI * x * i) / width) * Math.cos((Math.PI * y * j) / height);
+                        const color = colors[i + j * xComponents];
+                        r += color[0] * basis;
+                        g += color[1] * basis;
+                        b += color[2] * basis;
+                    }
+                }
+                const offset = 4 * (x + y * width);
+                pixels[offset] = toSRGB(r);
+                pixels[offset + 1] = toSRGB(g);
+                pixels[offset + 2] = toSRGB(b);
+                pixels[offset + 3] = 255;
+            }
+        }
+        return pixels;
+    }
+
+    function preview(img) {
+        const ratio = (img.getAttribute('width') / img.getAttribute('height')) || 1;
+        const width = ratio >= 1 ? PREVIEW_SIZE : Math.max(1, Math.round(PREVIEW_SIZE * ratio));
+        const height = ratio >= 1 ? Math.max(1, Math.round(PREVIEW_SIZE / ratio)) : PREVIEW_SIZE;
+        const canvas = document.createElement('canvas');
+        canvas.width = width;
+        canvas.height = height;
+        const context = canvas.getContext('2d');
+        context.putImageData(new ImageData(decode(img.dataset.blurhash, width, height), width, height), 0, 0);
+        return canvas.toDataURL();
+    }
+
+    function paint(img) {
+        if (img.complete && img.naturalWidth) {
+            return;
+        }
+        try {
+            img.style.backgroundImage = `url(${preview(img)})`;
+            img.style.backgroundSize = 'cover';
+        } catch (error) {
+            return;  // a malformed hash just leaves the dominant colour
+        }
+        img.addEventListener('load', () => {
+            img.style.backgroundImage = '';
+            img.style.backgroundColor = '';
+        }, { once: true });
+    }
+
+    window.PCFBlurhash = { decode };
+    document.querySelectorAll('img[data-blurhash]').forEach(paint);
+})();
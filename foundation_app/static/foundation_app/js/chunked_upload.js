@@ -0,0 +1,154 @@
+// Uploads <input type="file" data-chunked-upload> in resumable chunks (see foundation_app/uploads.py)
+// and posts only the upload session id with the admin form. Interrupted chunks are retried from the
+// offset the server reports; choosing the same file again after a reload resumes the same session.
+(function () {
+    const MAX_RETRIES = 8;
+    const HASH_WAIT_SECONDS = 120;
+
+    function csrfToken(form) {
+        const input = form && form.querySelector('input[name="csrfmiddlewaretoken"]');
+        return input ? input.value : '';
+    }
+
+    function base64(buffer) {
+        let binary = '';
+        for (const byte of new Uint8Array(buffer)) {
+            binary += String.fromCharCode(byte);
+        }
+        return btoa(binary);
+    }
+
+    function sleep(ms) {
+        return new Promise((resolve) => setTimeout(resolve, ms));
+    }
+
+    function resumeKey(input, file) {
+        return `chunked-upload:${input.dataset.target}:${file.name}:${file.size}:${file.lastModified}`;
+    }
+
+    async function request(url, options, token) {
+        const headers = Object.assign({'X-CSRFToken': token}, options.headers || {});
+        return fetch(url, Object.assign({}, options, {headers, credentials: 'same-origin'}));
+    }
+
+    async function openSession(input, file, token) {
+        const saved = localStorage.getItem(resumeKey(input, file));
+        if (saved) {
+            const response = await request(saved, {method: 'GET'}, token).catch(() => null);
+            if (response && response.ok) {
+                return response.json();
+            }
+        }
+        const body = new FormData();
+        body.append('target', input.dataset.target);
+        body.append('filename', file.name);
+        body.append('size', file.size);
+        body.append('content_type', file.type);
+        const response = await request(input.dataset.chunkedUpload, {method: 'POST', body}, token);
+        if (!response.ok) {
+            throw new Error((await response.json().catch(() => ({}))).error || `HTTP ${response.status}`);
+        }
+        const session = await response.json();
+        localStorage.setItem(resumeKey(input, file), session.url);
+        return session;
+    }
+
+    async function upload(input, file, report) {
+        const token = csrfToken(input.form);
+        const session = await openSession(input, file, token);
+        let offset = session.offset;
+        let failures = 0;
+        while (offset < file.size) {
+            report(offset);
+            const chunk = await file.slice(offset, offset + session.chunk_size).arrayBuffer();
+            const digest = await crypto.subtle.digest('SHA-256', chunk);
+            const response = await request(session.url, {
+                method: 'PUT',
+                body: chunk,
+                headers: {
+                    'Content-Type': 'application/offset+octet-stream',
+                    'Upload-Offset': String(offset),
+                    'Upload-Checksum': `sha256 ${base64(digest)}`,
+                },
+            }, token).catch(() => null);
+            if (response && response.ok) {
+                offset = Number(response.headers.get('Upload-Offset'));
+                failures = 0;
+                continue;
+            }
+            if (response && response.status < 500 && ![409, 460].includes(response.status)) {
+                throw new Error((await response.json().catch(() => ({}))).error || `HTTP ${response.status}`);
+            }
+            if (++failures > MAX_RETRIES) {
+                throw new Error('The connection keeps failing; choose the file again to resume.');
+            }
+            await sleep(Math.min(30000, 500 * 2 ** failures));
+            // Ask where the server got to; the failed chunk may have arrived after all.
+            const status = await request(session.url, {method: 'GET'}, token).catch(() => null);
+            if (status && status.ok) {
+                offset = (await status.json()).offset;
+            }
+        }
+        localStorage.removeItem(resumeKey(input, file));
+        await waitForDigest(session, token, report.bind(null, file.size));
+        return session.id;
+    }
+
+    // The server hashes the finished file once in the background. Saving the form before that
+    // still works, but then the save has to read the whole file again.
+    async function waitForDigest(session, token, report) {
+        report();
+        for (let waited = 0; waited < HASH_WAIT_SECONDS; waited++) {
+            const response = await request(session.url, {method: 'GET'}, token).catch(() => null);
+            if (response && response.ok && (await response.json()).sha256) {
+                return;
+            }
+            await sleep(1000);
+        }
+    }
+
+    function attach(input) {
+        const hidden = input.form && input.form.querySelector(`input[name="${input.name}__upload"]`);
+        if (!hidden || !window.crypto || !crypto.subtle || !window.fetch) {
+            return;  // plain upload with the form
+        }
+        const progress = document.createElement('span');
+        progress.className = 'help';
+        input.insertAdjacentElement('afterend', progress);
+        let pending = null;
+
+        input.addEventListener('change', function () {
+            const file = input.files[0];
+            hidden.value = '';
+            if (!file) {
+                return;
+            }
+            pending = upload(input, file, (offset) => {
+                progress.textContent = offset < file.size
+                    ? ` Uploading ${file.name}: ${Math.floor(100 * offset / file.size)}%`
+                    : ` Checking ${file.name}…`;
+            }).then((id) => {
+                hidden.value = id;
+                progress.textContent = ` ${file.name} uploaded.`;
+            }, (error) => {
+                progress.textContent = ` Upload failed: ${error.message}`;
+            }).finally(() => {
+                pending = null;
+            });
+        });
+
+        input.form.addEventListener('submit', function (event) {
+            if (pending) {
+                event.preventDefault();
+                progress.textContent += ' Wait for the upload to finish before saving.';
+            } else if (hidden.value) {
+                // The file is on the server already; don't send it again with the form.
+                input.disabled = true;
+            }
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        document.querySelectorAll('input[type="file"][data-chunked-upload]').forEach(attach);
+    });
+})();
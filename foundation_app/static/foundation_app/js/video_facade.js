@@ -0,0 +1,46 @@
+// Replaces a .video-facade thumbnail (rendered by {% video_facade %}) with the provider's
+// player when clicked, so pages don't load a player per video up front.
+(function () {
+    const warmed = new Set();
+
+    function warm(facade) {
+        // Start the connection to the player's origin while the pointer is on its way to the button.
+        const origin = new URL(facade.dataset.embedSrc).origin;
+        if (warmed.has(origin)) {
+            return;
+        }
+        warmed.add(origin);
+        const link = document.createElement('link');
+        link.rel = 'preconnect';
+        link.href = origin;
+        document.head.appendChild(link);
+    }
+
+    function play(facade) {
+        const iframe = document.createElement('iframe');
+        iframe.src = facade.dataset.embedSrc;
+        iframe.title = facade.dataset.title || 'Video player';
+        iframe.allow = 'accelerometer; autoplay; clipboard-write; encrypted-media; gyroscope; picture-in-picture';
+        iframe.allowFullscreen = true;
+        iframe.className = 'absolute inset-0 w-full h-full';
+        iframe.setAttribute('frameborder', '0');
+        facade.replaceChildren(iframe);
+        facade.classList.remove('video-facade');
+        iframe.focus();
+    }
+
+    document.addEventListener('pointerover', function (event) {
+        const facade = event.target.closest && event.target.closest('.video-facade');
+        if (facade) {
+            warm(facade);
+        }
+    });
+
+    document.addEventListener('click', function (event) {
+        const facade = event.target.closest && event.target.closest('.video-facade');
+        if (facade) {
+            event.preventDefault();
+            play(facade);
+        }
+    });
+})();
@@ -0,0 +1,249 @@
+# foundation_app/static_site.py
+"""
+Static export of the public pages.
+
+``manage.py build_static_site`` renders the first page of every view in
+STATIC_PAGES, and the detail page of every row for DETAIL_PAGES, as
+``STATIC_SITE_ROOT/<path>/index.html``, through the normal middleware stack
+as an anonymous visitor. Each page has a :class:`~foundation_app.models.StaticPage`
+row. ``response_cache.invalidate_model`` calls :func:`mark_stale`, which uses
+VIEW_DEPENDENCIES to mark the affected pages stale and delete their files once
+the change commits. A saved news item only touches the news list and its own
+detail page. Until the next build those requests fall through to Django, and
+the next build renders only stale pages, in a pool of processes.
+
+The files are served by :class:`~foundation_app.middleware.StaticSiteMiddleware`,
+or better by the proxy without reaching Python at all. The proxy must only do
+this for requests without a session cookie and without a query string, e.g.
+with nginx::
+
+    location / {
+        error_page 418 = @app;
+        if ($cookie_sessionid) { return 418; }
+        if ($args) { return 418; }
+        root /srv/pcf/var/site;
+        try_files $uri/index.html @app;
+    }
+
+Paginated pages (``?cursor=``) and search are always rendered by Django.
+"""
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import connections, transaction
+from django.db.models import F, Q
+from django.urls import reverse
+from django.utils import timezone
+from django.utils._os import safe_join
+
+from .response_cache import VIEW_DEPENDENCIES
+
+# URL names exported as single pages.
+STATIC_PAGES = (
+    'home', 'about_us', 'team', 'gallery', 'media_centre', 'news_list', 'all_projects',
+    'podcast_list', 'video_list', 'newspaper_cuttings', 'event_photos', 'reviews',
+)
+# URL names exported once per row: url_name -> model whose pk is in the URL.
+DETAIL_PAGES = {
+    'project_detail': 'foundation_app.Project',
+    'news_detail': 'foundation_app.News',
+}
+
+_handler = None
+
+
+def site_root():
+    return getattr(settings, 'STATIC_SITE_ROOT', '')
+
+
+def enabled():
+    return bool(site_root())
+
+
+def page_path(url_name, pk=None):
+    kwargs = {'pk': pk} if pk is not None else None
+    return reverse(f'foundation_app:{url_name}', kwargs=kwargs)
+
+
+def file_for(path):
+    """File a URL path is exported to, or None for paths that can't be exported."""
+    if not path.startswith('/') or not path.endswith('/'):
+        return None
+    try:
+        return safe_join(site_root(), path.lstrip('/'), 'index.html')
+    except SuspiciousFileOperation:
+        return None
+
+
+def all_pages():
+    """``{path: url_name}`` for every page that should be exported right now."""
+    pages = {page_path(name): name for name in STATIC_PAGES}
+    for name, label in DETAIL_PAGES.items():
+        model = apps.get_model(label)
+        for pk in model._default_manager.values_list('pk', flat=True).iterator(chunk_size=2000):
+            pages[page_path(name, pk)] = name
+    return pages
+
+
+def _remove_files(paths):
+    for path in paths:
+        filename = file_for(path)
+        if filename:
+            try:
+                os.remove(filename)
+            except FileNotFoundError:
+                pass
+
+
+def _stale(pages):
+    from .models import StaticPage
+
+    # New rows (a new news item) are stale from the start; existing ones get a new changed_at.
+    StaticPage.objects.bulk_create(
+        [StaticPage(path=path, url_name=name, changed_at=timezone.now()) for path, name in pages.items()],
+        update_conflicts=True, unique_fields=['path'], update_fields=['changed_at'],
+    )
+    _remove_files(pages)
+
+
+def mark_stale(model, instance=None):
+    """
+    Mark the exported pages showing ``model`` stale and remove their files once
+    the change commits. With ``instance``, detail pages of other rows are left alone.
+
+    The stamp is taken after the commit, so a render that read the old rows
+    always started before it and can't be recorded as fresh (see :func:`record_results`).
+    """
+    from .models import StaticPage
+
+    if not enabled():
+        return
+    label = model._meta.label
+    names = [name for name, labels in VIEW_DEPENDENCIES.items()
+             if label in labels and (name in STATIC_PAGES or name in DETAIL_PAGES)]
+    if not names:
+        return
+    pages = {}
+    for name in names:
+        if name not in DETAIL_PAGES:
+            pages[page_path(name)] = name
+        elif instance is not None and DETAIL_PAGES[name] == label:
+            pages[page_path(name, instance.pk)] = name
+        else:
+            rows = StaticPage.objects.filter(url_name=name).values_list('path', flat=True)
+            pages.update((path, name) for path in rows)
+    transaction.on_commit(lambda: _stale(pages))
+
+
+def _all_stale():
+    from .models import StaticPage
+
+    paths = list(StaticPage.objects.values_list('path', flat=True))
+    StaticPage.objects.update(changed_at=timezone.now())
+    _remove_files(paths)
+
+
+def mark_all_stale():
+    if enabled():
+        transaction.on_commit(_all_stale)
+
+
+def sync_pages():
+    """Add rows for pages that have none yet; returns ``{path: url_name}`` of all current pages."""
+    from .models import StaticPage
+
+    pages = all_pages()
+    StaticPage.objects.bulk_create(
+        [StaticPage(path=path, url_name=name, changed_at=timezone.now()) for path, name in pages.items()],
+        ignore_conflicts=True, batch_size=1000,
+    )
+    return pages
+
+
+def stale_paths():
+    from .models import StaticPage
+
+    rows = StaticPage.objects.filter(Q(rendered_at__isnull=True) | Q(changed_at__gt=F('rendered_at')))
+    return list(rows.order_by('path').values_list('path', flat=True))
+
+
+def _host():
+    return getattr(settings, 'STATIC_SITE_HOST', 'localhost')
+
+
+def _write(filename, content):
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(filename), prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(content)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, filename)  # readers see the old page or the new one, never half of one
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def render_page(path):
+    """
+    Render ``path`` as an anonymous visitor and write or remove its file.
+    Returns ``(path, status_code, started_at)``.
+    """
+    global _handler
+    from django.core.handlers.base import BaseHandler
+    from django.test import RequestFactory
+
+    if _handler is None:
+        _handler = BaseHandler()
+        _handler.load_middleware()
+    started = timezone.now()
+    request = RequestFactory().get(path, HTTP_HOST=_host(), secure=True)
+    request.rendering_static_site = True  # StaticSiteMiddleware must not answer with the old file
+    response = _handler.get_response(request)
+    filename = file_for(path)
+    if response.status_code == 200 and not response.streaming:
+        _write(filename, response.content)
+    elif response.status_code == 404:
+        _remove_files([path])
+    return path, response.status_code, started
+
+
+def _init_worker():
+    if not apps.ready:  # spawned rather than forked
+        import django
+
+        django.setup()
+
+
+def render_pages(paths, workers=1):
+    """Render ``paths``, in ``workers`` processes; yields :func:`render_page` results as they finish."""
+    if workers <= 1 or len(paths) < 2:
+        for path in paths:
+            yield render_page(path)
+        return
+    connections.close_all()  # forked workers open their own
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        yield from pool.map(render_page, paths, chunksize=max(1, min(50, len(paths) // (workers * 4))))
+
+
+def record_results(results):
+    """
+    Mark rendered pages fresh (as of when their render started) and forget
+    pages that are gone. A page changed while it was rendering keeps its newer
+    ``changed_at``, and its file, which may have been written after the
+    change removed it, is removed again.
+    """
+    from .models import StaticPage
+
+    gone = [path for path, status, _ in results if status == 404]
+    changed = []
+    with transaction.atomic():
+        for path, status, started in results:
+            if status == 200 and not StaticPage.objects.filter(path=path, changed_at__lte=started).update(rendered_at=started):
+                changed.append(path)
+        StaticPage.objects.filter(path__in=gone).delete()
+    _remove_files(changed)
@@ -0,0 +1,397 @@
+# foundation_app/storage.py
+"""
+Storage backends.
+
+Media: :class:`ContentAddressedStorage` stores each distinct upload once,
+named by its SHA-256, and counts the references in ``MediaBlob``; see the
+class docstring.
+
+Static files: :class:`OptimizedImageStaticStorage` optimises images during ``collectstatic``.
+
+JPEG and PNG files are recompressed without visible change, and resized AVIF
+and WebP siblings are generated next to them (AVIF only if Pillow can encode
+it). The siblings go through the normal hashing, so they get cache-busting
+names and manifest entries; which
+variants exist for which image is stored under ``"pictures"`` in the same
+manifest, where ``{% static_picture %}`` reads it.
+
+Image work runs in a process pool and is cached on disk by content hash
+(``STATIC_PICTURE_CACHE_DIR``), so unchanged images cost one hash on later runs.
+"""
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import uuid
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import unquote, urlsplit
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from PIL import Image, ImageOps, features
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+logger = logging.getLogger(__name__)
+
+OPTIMIZABLE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+# Preferred first: browsers take the first <source> they support.
+PICTURE_FORMATS = (
+    ('avif', 'AVIF', 'image/avif'),
+    ('webp', 'WEBP', 'image/webp'),
+)
+# Bump when the processing below changes so cached results are rebuilt.
+PROCESSING_VERSION = 1
+
+
+def _can_encode(key):
+    try:
+        return features.check_module(key)
+    except ValueError:  # Pillow doesn't know the format at all (AVIF before 11.2)
+        return False
+
+
+def picture_formats():
+    """The PICTURE_FORMATS this Pillow build can write; the others are left out."""
+    return tuple(entry for entry in PICTURE_FORMATS if _can_encode(entry[0]))
+
+
+def picture_widths():
+    return tuple(sorted(getattr(settings, 'STATIC_PICTURE_WIDTHS', (480, 960, 1600))))
+
+
+def picture_quality():
+    return {'avif': 55, 'webp': 80, **getattr(settings, 'STATIC_PICTURE_QUALITY', {})}
+
+
+def picture_cache_dir():
+    return getattr(settings, 'STATIC_PICTURE_CACHE_DIR', os.path.join(settings.BASE_DIR, 'var', 'static-pictures'))
+
+
+def variant_name(name, width, extension):
+    stem = os.path.splitext(name)[0]
+    return f'{stem}-{width}w.{extension}'
+
+
+# Image processing (runs in worker processes; no Django access) ---------------------
+
+def _recompress(image, content):
+    """Smaller encoding of the same pixels, or None when the original is already as small."""
+    options = {key: image.info[key] for key in ('exif', 'icc_profile', 'dpi') if key in image.info}
+    buffer = io.BytesIO()
+    if image.format == 'JPEG':
+        # Reusing the file's own quantisation tables keeps the image as it was;
+        # the saving comes from optimised Huffman tables and a progressive scan.
+        image.save(buffer, 'JPEG', quality='keep', optimize=True, progressive=True, **options)
+    else:
+        image.save(buffer, 'PNG', optimize=True, **options)
+    optimized = buffer.getvalue()
+    return optimized if len(optimized) < len(content) else None
+
+
+def process_image(content, entry_dir, widths, quality, formats=PICTURE_FORMATS):
+    """
+    Optimise one image and write the results to ``entry_dir``:
+    ``original`` (only if smaller), ``<width>.<ext>`` variants and ``meta.json``.
+    Returns the metadata.
+    """
+    os.makedirs(entry_dir, exist_ok=True)
+    with Image.open(io.BytesIO(content)) as image:
+        image.load()
+        optimized = _recompress(image, content)
+        oriented = ImageOps.exif_transpose(image)
+
+    if optimized is not None:
+        with open(os.path.join(entry_dir, 'original'), 'wb') as fh:
+            fh.write(optimized)
+
+    if oriented.mode not in ('RGB', 'RGBA'):
+        has_alpha = 'A' in oriented.getbands() or 'transparency' in oriented.info
+        oriented = oriented.convert('RGBA' if has_alpha else 'RGB')
+    width, height = oriented.size
+    targets = [w for w in widths if w < width] + ([width] if width <= widths[-1] else [])
+
+    variants = {key: [] for key, _, _ in formats}
+    resized = oriented
+    for target in sorted(targets, reverse=True):
+        if target != resized.width:
+            resized = resized.resize((target, max(1, round(height * target / width))), Image.Resampling.LANCZOS)
+        for key, pillow_format, _ in formats:
+            filename = f'{target}.{key}'
+            resized.save(os.path.join(entry_dir, filename), pillow_format, quality=quality[key])
+            variants[key].append([target, filename])
+
+    meta = {
+        'width': width,
+        'height': height,
+        'optimized': optimized is not None,
+        'variants': {key: sorted(entries) for key, entries in variants.items()},
+    }
+    # meta.json last and atomically: its presence marks a complete cache entry.
+    with open(os.path.join(entry_dir, 'meta.json.tmp'), 'w') as fh:
+        json.dump(meta, fh)
+    os.replace(os.path.join(entry_dir, 'meta.json.tmp'), os.path.join(entry_dir, 'meta.json'))
+    return meta
+
+
+# Storage -----------------------------------------------------------------------------
+
+class OptimizedImageStaticStorage(CompressedManifestStaticFilesStorage):
+    """
+    WhiteNoise's compressed manifest storage plus image optimisation.
+
+    Not strict: a ``{% static %}`` reference to a file missing from the
+    manifest (or before the first ``collectstatic``) is served under its
+    unhashed name instead of raising.
+    """
+    manifest_strict = False
+
+    def load_manifest(self):
+        content = self.read_manifest()
+        try:
+            self.pictures = json.loads(content).get('pictures', {}) if content else {}
+        except ValueError:
+            self.pictures = {}
+        return super().load_manifest()
+
+    def save_manifest(self):
+        self.manifest_hash = self.file_hash(
+            None, ContentFile(json.dumps(sorted(self.hashed_files.items())).encode())
+        )
+        payload = {
+            'paths': self.hashed_files,
+            'version': self.manifest_version,
+            'hash': self.manifest_hash,
+            'pictures': self.pictures,
+        }
+        if self.manifest_storage.exists(self.manifest_name):
+            self.manifest_storage.delete(self.manifest_name)
+        self.manifest_storage._save(self.manifest_name, ContentFile(json.dumps(payload).encode()))
+
+    def stored_name(self, name):
+        if not self.manifest_strict and self.hash_key(urlsplit(unquote(name)).path.strip()) not in self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            paths = dict(paths)
+            self.pictures = self.optimize_images(paths)
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+
+    def _replace(self, name, content):
+        if self.exists(name):
+            self.delete(name)
+        self._save(name, ContentFile(content))
+
+    def optimize_images(self, paths):
+        """
+        Optimise every JPEG/PNG in ``paths`` and add the variants to it, pointing
+        entries at this storage so hashing picks up the optimised bytes.
+        Returns the ``pictures`` manifest section.
+        """
+        widths, quality, formats = picture_widths(), picture_quality(), picture_formats()
+        missing = [key for key, _, _ in PICTURE_FORMATS if key not in {key for key, _, _ in formats}]
+        if missing:
+            logger.warning("Pillow can't encode %s; no such variants will be generated.", ', '.join(missing))
+        # The formats are part of the key, so upgrading Pillow regenerates the variants.
+        fingerprint = json.dumps([PROCESSING_VERSION, widths, sorted(quality.items()), formats]).encode()
+        cache_dir = picture_cache_dir()
+
+        jobs = {}
+        for name in sorted(paths):
+            if not name.lower().endswith(OPTIMIZABLE_EXTENSIONS):
+                continue
+            storage, path = paths[name]
+            with storage.open(path) as fh:
+                content = fh.read()
+            key = hashlib.sha256(fingerprint + content).hexdigest()
+            jobs[name] = (os.path.join(cache_dir, key[:2], key), content)
+
+        pending = {name: job for name, job in jobs.items() if not os.path.exists(os.path.join(job[0], 'meta.json'))}
+        metas = {}
+        if pending:
+            workers = getattr(settings, 'STATIC_PICTURE_WORKERS', None) or os.cpu_count() or 1
+            with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as pool:
+                futures = {
+                    name: pool.submit(process_image, content, entry_dir, widths, quality, formats)
+                    for name, (entry_dir, content) in pending.items()
+                }
+                metas = {name: future.result() for name, future in futures.items()}
+
+        pictures = {}
+        for name, (entry_dir, _) in jobs.items():
+            meta = metas.get(name)
+            if meta is None:
+                with open(os.path.join(entry_dir, 'meta.json')) as fh:
+                    meta = json.load(fh)
+            if meta['optimized']:
+                with open(os.path.join(entry_dir, 'original'), 'rb') as fh:
+                    self._replace(name, fh.read())
+                paths[name] = (self, name)
+
+            sources = {}
+            for key, entries in meta['variants'].items():
+                sources[key] = []
+                for width, filename in entries:
+                    target = variant_name(name, width, key)
+                    with open(os.path.join(entry_dir, filename), 'rb') as fh:
+                        self._replace(target, fh.read())
+                    paths[target] = (self, target)
+                    sources[key].append([width, target])
+            pictures[name] = {'width': meta['width'], 'height': meta['height'], 'sources': sources}
+        return pictures
+
+
+# Media ---------------------------------------------------------------------------------
+
+BLOB_DIR = 'blobs'
+_BLOB_NAME_RE = re.compile(r'^blobs/[0-9a-f]{2}/[0-9a-f]{64}(\.[a-z0-9]{1,10})?$')
+
+
+def blob_name(digest, name):
+    """``blobs/<first two hex digits>/<sha256><ext>``; the extension keeps Content-Type guessing working."""
+    extension = os.path.splitext(name)[1].lower()
+    if not re.fullmatch(r'\.[a-z0-9]{1,10}', extension):
+        extension = ''
+    return f'{BLOB_DIR}/{digest[:2]}/{digest}{extension}'
+
+
+def is_blob_name(name):
+    return bool(_BLOB_NAME_RE.match(name or ''))
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage that keeps one copy of each distinct file.
+
+    ``save()`` hashes the content and stores it as :func:`blob_name`; if that
+    blob already exists, only its ``MediaBlob.refcount`` goes up, so the same
+    photo uploaded to the gallery, an event and a review is stored once.
+    ``delete()`` takes a reference away and removes the file (after commit)
+    with the last one. Blob names never change content, so they can be
+    cached forever.
+
+    Names stored before this backend (anything not under ``blobs/``) are
+    served and deleted as before; ``manage.py dedupe_media`` converts them.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # The stored name comes from the content, so the upload's name needn't be free.
+        return name
+
+    def _save(self, name, content):
+        # Finished chunked uploads arrive with the digest they were hashed to
+        # after their last chunk (uploads.hash_file); don't read gigabytes again.
+        sha256 = getattr(content, 'sha256', None)
+        if sha256:
+            size = content.size
+        else:
+            digest = hashlib.sha256()
+            size = 0
+            for chunk in content.chunks():
+                digest.update(chunk)
+                size += len(chunk)
+            sha256 = digest.hexdigest()
+        name = blob_name(sha256, name)
+
+        if not self.exists(name):
+            # Write under a unique name and rename, so a concurrent identical upload can't clash.
+            staging = super()._save(f'{BLOB_DIR}/tmp/{uuid.uuid4().hex}', content)
+            os.makedirs(os.path.dirname(self.path(name)), exist_ok=True)
+            os.replace(self.path(staging), self.path(name))
+        add_reference(name, sha256, size)
+        return name
+
+    def delete(self, name):
+        if not is_blob_name(name):
+            return super().delete(name)
+        MediaBlob = apps.get_model('foundation_app', 'MediaBlob')
+        with transaction.atomic():
+            if MediaBlob.objects.filter(name=name, refcount__gt=1).update(refcount=F('refcount') - 1):
+                return
+            deleted, _ = MediaBlob.objects.filter(name=name).delete()
+        if deleted:
+            transaction.on_commit(lambda: self._delete_unreferenced(name))
+        else:
+            logger.warning("Not deleting untracked blob %s; run manage.py dedupe_media to recount.", name)
+
+    def _delete_unreferenced(self, name):
+        # Someone may have stored the same content again since the last reference went.
+        if not apps.get_model('foundation_app', 'MediaBlob').objects.filter(name=name).exists():
+            super().delete(name)
+
+
+def add_reference(name, sha256, size):
+    MediaBlob = apps.get_model('foundation_app', 'MediaBlob')
+    with transaction.atomic():
+        if MediaBlob.objects.filter(name=name).update(refcount=F('refcount') + 1):
+            return
+        try:
+            with transaction.atomic():
+                MediaBlob.objects.create(name=name, sha256=sha256, size=size, refcount=1)
+        except IntegrityError:
+            MediaBlob.objects.filter(name=name).update(refcount=F('refcount') + 1)
+
+
+def blob_fields(model):
+    """``model``'s file fields stored in a ContentAddressedStorage."""
+    return [
+        field for field in model._meta.concrete_fields
+        if isinstance(field, models.FileField) and isinstance(field.storage, ContentAddressedStorage)
+    ]
+
+
+def content_addressed_fields():
+    """``[(model, [file fields])]`` for every model with :func:`blob_fields`."""
+    return [(model, fields) for model in apps.get_models() if (fields := blob_fields(model))]
+
+
+def referenced_names():
+    """``Counter`` of stored names over every file field and ``image_derivatives`` entry."""
+    from .imaging import derivative_names
+
+    counts = Counter()
+    for model, fields in content_addressed_fields():
+        columns = [field.attname for field in fields]
+        has_derivatives = any(field.name == 'image_derivatives' for field in model._meta.concrete_fields)
+        rows = model._default_manager.values_list(
+            *columns, *(['image_derivatives'] if has_derivatives else []),
+        ).order_by().iterator(chunk_size=2000)
+        for row in rows:
+            counts.update(name for name in row[:len(columns)] if name)
+            if has_derivatives:
+                counts.update(derivative_names(row[-1]))
+    return counts
+
+
+def recount_blobs(counts=None, storage=None):
+    """
+    Set every ``MediaBlob.refcount`` from the references actually stored
+    (after bulk inserts or a crash). Returns the blob names nothing refers to.
+    """
+    MediaBlob = apps.get_model('foundation_app', 'MediaBlob')
+    storage = storage or ContentAddressedStorage()
+    counts = referenced_names() if counts is None else counts
+    blobs = {name: count for name, count in counts.items() if is_blob_name(name)}
+    known = dict(MediaBlob.objects.values_list('name', 'refcount'))
+
+    with transaction.atomic():
+        for name, count in blobs.items():
+            if name not in known:
+                if storage.exists(name):
+                    MediaBlob.objects.create(
+                        name=name, sha256=name.rsplit('/', 1)[1][:64], size=storage.size(name), refcount=count,
+                    )
+            elif known[name] != count:
+                MediaBlob.objects.filter(name=name).update(refcount=count)
+        orphans = sorted(set(known) - set(blobs))
+        MediaBlob.objects.filter(name__in=orphans).update(refcount=0)
+    return orphans
@@ -0,0 +1,261 @@
+# foundation_app/submissions.py
+"""
+Write-behind for contact messages and volunteer signups.
+
+With ``SUBMISSION_WRITE_BEHIND`` on, a valid form is appended as one JSON line
+to a spool file (``SUBMISSION_SPOOL_DIR``) and the request returns without
+touching the database. A flusher thread in each process claims the spool
+every ``SUBMISSION_FLUSH_INTERVAL`` seconds (sooner once
+``SUBMISSION_FLUSH_BATCH`` rows are waiting) and inserts it with one
+``bulk_create`` per model.
+
+Each record carries the time it was submitted, which goes into the model's
+``auto_now_add`` fields, so rows show when they were sent rather than when
+they were flushed.
+
+Crash safety: the spool is fsynced before the request answers, a claimed
+batch is only deleted after it is committed, and each row carries a
+``submission_id`` so replaying a batch that was half-inserted is harmless.
+``manage.py flush_submissions`` replays whatever a dead process left behind.
+
+Needs ``fcntl`` (Linux/macOS); elsewhere submissions are always saved inline.
+"""
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+import uuid
+
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import search
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+PENDING_NAME = 'pending.jsonl'
+
+
+def write_behind_enabled():
+    return fcntl is not None and getattr(settings, 'SUBMISSION_WRITE_BEHIND', False)
+
+
+def spool_dir():
+    return str(getattr(settings, 'SUBMISSION_SPOOL_DIR', os.path.join(settings.BASE_DIR, 'var', 'submissions')))
+
+
+def flush_interval():
+    return getattr(settings, 'SUBMISSION_FLUSH_INTERVAL', 2.0)
+
+
+def _flush_batch():
+    return getattr(settings, 'SUBMISSION_FLUSH_BATCH', 500)
+
+
+def save_submission(form):
+    """Save a valid ModelForm now, or queue it when write-behind is on."""
+    if not write_behind_enabled():
+        return form.save()
+    fields = {name: form.cleaned_data[name] for name in form._meta.fields if name in form.cleaned_data}
+    enqueue(form._meta.model, fields)
+    return None
+
+
+# Spool ----------------------------------------------------------------------
+
+def _open_locked_pending(directory):
+    """
+    Open the pending file with an exclusive lock, making sure it is still the
+    file at ``PENDING_NAME`` (a flusher may have renamed it while we waited).
+    """
+    path = os.path.join(directory, PENDING_NAME)
+    while True:
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o640)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(fd).st_ino == os.stat(path).st_ino:
+                return fd
+        except FileNotFoundError:
+            pass
+        os.close(fd)
+
+
+def enqueue(model, fields):
+    record = {
+        'model': model._meta.label,
+        'submission_id': str(uuid.uuid4()),
+        'submitted_at': timezone.now().isoformat(),  # DjangoJSONEncoder would cut it to milliseconds
+        'fields': fields,
+    }
+    line = (json.dumps(record, cls=DjangoJSONEncoder, separators=(',', ':')) + '\n').encode()
+    directory = spool_dir()
+    os.makedirs(directory, exist_ok=True)
+    fd = _open_locked_pending(directory)
+    try:
+        os.write(fd, line)
+        os.fsync(fd)
+        size = os.fstat(fd).st_size
+    finally:
+        os.close(fd)  # releases the lock
+    _flusher().notify(size, len(line))
+
+
+def _claim_pending(directory):
+    """Rename the pending file to a private batch file; return its path or None."""
+    path = os.path.join(directory, PENDING_NAME)
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except FileNotFoundError:
+        return None
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        if os.fstat(fd).st_ino != os.stat(path).st_ino or os.fstat(fd).st_size == 0:
+            return None
+        claimed = os.path.join(directory, f'batch-{uuid.uuid4().hex}.jsonl')
+        os.rename(path, claimed)
+        return claimed
+    except FileNotFoundError:
+        return None
+    finally:
+        os.close(fd)
+
+
+def _read_batch(fd):
+    records = []
+    with os.fdopen(os.dup(fd), 'rb') as handle:
+        for number, line in enumerate(handle, 1):
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # Only a write torn by a crash can look like this.
+                logger.warning("Skipping unreadable spooled submission (line %d)", number)
+    return records
+
+
+def _restore_submission_times(model, objs, records):
+    """Set ``auto_now_add`` fields, which bulk_create filled with the flush time, to the submission time."""
+    fields = [f.name for f in model._meta.concrete_fields if getattr(f, 'auto_now_add', False)]
+    submitted = {r['submission_id']: parse_datetime(r['submitted_at']) for r in records if r.get('submitted_at')}
+    objs = [obj for obj in objs if str(obj.submission_id) in submitted]
+    if not fields or not objs:
+        return
+    for obj in objs:
+        for name in fields:
+            setattr(obj, name, submitted[str(obj.submission_id)])
+    model._default_manager.bulk_update(objs, fields, batch_size=_flush_batch())
+
+
+def _insert(records):
+    by_model = {}
+    for record in records:
+        by_model.setdefault(record['model'], []).append(record)
+    inserted = 0
+    for label, rows in by_model.items():
+        model = apps.get_model(label)
+        objs = [model(submission_id=row['submission_id'], **row['fields']) for row in rows]
+        model._default_manager.bulk_create(objs, batch_size=_flush_batch(), ignore_conflicts=True)
+        saved = list(model._default_manager.filter(submission_id__in=[o.submission_id for o in objs]))
+        _restore_submission_times(model, saved, rows)
+        # bulk_create sends no post_save, so index the new rows here.
+        search.index_objects(model, saved)
+        inserted += len(objs)
+    return inserted
+
+
+def _process_batch(path):
+    """Insert one claimed batch file and delete it. Skips batches another process is working on."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except FileNotFoundError:
+        return 0
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return 0
+        if not os.path.exists(path):
+            return 0  # finished by someone else between open() and flock()
+        inserted = _insert(_read_batch(fd))
+        os.unlink(path)
+        return inserted
+    finally:
+        os.close(fd)
+
+
+def flush():
+    """Insert every queued submission, including batches left by a crashed process. Returns how many were processed."""
+    if fcntl is None:
+        return 0
+    directory = spool_dir()
+    if not os.path.isdir(directory):
+        return 0
+    _claim_pending(directory)
+    inserted = 0
+    for path in sorted(glob.glob(os.path.join(directory, 'batch-*.jsonl')), key=os.path.getmtime):
+        inserted += _process_batch(path)
+    return inserted
+
+
+# Flusher thread ---------------------------------------------------------------
+
+class _Flusher:
+    """Per-process thread that flushes at most ``SUBMISSION_FLUSH_INTERVAL`` seconds after a write."""
+
+    def __init__(self):
+        self._wake = threading.Event()
+        self._pending = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='submission-flusher', daemon=True)
+        self._thread.start()
+        atexit.register(self._flush_safely)
+
+    def notify(self, spool_size, line_size):
+        self._pending.set()
+        # Rough row count from the spool size; good enough to flush early during bursts.
+        if spool_size >= _flush_batch() * line_size:
+            self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(flush_interval())
+            self._wake.clear()
+            if not self._pending.is_set():
+                continue
+            self._pending.clear()
+            self._flush_safely()
+
+    def _flush_safely(self):
+        try:
+            flush()
+        except Exception:
+            # The rows stay on disk and the next flush retries them.
+            logger.exception("Flushing spooled submissions failed")
+            self._pending.set()
+        finally:
+            close_old_connections()
+
+
+_flusher_instance = None
+_flusher_pid = None
+_flusher_lock = threading.Lock()
+
+
+def _flusher():
+    global _flusher_instance, _flusher_pid
+    pid = os.getpid()
+    if _flusher_pid != pid:
+        with _flusher_lock:
+            if _flusher_pid != pid:
+                _flusher_instance = _Flusher()
+                _flusher_pid = pid
+    return _flusher_instance
@@ -0,0 +1,137 @@
+# foundation_app/templatetags/media_tags.py
+from django import template
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.files.storage import default_storage
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+
+from .. import video_embeds
+from ..storage import PICTURE_FORMATS
+
+register = template.Library()
+
+
+def _srcset(entries):
+    return ', '.join(f'{default_storage.url(name)} {width}w' for width, name in entries)
+
+
+def _placeholder_attrs(obj):
+    """Intrinsic size, dominant colour and BlurHash as <img> attributes, where known."""
+    derivatives = getattr(obj, 'image_derivatives', None) or {}
+    width = getattr(obj, 'image_width', None) or derivatives.get('width')
+    height = getattr(obj, 'image_height', None) or derivatives.get('height')
+    attrs = []
+    if width and height:
+        attrs.append(format_html(' width="{}" height="{}"', width, height))
+    if getattr(obj, 'image_color', ''):
+        attrs.append(format_html(' style="background-color: {}"', obj.image_color))
+    if getattr(obj, 'image_blurhash', ''):
+        attrs.append(format_html(' data-blurhash="{}"', obj.image_blurhash))
+    return mark_safe(''.join(attrs))
+
+
+@register.simple_tag
+def responsive_image(obj, sizes='100vw', alt='', css_class='', loading='lazy'):
+    """
+    Render ``obj.image`` as a <picture> with WebP/JPEG srcsets.
+
+    Usage: {% responsive_image photo sizes="(min-width: 768px) 25vw, 50vw" alt="Event Photo" css_class="w-full h-48 object-cover" %}
+    Falls back to a plain <img> of the original when no derivatives exist yet.
+    Placeholder data (size, colour, BlurHash) is rendered inline when the row has it.
+    """
+    image = getattr(obj, 'image', None)
+    if not image:
+        return ''
+    derivatives = getattr(obj, 'image_derivatives', None) or {}
+    webp = derivatives.get('webp') or []
+    jpeg = derivatives.get('jpeg') or []
+
+    if not jpeg:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="{}" decoding="async"{}>',
+            image.url, alt, css_class, loading, _placeholder_attrs(obj),
+        )
+
+    return format_html(
+        '<picture class="contents">'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" loading="{}" decoding="async"{}>'
+        '</picture>',
+        _srcset(webp), sizes,
+        default_storage.url(jpeg[-1][1]), _srcset(jpeg), sizes, alt, css_class, loading, _placeholder_attrs(obj),
+    )
+
+
+@register.simple_tag
+def static_picture(path, sizes='100vw', alt='', css_class='', loading='lazy'):
+    """
+    Render a static image as a <picture> with the AVIF/WebP variants built by collectstatic.
+
+    Usage: {% static_picture 'foundation_app/images/243.jpg' sizes="144px" alt="Amardeep Kumar" css_class="w-36 h-36" %}
+    Falls back to a plain <img> when the image has no variants (e.g. before collectstatic).
+    """
+    picture = getattr(staticfiles_storage, 'pictures', {}).get(path)
+    if not picture:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="{}" decoding="async">',
+            static(path), alt, css_class, loading,
+        )
+
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        (
+            (mime, ', '.join(f'{static(name)} {width}w' for width, name in picture['sources'][key]), sizes)
+            for key, _, mime in PICTURE_FORMATS if picture['sources'].get(key)
+        ),
+    )
+    return format_html(
+        '<picture class="contents">{}'
+        '<img src="{}" width="{}" height="{}" alt="{}" class="{}" loading="{}" decoding="async">'
+        '</picture>',
+        sources, static(path), picture['width'], picture['height'], alt, css_class, loading,
+    )
+
+
+@register.simple_tag
+def video_facade(video, title='', css_class='w-full h-64'):
+    """
+    Render a video as its thumbnail with a play button; js/video_facade.js
+    swaps in the provider's player on click.
+
+    Usage: {% video_facade video %} for a ``Video``, or
+    {% video_facade "https://youtu.be/gLqqsZvPOEY" title="Clean Water Initiative" css_class="w-full h-64 md:h-80" %}.
+    URLs that aren't YouTube or Vimeo are embedded as a lazy <iframe>.
+    """
+    if isinstance(video, str):
+        url = video
+        provider, video_id = video_embeds.parse_video_url(url)
+        thumbnail, duration = video_embeds.default_thumbnail(provider, video_id), None
+    else:
+        url, provider, video_id = video.url, video.provider, video.provider_video_id
+        thumbnail, duration = video.thumbnail_url, video.duration
+        title = title or video.embed_title or video.title
+    if not url:
+        return ''
+    if not provider:
+        return format_html(
+            '<iframe src="{}" title="{}" class="{}" loading="lazy" frameborder="0" allowfullscreen></iframe>',
+            url, title, css_class,
+        )
+
+    duration = video_embeds.format_duration(duration)
+    return format_html(
+        '<div class="video-facade relative overflow-hidden bg-gray-900 {}" data-embed-src="{}" data-title="{}">'
+        '{}'
+        '<button type="button" class="group absolute inset-0 flex w-full h-full items-center justify-center" aria-label="Play video: {}">'
+        '<span class="flex w-16 h-16 items-center justify-center rounded-full bg-red-600 text-white text-2xl shadow-lg transition group-hover:bg-red-700">'
+        '<i class="fa-solid fa-play ml-1" aria-hidden="true"></i></span></button>'
+        '{}'
+        '</div>',
+        css_class, video_embeds.embed_url(provider, video_id), title,
+        format_html('<img src="{}" alt="" loading="lazy" decoding="async" class="absolute inset-0 w-full h-full object-cover">', thumbnail)
+        if thumbnail else '',
+        title,
+        format_html('<span class="absolute bottom-2 right-2 rounded bg-black/75 px-1.5 py-0.5 text-xs text-white">{}</span>', duration)
+        if duration else '',
+    )
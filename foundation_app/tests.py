@@ -1,3 +1,1539 @@
-from django.test import TestCase
+import asyncio
+import base64
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import tempfile
+from datetime import datetime
+from decimal import Decimal
+from itertools import count
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.http import Http404
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.template import Context, Template
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from . import static_site, uploads, video_embeds
+from .models import (
+    Campaign, ContactMessage, Donation, EventPhoto, GalleryImage, MediaBlob, News, NewspaperCutting,
+    PaymentWebhookEvent, Podcast, Project, Review, UploadSession, Video, Volunteer,
+)
+from .pagination import EstimatedCountPaginator, keyset_paginate
+from .storage import OptimizedImageStaticStorage
+
+_serial = count()
+
+
+def _campaign_rows(n):
+    users = User.objects.bulk_create([User(username=f'creator{next(_serial)}') for _ in range(n)])
+    return [
+        Campaign(user=user, title=f'Campaign {user.username}', description='d', goal_amount=Decimal('1000'))
+        for user in users
+    ]
+
+
+def _donation_rows(n):
+    campaigns = Campaign.objects.bulk_create(_campaign_rows(n))
+    return [
+        Donation(campaign=campaign, amount=Decimal('100'), razorpay_order_id=f'order_{next(_serial)}')
+        for campaign in campaigns
+    ]
+
+
+# Builds n unsaved rows per model; bulk_create keeps signal handlers out of the counts.
+ROW_FACTORIES = {
+    ContactMessage: lambda n: [ContactMessage(name=f'Name {i}', email='a@example.org', message='Hello') for i in range(n)],
+    Project: lambda n: [Project(title=f'Project {i}', description='d') for i in range(n)],
+    Volunteer: lambda n: [Volunteer(full_name=f'Volunteer {i}', email='v@example.org', availability='Weekends') for i in range(n)],
+    News: lambda n: [News(title=f'News {i}', slug=f'news-{next(_serial)}', content='c') for i in range(n)],
+    Podcast: lambda n: [Podcast(title=f'Podcast {i}', description='d', link='https://example.org/p') for i in range(n)],
+    Video: lambda n: [Video(title=f'Video {i}', url='https://example.org/v') for i in range(n)],
+    NewspaperCutting: lambda n: [NewspaperCutting(title=f'Cutting {i}', image='newspaper_cuttings/x.jpg') for i in range(n)],
+    EventPhoto: lambda n: [EventPhoto(image='event_photos/x.jpg') for _ in range(n)],
+    Review: lambda n: [Review(title=f'Review {i}') for i in range(n)],
+    GalleryImage: lambda n: [GalleryImage(title=f'Image {i}', image='gallery/x.jpg') for i in range(n)],
+    Campaign: _campaign_rows,
+    Donation: _donation_rows,
+    PaymentWebhookEvent: lambda n: [
+        PaymentWebhookEvent(event_id=f'evt_{next(_serial)}', event_type='payment.captured', payload='{}')
+        for _ in range(n)
+    ],
+}
+
+
+class AdminChangelistQueryCountTests(TestCase):
+    """Changelist pages must not issue a query per row."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_superuser('staff', 'staff@example.org', 'pw')
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def registered_models(self):
+        return [model for model in admin.site._registry if model._meta.app_label == 'foundation_app']
+
+    def test_every_model_admin_has_a_factory(self):
+        self.assertCountEqual(self.registered_models(), ROW_FACTORIES)
+
+    def changelist_queries(self, model, query=''):
+        url = reverse(f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist') + query
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assert_constant_queries(self, model, query=''):
+        model._default_manager.bulk_create(ROW_FACTORIES[model](5))
+        with_five = self.changelist_queries(model, query)
+        model._default_manager.bulk_create(ROW_FACTORIES[model](10))
+        self.assertEqual(self.changelist_queries(model, query), with_five)
+
+    def test_changelist_query_count_does_not_grow_with_rows(self):
+        for model in self.registered_models():
+            with self.subTest(model=model.__name__):
+                self.assert_constant_queries(model)
+
+    def test_search_query_count_does_not_grow_with_rows(self):
+        for model in self.registered_models():
+            if not admin.site._registry[model].search_fields:
+                continue
+            with self.subTest(model=model.__name__):
+                self.assert_constant_queries(model, '?q=e')
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        News.objects.bulk_create([News(title=f'News {i}', slug=f'news-{i}', content='c') for i in range(25)])
+        # Half the rows share a timestamp, so pages have to break ties on the id.
+        News.objects.filter(pk__in=News.objects.order_by('id').values('pk')[:12]).update(
+            created_at=News.objects.order_by('id').first().created_at,
+        )
+        self.expected = list(News.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+
+    def test_cursors_walk_every_row_once_each_way(self):
+        pages, cursor = [], None
+        with CaptureQueriesContext(connection) as queries:
+            while True:
+                page = keyset_paginate(News.objects.all(), cursor, per_page=10)
+                pages.append([news.pk for news in page])
+                if page.next_cursor is None:
+                    break
+                cursor = page.next_cursor
+            self.assertEqual([pk for rows in pages for pk in rows], self.expected)
+            self.assertEqual([len(rows) for rows in pages], [10, 10, 5])
+
+            back = keyset_paginate(News.objects.all(), page.previous_cursor, per_page=10)
+            self.assertEqual([news.pk for news in back], pages[1])
+            first = keyset_paginate(News.objects.all(), back.previous_cursor, per_page=10)
+            self.assertEqual([news.pk for news in first], pages[0])
+            self.assertIsNone(first.previous_cursor)
+        for query in queries.captured_queries:
+            self.assertNotIn('OFFSET', query['sql'].upper())
+            self.assertNotIn('COUNT(', query['sql'].upper())
+
+    def test_a_tampered_cursor_is_a_404(self):
+        with self.assertRaises(Http404):
+            keyset_paginate(News.objects.all(), 'not-a-cursor', per_page=10)
+        response = self.client.get(reverse('foundation_app:news_list'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    def test_unfiltered_large_lists_use_the_estimate(self):
+        Review.objects.bulk_create([Review(title=f'Review {i}') for i in range(3)])
+        Review.objects.filter(title='Review 0').delete()
+
+        paginator = EstimatedCountPaginator(Review.objects.all(), 10)
+        paginator.exact_below = 0
+        with CaptureQueriesContext(connection) as queries:
+            self.assertGreaterEqual(paginator.count, 2)
+        self.assertFalse([q for q in queries.captured_queries if 'COUNT(' in q['sql'].upper()])
+
+    def test_a_table_that_shrank_shows_no_pages_past_its_end(self):
+        Review.objects.bulk_create([Review(title=f'Review {i}') for i in range(30)])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        paginator = EstimatedCountPaginator(Review.objects.all(), 10)
+        paginator.exact_below = 20
+        self.assertEqual(paginator.num_pages, 3)
+
+        Review.objects.filter(pk__in=Review.objects.order_by('pk').values('pk')[:25]).delete()
+        paginator = EstimatedCountPaginator(Review.objects.all(), 10)
+        paginator.exact_below = 20
+        self.assertEqual((paginator.count, paginator.num_pages), (5, 1))
+
+    def test_filtered_lists_are_counted_exactly(self):
+        Review.objects.bulk_create([Review(title=f'Review {i}') for i in range(3)])
+
+        paginator = EstimatedCountPaginator(Review.objects.filter(title='Review 1'), 10)
+        paginator.exact_below = 0
+        self.assertEqual(paginator.count, 1)
+
+
+@override_settings(PERF_TIMING_SAMPLE_RATE=1.0)
+class PerformanceTimingMiddlewareTests(TestCase):
+    def test_server_timing_reports_queries_and_templates(self):
+        News.objects.create(title='Headline', slug='headline', content='c')
+        self.client.force_login(User.objects.create_user('ops', is_staff=True))
+        response = self.client.get(reverse('foundation_app:news_list'))
+        header = response['Server-Timing']
+        self.assertRegex(header, r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertIn('tpl;dur=', header)
+        self.assertIn('total;dur=', header)
+
+    def test_visitors_get_no_header_unless_debugging(self):
+        self.assertNotIn('Server-Timing', self.client.get(reverse('foundation_app:news_list')))
+        with self.settings(DEBUG=True):
+            self.assertIn('Server-Timing', self.client.get(reverse('foundation_app:news_list')))
+
+    @override_settings(PERF_SLOW_REQUEST_MS=0)
+    def test_slow_requests_are_logged_as_json(self):
+        with self.assertLogs('foundation_app.perf', 'WARNING') as logs:
+            self.client.get(reverse('foundation_app:news_list'))
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual(entry['url_name'], 'foundation_app:news_list')
+        self.assertTrue(entry['slow'])
+        self.assertIn('db_queries', entry)
+
+    @override_settings(PERF_TIMING_SAMPLE_RATE=0)
+    def test_unsampled_requests_have_no_header(self):
+        response = self.client.get(reverse('foundation_app:news_list'))
+        self.assertNotIn('Server-Timing', response)
+
+
+class OptimizedImageStaticStorageTests(TestCase):
+    def setUp(self):
+        source_dir, static_root, cache_dir = (tempfile.TemporaryDirectory() for _ in range(3))
+        for directory in (source_dir, static_root, cache_dir):
+            self.addCleanup(directory.cleanup)
+        self.source = FileSystemStorage(location=source_dir.name)
+        buffer = io.BytesIO()
+        Image.new('RGB', (1200, 600), (20, 120, 80)).save(buffer, 'PNG')
+        self.source.save('images/banner.png', io.BytesIO(buffer.getvalue()))
+        self.settings_override = self.settings(STATIC_PICTURE_WIDTHS=(300, 600), STATIC_PICTURE_CACHE_DIR=cache_dir.name)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.storage = OptimizedImageStaticStorage(location=static_root.name, base_url='/static/')
+
+    def collect(self):
+        self.storage.save('images/banner.png', self.source.open('images/banner.png'))
+        paths = {'images/banner.png': (self.source, 'images/banner.png')}
+        return list(self.storage.post_process(paths))
+
+    def test_variants_are_hashed_and_listed_in_the_manifest(self):
+        self.collect()
+        picture = OptimizedImageStaticStorage(location=self.storage.location).pictures['images/banner.png']
+        self.assertEqual((picture['width'], picture['height']), (1200, 600))
+        self.assertEqual([width for width, _ in picture['sources']['webp']], [300, 600])
+        for _, name in picture['sources']['avif'] + picture['sources']['webp']:
+            self.assertNotEqual(self.storage.stored_name(name), name)
+            self.assertTrue(self.storage.exists(self.storage.stored_name(name)))
+
+    def test_avif_is_skipped_when_pillow_cannot_encode_it(self):
+        def check_module(key):
+            if key == 'avif':
+                raise ValueError("Unknown module 'avif'")  # what Pillow < 11.2 does
+            return True
+
+        with mock.patch('PIL.features.check_module', side_effect=check_module), \
+                self.assertLogs('foundation_app.storage', 'WARNING'):
+            self.collect()
+        picture = OptimizedImageStaticStorage(location=self.storage.location).pictures['images/banner.png']
+        self.assertEqual(list(picture['sources']), ['webp'])
+
+    def test_unchanged_images_are_served_from_the_cache(self):
+        self.collect()
+        with mock.patch('foundation_app.storage.ProcessPoolExecutor') as pool:
+            self.collect()
+        pool.assert_not_called()
+
+    def test_static_picture_falls_back_to_img_without_variants(self):
+        html = Template("{% load media_tags %}{% static_picture 'foundation_app/images/243.jpg' alt='x' %}").render(Context())
+        self.assertTrue(html.startswith('<img src="/static/foundation_app/images/243.jpg"'))
+
+
+class InlineExecutor:
+    """Stands in for the process pool of build_image_derivatives: forked workers can't see the test database."""
+
+    def __init__(self, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def submit(self, fn, *args):
+        from concurrent.futures import Future
+
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+
+
+@override_settings(RESPONSIVE_IMAGE_WIDTHS=(100, 200, 400))
+class ResponsiveImageTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = self.settings(MEDIA_ROOT=media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def upload(self, size, colour):
+        buffer = io.BytesIO()
+        Image.new('RGB', size, colour).save(buffer, 'PNG')
+        return SimpleUploadedFile('photo.png', buffer.getvalue(), 'image/png')
+
+    def stored(self, names):
+        from django.core.files.storage import default_storage
+
+        return [default_storage.exists(name) for name in names]
+
+    def test_saving_an_image_builds_webp_and_jpeg_at_each_width(self):
+        from django.core.files.storage import default_storage
+
+        photo = GalleryImage.objects.create(title='Field day', image=self.upload((300, 150), (16, 128, 96)))
+        derivatives = GalleryImage.objects.get().image_derivatives
+        self.assertEqual(derivatives['source'], photo.image.name)
+        self.assertEqual((derivatives['width'], derivatives['height']), (300, 150))
+        for key, pillow_format in (('webp', 'WEBP'), ('jpeg', 'JPEG')):
+            self.assertEqual([width for width, _ in derivatives[key]], [100, 200, 300])  # never wider than the original
+            for width, name in derivatives[key]:
+                with default_storage.open(name) as fh, Image.open(fh) as image:
+                    self.assertEqual((image.format, image.width), (pillow_format, width))
+
+    def test_replacing_or_deleting_the_image_drops_the_old_derivatives(self):
+        from .imaging import derivative_names
+
+        with self.captureOnCommitCallbacks(execute=True):
+            photo = GalleryImage.objects.create(title='Field day', image=self.upload((300, 150), (16, 128, 96)))
+        old = derivative_names(photo.image_derivatives)
+        with self.captureOnCommitCallbacks(execute=True):
+            photo.image = self.upload((250, 250), (200, 40, 40))
+            photo.save()
+        new = derivative_names(photo.image_derivatives)
+        self.assertEqual(self.stored(old), [False] * 6)
+        self.assertEqual(self.stored(new), [True] * 6)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            photo.delete()
+        self.assertEqual(self.stored(new), [False] * 6)
+
+    def test_build_image_derivatives_backfills_rows_without_them(self):
+        from django.db import connections
+
+        photo = GalleryImage.objects.create(title='Field day', image=self.upload((300, 150), (16, 128, 96)))
+        GalleryImage.objects.update(image_derivatives={})
+
+        with mock.patch('foundation_app.management.commands.build_image_derivatives.ProcessPoolExecutor', InlineExecutor), \
+                mock.patch.object(connections, 'close_all'):
+            call_command('build_image_derivatives', workers=1, stdout=io.StringIO())
+            out = io.StringIO()
+            call_command('build_image_derivatives', workers=1, stdout=out)
+        derivatives = GalleryImage.objects.get().image_derivatives
+        self.assertEqual(derivatives['source'], photo.image.name)
+        self.assertEqual(len(derivatives['webp']), 3)
+        self.assertIn('up to date', out.getvalue())
+
+    def test_the_tag_renders_a_picture_with_srcsets(self):
+        from django.core.files.storage import default_storage
+
+        photo = GalleryImage.objects.create(title='Field day', image=self.upload((300, 150), (16, 128, 96)))
+        html = Template(
+            '{% load media_tags %}{% responsive_image photo sizes="(min-width: 768px) 25vw, 50vw" alt="Field" %}'
+        ).render(Context({'photo': photo}))
+
+        self.assertTrue(html.startswith('<picture'))
+        self.assertEqual(html.count('sizes="(min-width: 768px) 25vw, 50vw"'), 2)
+        derivatives = photo.image_derivatives
+        webp = ', '.join(f'{default_storage.url(name)} {width}w' for width, name in derivatives['webp'])
+        jpeg = ', '.join(f'{default_storage.url(name)} {width}w' for width, name in derivatives['jpeg'])
+        self.assertIn(f'<source type="image/webp" srcset="{webp}"', html)
+        self.assertIn(f'src="{default_storage.url(derivatives["jpeg"][-1][1])}" srcset="{jpeg}"', html)
+
+        photo.image_derivatives = {}
+        html = Template('{% load media_tags %}{% responsive_image photo %}').render(Context({'photo': photo}))
+        self.assertNotIn('<picture', html)
+        self.assertIn(f'src="{photo.image.url}"', html)
+
+
+class ImagePlaceholderTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = self.settings(MEDIA_ROOT=media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def upload(self, size, colour):
+        buffer = io.BytesIO()
+        Image.new('RGB', size, colour).save(buffer, 'PNG')
+        return SimpleUploadedFile('photo.png', buffer.getvalue(), 'image/png')
+
+    def test_placeholder_is_computed_from_the_upload(self):
+        photo = GalleryImage.objects.create(title='Field day', image=self.upload((400, 200), (16, 128, 96)))
+        photo.refresh_from_db()
+        self.assertEqual((photo.image_width, photo.image_height), (400, 200))
+        self.assertEqual(photo.image_color, '#108060')
+        # 4x2 components, then the average colour in the DC term
+        self.assertTrue(photo.image_blurhash.startswith('C'))
+        self.assertEqual(len(photo.image_blurhash), 4 + 2 * 4 * 2)
+
+    def test_saving_without_a_new_upload_keeps_the_placeholder(self):
+        photo = GalleryImage.objects.create(title='Field day', image=self.upload((300, 300), (200, 40, 40)))
+        blurhash = photo.image_blurhash
+        photo.title = 'Renamed'
+        photo.save()
+        photo.refresh_from_db()
+        self.assertEqual(photo.image_blurhash, blurhash)
+        self.assertIn(f'data-blurhash="{blurhash}"', Template(
+            '{% load media_tags %}{% responsive_image photo %}'
+        ).render(Context({'photo': photo})))
+
+
+class StubVideoFetcher:
+    calls = []
+
+    def fetch(self, provider, video_id):
+        self.calls.append((provider, video_id))
+        return {'title': f'{provider} {video_id}', 'thumbnail_url': 'https://img.example.org/t.jpg', 'duration': 754}
+
+
+@override_settings(VIDEO_METADATA_FETCHER='foundation_app.tests.StubVideoFetcher', VIDEO_METADATA_ASYNC=False)
+class VideoEmbedTests(TestCase):
+    def setUp(self):
+        StubVideoFetcher.calls.clear()
+
+    def test_urls_are_parsed(self):
+        for url, expected in [
+            ('https://www.youtube.com/watch?v=vlZw2cO3_14&t=10', ('youtube', 'vlZw2cO3_14')),
+            ('https://youtu.be/gLqqsZvPOEY', ('youtube', 'gLqqsZvPOEY')),
+            ('https://www.youtube.com/embed/gLqqsZvPOEY', ('youtube', 'gLqqsZvPOEY')),
+            ('https://player.vimeo.com/video/76979871', ('vimeo', '76979871')),
+            ('https://example.org/video.mp4', ('', '')),
+        ]:
+            self.assertEqual(video_embeds.parse_video_url(url), expected, url)
+
+    def test_metadata_is_fetched_once_after_commit_and_rendered(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            video = Video.objects.create(title='Clean water', url='https://youtu.be/gLqqsZvPOEY')
+        video.refresh_from_db()
+        self.assertEqual(StubVideoFetcher.calls, [('youtube', 'gLqqsZvPOEY')])
+        self.assertEqual((video.embed_title, video.duration), ('youtube gLqqsZvPOEY', 754))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            video.title = 'Renamed'
+            video.save()
+        self.assertEqual(len(StubVideoFetcher.calls), 1)
+
+        html = Template('{% load media_tags %}{% video_facade video %}').render(Context({'video': video}))
+        self.assertIn('data-embed-src="https://www.youtube-nocookie.com/embed/gLqqsZvPOEY?autoplay=1"', html)
+        self.assertIn('src="https://img.example.org/t.jpg"', html)
+        self.assertIn('12:34', html)
+        self.assertNotIn('<iframe', html)
+
+
+class MediaServingTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = self.settings(MEDIA_ROOT=media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.root = media.name
+        self.data = bytes(range(256)) * 40
+        with open(os.path.join(self.root, 'clip.mp4'), 'wb') as fh:
+            fh.write(self.data)
+
+    def get(self, path='/media/clip.mp4', **headers):
+        response = self.client.get(path, headers=headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        response.close()
+        return response, body
+
+    def test_ranges_are_answered_with_partial_content(self):
+        response, body = self.get()
+        self.assertEqual((response.status_code, body), (200, self.data))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+
+        response, body = self.get(Range='bytes=100-199')
+        self.assertEqual((response.status_code, body), (206, self.data[100:200]))
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.data)}')
+        self.assertEqual(response['Content-Length'], '100')
+
+        response, body = self.get(Range='bytes=-10')
+        self.assertEqual((response.status_code, body), (206, self.data[-10:]))
+
+        response, _ = self.get(Range=f'bytes={len(self.data)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.data)}')
+
+    def test_if_range_and_revalidation_use_the_etag(self):
+        etag = self.get()[0]['ETag']
+        self.assertEqual(self.get(Range='bytes=0-9', If_Range=etag)[0].status_code, 206)
+        self.assertEqual(self.get(Range='bytes=0-9', If_Range='"stale"')[0].status_code, 200)
+        self.assertEqual(self.get(If_None_Match=etag)[0].status_code, 304)
+        self.assertEqual(self.get('/media/../settings.py')[0].status_code, 404)
+
+    @override_settings(MEDIA_ACCEL='x-accel-redirect')
+    def test_blobs_are_immutable_and_can_be_offloaded(self):
+        name = f'blobs/3f/{"3f2a9c81b7d4" * 5}abcd.mp4'
+        os.makedirs(os.path.join(self.root, 'blobs', '3f'))
+        os.rename(os.path.join(self.root, 'clip.mp4'), os.path.join(self.root, name))
+        response, body = self.get(f'/media/{name}')
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{name}')
+        self.assertEqual(body, b'')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_names_that_merely_look_hashed_are_not_immutable(self):
+        for name in ('IMG_20240101123045.jpg', 'clip.3f2a9c81b7d4.mp4'):
+            os.link(os.path.join(self.root, 'clip.mp4'), os.path.join(self.root, name))
+            response, _ = self.get(f'/media/{name}')
+            self.assertNotIn('immutable', response['Cache-Control'])
+
+
+class ChunkedUploadTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = self.settings(
+            MEDIA_ROOT=os.path.join(media.name, 'media'), CHUNKED_UPLOAD_DIR=os.path.join(media.name, 'uploads'),
+            CHUNKED_UPLOAD_CHUNK_SIZE=1000,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        self.staff = User.objects.create_superuser('editor', 'editor@example.org', 'x')
+        self.client.force_login(self.staff)
+
+    def put(self, url, data, offset, checksum=None):
+        digest = checksum or hashlib.sha256(data).digest()
+        return self.client.put(url, data, content_type='application/offset+octet-stream', headers={
+            'Upload-Offset': str(offset), 'Upload-Checksum': 'sha256 ' + base64.b64encode(digest).decode(),
+        })
+
+    def test_chunks_are_verified_resumed_and_moved_into_the_field(self):
+        data = os.urandom(2500)
+        response = self.client.post(reverse('foundation_app:upload_session_create'), {
+            'target': 'foundation_app.Review.video', 'filename': 'story.mp4', 'size': len(data),
+        })
+        self.assertEqual(response.status_code, 201)
+        url = response.json()['url']
+
+        self.assertEqual(self.put(url, data[:1000], 0).status_code, 200)
+        self.assertEqual(self.put(url, data[1000:2000], 1000, checksum=b'\0' * 32).status_code, 460)
+        response = self.put(url, data[:1000], 0)  # a retry of a chunk that already arrived
+        self.assertEqual((response.status_code, response['Upload-Offset']), (409, '1000'))
+        self.assertEqual(self.client.get(url).json()['offset'], 1000)
+        self.put(url, data[1000:2000], 1000)
+        status = self.put(url, data[2000:], 2000).json()
+        self.assertTrue(status['complete'])
+
+        session_id = status['id']
+        part = uploads.part_path(UploadSession.objects.get(pk=session_id))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('admin:foundation_app_review_add'), {
+                'title': 'A story', 'video__upload': session_id,
+            })
+        self.assertEqual(response.status_code, 302)
+        review = Review.objects.get()
+        with review.video.open('rb') as fh:
+            self.assertEqual(fh.read(), data)
+        self.assertFalse(os.path.exists(part))  # moved, not copied
+        self.assertFalse(UploadSession.objects.exists())
+
+    @override_settings(CHUNKED_UPLOAD_HASH_ASYNC=False)
+    def test_a_finished_upload_is_hashed_once_and_not_read_again_on_save(self):
+        from .storage import blob_name
+
+        data = os.urandom(40 * 1000 + 123)
+        url = self.client.post(reverse('foundation_app:upload_session_create'), {
+            'target': 'foundation_app.Review.video', 'filename': 'talk.mp4', 'size': len(data),
+        }).json()['url']
+        for offset in range(0, len(data), 1000):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.put(url, data[offset:offset + 1000], offset)
+        status = self.client.get(url).json()
+        self.assertTrue(status['complete'])
+        self.assertEqual(status['sha256'], hashlib.sha256(data).hexdigest())
+
+        with mock.patch.object(uploads.ChunkedUploadedFile, 'chunks', side_effect=AssertionError("read again")), \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('admin:foundation_app_review_add'), {
+                'title': 'A talk', 'video__upload': status['id'],
+            })
+        self.assertEqual(response.status_code, 302)
+        review = Review.objects.get()
+        self.assertEqual(review.video.name, blob_name(status['sha256'], 'talk.mp4'))
+        with review.video.open('rb') as fh:
+            self.assertEqual(fh.read(), data)
+
+    def test_sessions_are_private_and_limited_to_configured_fields(self):
+        response = self.client.post(reverse('foundation_app:upload_session_create'), {
+            'target': 'foundation_app.Project.image', 'filename': 'x.jpg', 'size': 10,
+        })
+        self.assertEqual(response.status_code, 400)
+        session = uploads.create_session(
+            User.objects.create_user('other', is_staff=True), 'foundation_app.Review.video', 'x.mp4', 10,
+        )
+        self.assertEqual(self.client.get(reverse('foundation_app:upload_session_detail', args=[session.pk])).status_code, 404)
+
+
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = self.settings(MEDIA_ROOT=media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        buffer = io.BytesIO()
+        Image.new('RGB', (64, 48), (30, 90, 200)).save(buffer, 'PNG')
+        self.png = buffer.getvalue()
+
+    def upload(self, name):
+        return SimpleUploadedFile(name, self.png, 'image/png')
+
+    def test_identical_uploads_share_one_blob_until_the_last_reference_goes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            gallery = GalleryImage.objects.create(title='Camp', image=self.upload('camp.png'))
+            event = EventPhoto.objects.create(image=self.upload('IMG_0001.png'))
+        digest = hashlib.sha256(self.png).hexdigest()
+        self.assertEqual(gallery.image.name, f'blobs/{digest[:2]}/{digest}.png')
+        self.assertEqual(event.image.name, gallery.image.name)
+        self.assertEqual(MediaBlob.objects.get(name=gallery.image.name).refcount, 2)
+        path = gallery.image.path
+
+        with self.captureOnCommitCallbacks(execute=True):
+            gallery.delete()
+        self.assertTrue(os.path.exists(path))
+        with self.captureOnCommitCallbacks(execute=True):
+            event.delete()
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(MediaBlob.objects.filter(name=gallery.image.name).exists())
+
+    def test_dedupe_media_converts_files_stored_before(self):
+        for folder in ('gallery', 'event_photos'):
+            os.makedirs(os.path.join(settings.MEDIA_ROOT, folder))
+            with open(os.path.join(settings.MEDIA_ROOT, folder, 'same.png'), 'wb') as fh:
+                fh.write(self.png)
+        GalleryImage.objects.bulk_create([GalleryImage(title='Old', image='gallery/same.png')])
+        EventPhoto.objects.bulk_create([EventPhoto(image='event_photos/same.png')])
+
+        call_command('dedupe_media', stdout=io.StringIO())
+        names = {GalleryImage.objects.get().image.name, EventPhoto.objects.get().image.name}
+        self.assertEqual(len(names), 1)
+        self.assertEqual(MediaBlob.objects.get(name=names.pop()).refcount, 2)
+        self.assertFalse(os.path.exists(os.path.join(settings.MEDIA_ROOT, 'gallery', 'same.png')))
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        News.objects.bulk_create(ROW_FACTORIES[News](3))
+
+    def get(self, name):
+        return self.client.get(reverse(f'foundation_app:{name}'), HTTP_HOST='localhost')
+
+    def test_saving_a_model_drops_only_the_pages_that_read_it(self):
+        self.assertEqual(self.get('news_list')['X-Response-Cache'], 'MISS')
+        self.assertEqual(self.get('news_list')['X-Response-Cache'], 'HIT')
+        self.assertEqual(self.get('all_projects')['X-Response-Cache'], 'MISS')
+
+        News.objects.create(title='Fresh', slug='fresh', content='c')
+        response = self.get('news_list')
+        self.assertEqual(response['X-Response-Cache'], 'MISS')
+        self.assertContains(response, 'Fresh')
+        self.assertEqual(self.get('all_projects')['X-Response-Cache'], 'HIT')
+
+        News.objects.get(slug='fresh').delete()
+        response = self.get('news_list')
+        self.assertEqual(response['X-Response-Cache'], 'MISS')
+        self.assertNotContains(response, 'Fresh')
+
+    def test_tracking_parameters_share_the_untagged_entry(self):
+        url = reverse('foundation_app:news_list')
+        self.assertEqual(self.get('news_list')['X-Response-Cache'], 'MISS')
+        for query in ({'utm_source': 'newsletter'}, {'fbclid': 'abc'}, {'utm_campaign': 'x', 'ref': 'y'}):
+            with self.subTest(query=query):
+                response = self.client.get(url, query, HTTP_HOST='localhost')
+                self.assertEqual(response['X-Response-Cache'], 'HIT')
+        # The cursor is part of the key, so this runs the view, which rejects it.
+        self.assertEqual(self.client.get(url, {'cursor': 'x'}, HTTP_HOST='localhost').status_code, 404)
+
+    def test_signed_in_users_bypass_the_cache(self):
+        self.get('news_list')
+        self.client.force_login(User.objects.create_user('member'))
+        self.assertNotIn('X-Response-Cache', self.get('news_list'))
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        News.objects.bulk_create(ROW_FACTORIES[News](3))
+
+    def test_unchanged_pages_are_not_modified_without_running_the_view(self):
+        url = reverse('foundation_app:news_list')
+        first = self.client.get(url, HTTP_HOST='localhost')
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('no-cache', first['Cache-Control'])
+
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(url, HTTP_HOST='localhost', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertFalse([q for q in queries.captured_queries if 'foundation_app_news' in q['sql']])
+
+    def test_saving_a_model_changes_the_etag_of_pages_that_read_it(self):
+        news_url = reverse('foundation_app:news_list')
+        about_url = reverse('foundation_app:about_us')
+        news_etag = self.client.get(news_url, HTTP_HOST='localhost')['ETag']
+        about_etag = self.client.get(about_url, HTTP_HOST='localhost')['ETag']
+
+        News.objects.create(title='Fresh', slug='fresh', content='c')
+        response = self.client.get(news_url, HTTP_HOST='localhost', HTTP_IF_NONE_MATCH=news_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], news_etag)
+        self.assertContains(response, 'Fresh')
+        self.assertIn('Last-Modified', response)
+        response = self.client.get(about_url, HTTP_HOST='localhost', HTTP_IF_NONE_MATCH=about_etag)
+        self.assertEqual(response.status_code, 304)
+
+
+class StaticSiteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        override = self.settings(STATIC_SITE_ROOT=root.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.first, self.second = News.objects.bulk_create(ROW_FACTORIES[News](2))
+
+    def exported(self, url):
+        return os.path.exists(static_site.file_for(url))
+
+    def test_pages_are_exported_and_served_without_queries(self):
+        call_command('build_static_site', workers=1, stdout=io.StringIO())
+        url = reverse('foundation_app:news_list')
+        self.assertTrue(self.exported(url))
+        self.assertEqual(static_site.stale_paths(), [])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_HOST='localhost')
+        self.assertEqual(response['X-Static-Site'], 'HIT')
+        self.assertIn(self.first.title, b''.join(response.streaming_content).decode())
+        self.assertEqual(len(queries), 0)
+        response = self.client.get(url, {'cursor': 'x'}, HTTP_HOST='localhost')
+        self.assertNotIn('X-Static-Site', response)
+
+    def test_a_change_only_rebuilds_the_pages_that_show_it(self):
+        call_command('build_static_site', workers=1, stdout=io.StringIO())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.title = 'Corrected'
+            self.first.save()
+        changed = [reverse('foundation_app:news_list'), reverse('foundation_app:news_detail', args=[self.first.pk])]
+        self.assertEqual(static_site.stale_paths(), sorted(changed))
+        self.assertFalse(any(self.exported(url) for url in changed))
+        self.assertTrue(self.exported(reverse('foundation_app:news_detail', args=[self.second.pk])))
+        self.assertTrue(self.exported(reverse('foundation_app:home')))
+
+        out = io.StringIO()
+        call_command('build_static_site', workers=1, stdout=out)
+        self.assertIn('2 to render', out.getvalue())
+        with open(static_site.file_for(changed[1])) as fh:
+            self.assertIn('Corrected', fh.read())
+
+    def test_a_render_overlapping_a_change_is_not_recorded_as_fresh(self):
+        path = reverse('foundation_app:news_detail', args=[self.first.pk])
+        static_site.sync_pages()
+        result = static_site.render_page(path)  # reads the old row...
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.title = 'Corrected'
+            self.first.save()
+        static_site._write(static_site.file_for(path), b'old page')  # ...and its write lands after the change
+        static_site.record_results([result])
+        self.assertIn(path, static_site.stale_paths())
+        self.assertFalse(self.exported(path))
+
+
+class WriteBehindSubmissionTests(TestCase):
+    def setUp(self):
+        spool = tempfile.TemporaryDirectory()
+        self.addCleanup(spool.cleanup)
+        override = self.settings(SUBMISSION_WRITE_BEHIND=True, SUBMISSION_SPOOL_DIR=spool.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        # No flusher thread: it would write outside the test's transaction.
+        patcher = mock.patch('foundation_app.submissions._flusher')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def submit(self, **data):
+        from .forms import ContactForm
+        from .submissions import save_submission
+
+        form = ContactForm({'name': 'Asha', 'email': 'a@example.org', 'subject': 'Hi', 'message': 'Hello', **data})
+        self.assertTrue(form.is_valid())
+        self.assertIsNone(save_submission(form))
+
+    def test_rows_keep_their_submission_time(self):
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        from .submissions import flush
+
+        submitted = timezone.now() - timedelta(minutes=5)
+        with mock.patch('foundation_app.submissions.timezone.now', return_value=submitted):
+            self.submit()
+        self.assertEqual(flush(), 1)
+        self.assertEqual(ContactMessage.objects.get().submitted_at, submitted)
+
+    def test_queued_forms_reach_the_database_on_flush(self):
+        from .forms import VolunteerForm
+        from .submissions import flush, save_submission
+
+        for i in range(3):
+            self.submit(name=f'Sender {i}')
+        form = VolunteerForm({'full_name': 'Ravi', 'email': 'r@example.org', 'availability': 'Weekends'})
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertIsNone(save_submission(form))
+        self.assertFalse(ContactMessage.objects.exists())
+
+        self.assertEqual(flush(), 4)
+        self.assertEqual(ContactMessage.objects.count(), 3)
+        self.assertEqual(Volunteer.objects.get().full_name, 'Ravi')
+        self.assertEqual(os.listdir(settings.SUBMISSION_SPOOL_DIR), [])
+        self.assertEqual(flush(), 0)
+
+    def test_a_batch_left_half_inserted_is_replayed_once(self):
+        from .submissions import _claim_pending, _insert, _read_batch
+
+        self.submit(name='First')
+        self.submit(name='Second')
+        # A worker claimed the spool and died after inserting its first row.
+        batch = _claim_pending(settings.SUBMISSION_SPOOL_DIR)
+        fd = os.open(batch, os.O_RDONLY)
+        try:
+            _insert(_read_batch(fd)[:1])
+        finally:
+            os.close(fd)
+
+        call_command('flush_submissions', stdout=io.StringIO())
+        self.assertEqual(sorted(ContactMessage.objects.values_list('name', flat=True)), ['First', 'Second'])
+        self.assertFalse(os.path.exists(batch))
+
+
+class PaymentGatewayTests(TestCase):
+    def gateway(self, base_url='http://127.0.0.1:9', **options):
+        from .payments import RazorpayGateway
+
+        options = {'max_retries': 2, 'backoff': 0, 'failure_threshold': 2, **options}
+        return RazorpayGateway('key', 'secret', base_url=base_url, **options)
+
+    def test_the_breaker_opens_then_lets_one_trial_through(self):
+        from .payments import CircuitBreaker
+
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+        with mock.patch('foundation_app.payments.time.monotonic', return_value=100):
+            breaker.record_failure()
+            self.assertTrue(breaker.allow())
+            breaker.record_failure()
+            self.assertFalse(breaker.allow())
+        with mock.patch('foundation_app.payments.time.monotonic', return_value=131):
+            self.assertTrue(breaker.allow())
+            self.assertFalse(breaker.allow())  # only one trial at a time
+            breaker.record_failure()
+            self.assertFalse(breaker.allow())
+        with mock.patch('foundation_app.payments.time.monotonic', return_value=162):
+            self.assertTrue(breaker.allow())
+            breaker.record_success()
+            self.assertFalse(breaker.is_open)
+            self.assertTrue(breaker.allow())
+
+    def test_only_idempotent_calls_and_connect_timeouts_are_retried(self):
+        import requests
+
+        from .payments import PaymentGatewayError
+
+        cases = (
+            ('fetch_order', requests.exceptions.ReadTimeout, 3),
+            ('create_order', requests.exceptions.ReadTimeout, 1),
+            ('create_order', requests.exceptions.ConnectTimeout, 3),
+        )
+        for method, error, calls in cases:
+            with self.subTest(method=method, error=error.__name__):
+                gateway = self.gateway(failure_threshold=10)
+                argument = {'amount': 50000} if method == 'create_order' else 'order_x'
+                with mock.patch.object(gateway.session, 'request', side_effect=error) as request, \
+                        mock.patch('foundation_app.payments.logger') as logger:
+                    with self.assertRaises(PaymentGatewayError):
+                        getattr(gateway, method)(argument)
+                self.assertEqual(request.call_count, calls)
+                self.assertEqual(logger.warning.call_count, calls - 1)
+
+    def test_a_failing_gateway_is_short_circuited(self):
+        from .payments import CircuitOpenError, PaymentGatewayError
+        from .razorpay_stub import start_stub_server
+
+        server = start_stub_server(failure_rate=1.0)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        gateway = self.gateway(server.base_url, max_retries=0)
+        for _ in range(2):
+            with self.assertRaises(PaymentGatewayError):
+                gateway.fetch_order('order_x')
+        with mock.patch.object(gateway.session, 'request') as request:
+            with self.assertRaises(CircuitOpenError):
+                gateway.fetch_order('order_x')
+        request.assert_not_called()
+
+        server.failure_rate = 0
+        gateway.breaker.reset_timeout = 0
+        order = gateway.create_order({'amount': 50000, 'currency': 'INR'})
+        self.assertEqual(gateway.fetch_order(order['id'])['amount'], 50000)
+        self.assertFalse(gateway.breaker.is_open)
+
+
+@override_settings(RAZORPAY_WEBHOOK_SECRET='whsec')
+class PaymentWebhookTests(TestCase):
+    def setUp(self):
+        self.donation = Donation.objects.create(amount=Decimal('250'), razorpay_order_id='order_w')
+
+    def deliver(self, event_type, event_id, payment=None):
+        import hmac
+
+        entity = payment or {'id': f'pay_{event_id}', 'order_id': 'order_w'}
+        body = json.dumps({'event': event_type, 'payload': {'payment': {'entity': entity}}}).encode()
+        signature = hmac.new(b'whsec', body, hashlib.sha256).hexdigest()
+        return self.client.post(
+            reverse('foundation_app:payment_webhook'), body, content_type='application/json', HTTP_HOST='localhost',
+            HTTP_X_RAZORPAY_SIGNATURE=signature, HTTP_X_RAZORPAY_EVENT_ID=event_id,
+        )
+
+    def test_redeliveries_are_stored_once(self):
+        self.assertEqual(self.deliver('payment.captured', 'evt_1').status_code, 200)
+        self.assertEqual(self.deliver('payment.captured', 'evt_1').status_code, 200)
+        self.assertEqual(PaymentWebhookEvent.objects.count(), 1)
+
+    def test_a_failed_attempt_followed_by_a_capture_is_captured(self):
+        from .webhooks import process_pending_events
+
+        self.deliver('payment.failed', 'evt_1')
+        self.deliver('payment.captured', 'evt_2')
+        self.assertEqual(process_pending_events(), (2, 0))
+        self.donation.refresh_from_db()
+        self.assertEqual((self.donation.status, self.donation.razorpay_payment_id), (Donation.STATUS_CAPTURED, 'pay_evt_2'))
+        self.assertFalse(PaymentWebhookEvent.objects.filter(processed_at__isnull=True).exists())
+
+    @override_settings(PAYMENT_WEBHOOK_MAX_ATTEMPTS=2, PAYMENT_WEBHOOK_RETRY_DELAY=0)
+    def test_events_that_raise_are_retried_then_given_up(self):
+        from .webhooks import process_pending_events
+
+        self.deliver('payment.captured', 'evt_bad', payment={'id': 'pay_x'})  # no order_id
+        self.deliver('payment.captured', 'evt_ok')
+        with self.assertLogs('foundation_app.webhooks', 'ERROR'):
+            self.assertEqual(process_pending_events(), (1, 1))
+        bad = PaymentWebhookEvent.objects.get(event_id='evt_bad')
+        self.assertEqual((bad.processed_at, bad.attempts), (None, 1))
+        self.assertIn('KeyError', bad.error)
+        self.assertIsNotNone(PaymentWebhookEvent.objects.get(event_id='evt_ok').processed_at)
+
+        with self.assertLogs('foundation_app.webhooks', 'ERROR'):
+            process_pending_events()
+        bad.refresh_from_db()
+        self.assertEqual(bad.attempts, 2)
+        self.assertIsNotNone(bad.processed_at)
+
+    @override_settings(PAYMENT_WEBHOOK_RETRY_DELAY=60)
+    def test_the_command_backs_off_from_failing_events(self):
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        self.deliver('payment.captured', 'evt_bad', payment={'id': 'pay_x'})  # no order_id
+        with self.assertLogs('foundation_app.webhooks', 'ERROR'):
+            call_command('process_payment_webhooks', batch_size=1, stdout=io.StringIO())
+        bad = PaymentWebhookEvent.objects.get()
+        self.assertEqual(bad.attempts, 1)  # a full batch of failures isn't pulled again straight away
+        self.assertAlmostEqual(bad.next_attempt_at, timezone.now() + timedelta(seconds=60), delta=timedelta(seconds=5))
+
+        out = io.StringIO()
+        call_command('process_payment_webhooks', batch_size=1, stdout=out)
+        bad.refresh_from_db()
+        self.assertEqual(bad.attempts, 1)
+        self.assertIn('Processed 0', out.getvalue())
+
+        PaymentWebhookEvent.objects.update(next_attempt_at=timezone.now())
+        with self.assertLogs('foundation_app.webhooks', 'ERROR'):
+            call_command('process_payment_webhooks', batch_size=1, stdout=io.StringIO())
+        bad.refresh_from_db()
+        self.assertEqual(bad.attempts, 2)
+        self.assertAlmostEqual(bad.next_attempt_at, timezone.now() + timedelta(seconds=120), delta=timedelta(seconds=5))
+
+    def test_a_bad_checkout_signature_is_rejected(self):
+        response = self.client.post(reverse('foundation_app:payment_success'), {
+            'razorpay_order_id': 'order_1', 'razorpay_payment_id': 'pay_1', 'razorpay_signature': 'forged',
+        }, HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 400)
+
+
+class StartupTests(TestCase):
+    def test_warm_up_compiles_templates_and_resolves_urls(self):
+        from django.template import engines
+
+        from PCF import startup
+
+        self.assertGreater(startup.compile_templates(), 10)
+        loader = engines.all()[0].engine.template_loaders[0]
+        self.assertIn('foundation_app/base.html', loader.get_template_cache)
+        self.assertGreater(startup.warm_urls(), 10)
+
+    @override_settings(STARTUP_PRELOAD_MODULES=('foundation_app.views', 'no_such_module'))
+    def test_warm_up_runs_every_step_and_drops_connections_before_fork(self):
+        from PCF import startup
+
+        # The test's own connection is inside a transaction; only check that it would be closed.
+        with mock.patch('PCF.startup.connections.close_all') as close_all, \
+                self.assertLogs('PCF.startup', 'INFO') as logs:
+            timings = startup.warm_up()
+        self.assertEqual(set(timings), {'imports', 'templates', 'urls'})
+        close_all.assert_called_once_with()
+        self.assertTrue(any('Could not preload no_such_module' in line for line in logs.output))
+
+    def test_freeze_moves_live_objects_out_of_collection(self):
+        import gc
+
+        from PCF import startup
+
+        self.addCleanup(gc.unfreeze)
+        survivor = []
+        startup.freeze()
+        self.assertGreater(gc.get_freeze_count(), 0)
+        # Frozen objects live in the permanent generation, which collections don't walk.
+        self.assertFalse(any(obj is survivor for obj in gc.get_objects()))
+
+
+class AsyncViewTests(TestCase):
+    @override_settings(PERF_TIMING_SAMPLE_RATE=1.0, PERF_SERVER_TIMING_HEADER='all')
+    async def test_async_middleware_chain_times_requests(self):
+        await News.objects.acreate(title='Headline', slug='headline', content='c')
+        response = await self.async_client.get(reverse('foundation_app:news_list'), HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+
+    async def test_async_list_view_pages_with_async_orm(self):
+        from django.contrib.auth.models import AnonymousUser
+        from django.test import AsyncRequestFactory
+        from django.urls import resolve
+
+        from . import async_views
+
+        for i in range(12):
+            await News.objects.acreate(title=f'Item {i}', slug=f'item-{i}', content='c')
+        path = reverse('foundation_app:news_list')
+        view = async_views.NewsListView.as_view()
+
+        async def anonymous():
+            return AnonymousUser()
+
+        for expected in ('MISS', 'HIT'):
+            request = AsyncRequestFactory().get(path, HTTP_HOST='localhost')
+            request.resolver_match = resolve(path)
+            request.auser = anonymous
+            response = await view(request)
+            if hasattr(response, 'render'):
+                await sync_to_async(response.render)()
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['X-Response-Cache'], expected)
+        self.assertIn(b'Item 11', response.content)
+        self.assertIn(b'cursor=', response.content)
+
+    @skipUnless(importlib.util.find_spec('httpx'), "httpx is not installed")
+    async def test_async_gateway_creates_orders(self):
+        from .payments import AsyncRazorpayGateway
+        from .razorpay_stub import start_stub_server
+
+        server = start_stub_server()
+        self.addCleanup(server.shutdown)
+        gateway = AsyncRazorpayGateway('key', 'secret', base_url=f'http://127.0.0.1:{server.server_port}')
+        try:
+            order = await gateway.create_order({'amount': 50000, 'currency': 'INR'})
+            self.assertEqual((await gateway.fetch_order(order['id']))['amount'], 50000)
+        finally:
+            await gateway.aclose()
+
+    async def post_donation(self, server, **data):
+        from django.contrib.auth.models import AnonymousUser
+        from django.test import AsyncRequestFactory
+
+        from . import async_views
+        from .payments import get_async_gateway
+
+        async def anonymous():
+            return AnonymousUser()
+
+        request = AsyncRequestFactory().post(
+            reverse('foundation_app:make_donation'), data, headers={'X-Requested-With': 'XMLHttpRequest'},
+        )
+        request.auser = anonymous
+        with self.settings(RAZORPAY_API_BASE_URL=server.base_url, RAZORPAY_MAX_RETRIES=0):
+            try:
+                return await async_views.make_donation(request)
+            finally:
+                await get_async_gateway().aclose()
+
+    @skipUnless(importlib.util.find_spec('httpx'), "httpx is not installed")
+    async def test_async_donation_creates_order_and_ledger_row(self):
+        from .razorpay_stub import start_stub_server
+
+        user = await User.objects.acreate(username='organiser')
+        campaign = await Campaign.objects.acreate(
+            user=user, title='Wells', description='d', goal_amount=Decimal('1000'),
+        )
+        server = start_stub_server()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        response = await self.post_donation(server, amount='500', campaign=str(campaign.pk))
+        self.assertEqual(response.status_code, 200)
+        body = json.loads(response.content)
+        self.assertEqual(body['amount'], 50000)
+        self.assertEqual(body['currency'], 'INR')
+        self.assertEqual(server.orders[body['order_id']]['notes'], {'campaign': str(campaign.pk)})
+        donation = await Donation.objects.aget(razorpay_order_id=body['order_id'])
+        self.assertEqual(donation.amount, Decimal('500'))
+        self.assertEqual(donation.campaign_id, campaign.pk)
+        self.assertIsNone(donation.user_id)
+
+    @skipUnless(importlib.util.find_spec('httpx'), "httpx is not installed")
+    async def test_async_donation_reports_an_unavailable_gateway(self):
+        from .razorpay_stub import start_stub_server
+
+        server = start_stub_server(failure_rate=1.0)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        response = await self.post_donation(server, amount='500')
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('error', json.loads(response.content))
+        self.assertFalse(await Donation.objects.aexists())
+
+    @skipUnless(importlib.util.find_spec('httpx'), "httpx is not installed")
+    def test_async_gateway_is_kept_per_event_loop(self):
+        from .payments import _async_gateways, get_async_gateway
+
+        async def twice():
+            first = get_async_gateway()
+            self.assertIs(get_async_gateway(), first)
+            await first.aclose()
+            return first
+
+        first_loop, second_loop = asyncio.new_event_loop(), asyncio.new_event_loop()
+        self.addCleanup(second_loop.close)
+        first = first_loop.run_until_complete(twice())
+        first_loop.close()
+        second = second_loop.run_until_complete(twice())
+        self.assertIsNot(first, second)
+        self.assertNotIn(first_loop, _async_gateways)
+        self.assertIs(_async_gateways[second_loop], second)
+
+
+class SessionStoreTests(TestCase):
+    def setUp(self):
+        from .sessions import local_cache
+
+        local_cache.clear()
+        self.addCleanup(local_cache.clear)
+
+    def session_queries(self, queries):
+        return [q['sql'] for q in queries if 'django_session' in q['sql']]
+
+    def test_unchanged_sessions_are_read_from_cache_and_not_rewritten(self):
+        User.objects.create_user('donor', password='pw')
+        self.client.login(username='donor', password='pw')
+        self.client.get(reverse('foundation_app:dashboard'), HTTP_HOST='localhost')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('foundation_app:dashboard'), HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.session_queries(queries.captured_queries), [])
+
+    def test_expiry_is_renewed_lazily(self):
+        from .sessions import SessionStore, local_cache
+
+        session = SessionStore()
+        session['cart'] = 1
+        session.save()
+        local_cache.clear()
+
+        fresh = SessionStore(session.session_key)
+        self.assertEqual(fresh['cart'], 1)
+        self.assertFalse(fresh.modified)
+        with CaptureQueriesContext(connection) as queries:
+            fresh.save()
+        self.assertEqual(queries.captured_queries, [])
+
+        with self.settings(SESSION_RENEW_AFTER=0):
+            due = SessionStore(session.session_key)
+            due['cart']
+            self.assertTrue(due.modified)
+            with CaptureQueriesContext(connection) as queries:
+                due.save()
+            self.assertEqual(len(self.session_queries(queries.captured_queries)), 1)
+
+    def test_expired_rows_are_deleted_in_batches(self):
+        from datetime import timedelta
+
+        from django.contrib.sessions.models import Session
+        from django.utils import timezone
+
+        from .sessions import SessionStore
+
+        past = timezone.now() - timedelta(days=1)
+        Session.objects.bulk_create(
+            [Session(session_key=f'old{i}', session_data='', expire_date=past) for i in range(5)]
+            + [Session(session_key='live', session_data='', expire_date=past + timedelta(days=30))]
+        )
+        self.assertEqual(SessionStore.delete_expired_batch(batch_size=2), 2)
+        with self.settings(SESSION_CLEANUP_BATCH=2):
+            SessionStore.clear_expired()
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['live'])
+
+
+class DashboardTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('member'))
+
+    def test_the_shell_leaves_the_lists_to_the_fragments(self):
+        Campaign.objects.bulk_create(_campaign_rows(3))
+        Volunteer.objects.bulk_create(ROW_FACTORIES[Volunteer](3))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('foundation_app:dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, reverse('foundation_app:dashboard_campaigns'))
+        tables = ('foundation_app_campaign', 'foundation_app_volunteer')
+        self.assertFalse([q for q in queries.captured_queries if any(t in q['sql'] for t in tables)])
+
+    def test_fragments_are_bounded_pages(self):
+        for name, model, per_page in (('dashboard_campaigns', Campaign, 10), ('dashboard_volunteers', Volunteer, 20)):
+            with self.subTest(fragment=name):
+                url = reverse(f'foundation_app:{name}')
+                model.objects.bulk_create(ROW_FACTORIES[model](2))
+                with CaptureQueriesContext(connection) as few:
+                    self.client.get(url)
+                model.objects.bulk_create(ROW_FACTORIES[model](per_page * 2))
+                with CaptureQueriesContext(connection) as many:
+                    response = self.client.get(url)
+                self.assertEqual(len(many), len(few))
+                self.assertEqual(len(response.context['page_obj']), per_page)
+                self.assertTrue(response.context['page_obj'].has_next())
+
+    def test_fragments_need_a_login(self):
+        self.client.logout()
+        response = self.client.get(reverse('foundation_app:dashboard_volunteers'))
+        self.assertEqual(response.status_code, 302)
+
+
+class DonationLedgerTests(TestCase):
+    def setUp(self):
+        self.donation = Donation.objects.create(
+            campaign=Campaign.objects.bulk_create(_campaign_rows(1))[0],
+            amount=Decimal('500'), razorpay_order_id='order_retry',
+        )
+
+    def raised(self):
+        return Campaign.objects.with_totals().get(pk=self.donation.campaign_id).total_raised
+
+    def test_a_failed_attempt_can_be_captured_on_retry(self):
+        from .donations import capture_donation, fail_donation
+
+        self.assertTrue(fail_donation('order_retry', 'pay_declined'))
+        self.assertTrue(capture_donation('order_retry', 'pay_ok'))
+        self.donation.refresh_from_db()
+        self.assertEqual((self.donation.status, self.donation.razorpay_payment_id), (Donation.STATUS_CAPTURED, 'pay_ok'))
+        self.assertEqual(self.raised(), Decimal('500'))
+
+    def test_captures_are_counted_once_and_folded(self):
+        from .donations import capture_donation, fold_campaign_totals
+
+        self.assertTrue(capture_donation('order_retry', 'pay_ok'))
+        self.assertFalse(capture_donation('order_retry', 'pay_ok'))
+        self.assertEqual(fold_campaign_totals(), 1)
+        self.assertEqual(Campaign.objects.get(pk=self.donation.campaign_id).raised_amount, Decimal('500'))
+        self.assertEqual(self.raised(), Decimal('500'))
+
+    @override_settings(CAMPAIGN_TOTAL_SHARDS=4)
+    def test_shards_sum_to_the_ledger_and_rebuild_agrees(self):
+        from .donations import capture_donation, fold_campaign_totals, rebuild_campaign_totals
+        from .models import CampaignTotalShard
+
+        campaign = self.donation.campaign
+        Donation.objects.bulk_create([
+            Donation(campaign=campaign, amount=Decimal('100'), razorpay_order_id=f'order_burst_{i}') for i in range(12)
+        ])
+        for i in range(12):
+            capture_donation(f'order_burst_{i}', f'pay_burst_{i}')
+        self.assertLessEqual(CampaignTotalShard.objects.filter(campaign=campaign).count(), 4)
+        self.assertEqual(self.raised(), Decimal('1200'))
+
+        fold_campaign_totals()
+        capture_donation('order_retry', 'pay_ok')
+        self.assertEqual(self.raised(), Decimal('1700'))
+
+        Campaign.objects.filter(pk=campaign.pk).update(raised_amount=Decimal('1'))
+        rebuild_campaign_totals()
+        self.assertFalse(CampaignTotalShard.objects.exists())
+        self.assertEqual(self.raised(), Decimal('1700'))
+
+
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        for target in ('foundation_app.routers.replica_alias', 'foundation_app.middleware.replica_alias'):
+            patcher = mock.patch(target, return_value='replica')
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_reads_go_to_the_replica_unless_pinned(self):
+        import contextvars
+
+        from .routers import PrimaryReplicaRouter, pinned_to_primary, wrote_to_primary
+
+        router = PrimaryReplicaRouter()
+
+        def run():
+            pinned_to_primary.set(False)
+            wrote_to_primary.set(False)
+            routes = [router.db_for_read(News), router.db_for_read(User)]
+            pinned_to_primary.set(True)
+            routes.append(router.db_for_read(News))
+            self.assertFalse(wrote_to_primary.get())
+            routes.append(router.db_for_write(News))
+            self.assertTrue(wrote_to_primary.get())
+            return routes
+
+        self.assertEqual(contextvars.copy_context().run(run), ['replica', None, 'default', 'default'])
+        with mock.patch('foundation_app.routers.replica_alias', return_value=None):
+            self.assertEqual(router.db_for_read(News), 'default')
+
+    def test_a_write_pins_the_clients_reads_for_a_while(self):
+        import time
+
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+
+        from .middleware import PIN_COOKIE, ReplicaPinningMiddleware
+        from .routers import PrimaryReplicaRouter
+
+        router, reads = PrimaryReplicaRouter(), []
+
+        def view(request):
+            reads.append(router.db_for_read(News))
+            if request.method == 'POST':
+                router.db_for_write(News)
+            return HttpResponse()
+
+        middleware, factory = ReplicaPinningMiddleware(view), RequestFactory()
+        self.assertNotIn(PIN_COOKIE, middleware(factory.get('/')).cookies)
+        cookie = middleware(factory.post('/')).cookies[PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_PIN_SECONDS)
+
+        pinned = factory.get('/')
+        pinned.COOKIES[PIN_COOKIE] = cookie.value
+        self.assertNotIn(PIN_COOKIE, middleware(pinned).cookies)
+        expired = factory.get('/')
+        expired.COOKIES[PIN_COOKIE] = str(time.time() - 1)
+        middleware(expired)
+        self.assertEqual(reads, ['replica', 'replica', 'default', 'replica'])
+
+
+class SearchTests(TestCase):
+    def test_searching_does_not_pin_reads_to_the_primary(self):
+        import contextvars
+
+        from . import search
+        from .routers import wrote_to_primary
+
+        def run():
+            wrote_to_primary.set(False)
+            search.search_available()
+            search.search('nothing matches this')
+            return wrote_to_primary.get()
+
+        self.assertFalse(contextvars.copy_context().run(run))
+
+    def test_result_pages_stay_out_of_the_page_cache(self):
+        cache.clear()
+        url = reverse('foundation_app:search')
+        for _ in range(2):
+            response = self.client.get(url, {'q': 'water'}, HTTP_HOST='localhost')
+            self.assertNotIn('X-Response-Cache', response)
+        # They can still be revalidated.
+        response = self.client.get(url, {'q': 'water'}, HTTP_HOST='localhost', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        self.assertEqual(self.client.get(url, HTTP_HOST='localhost')['X-Response-Cache'], 'MISS')
+        self.assertEqual(self.client.get(url, HTTP_HOST='localhost')['X-Response-Cache'], 'HIT')
+
+    def test_title_matches_rank_above_body_matches(self):
+        from .search import search
+
+        News.objects.create(title='Monsoon report', slug='monsoon', content='Work on the watershed continues.')
+        News.objects.create(title='Watershed restored', slug='watershed', content='Done.')
+        Project.objects.create(title='Wells', description='A watershed survey.')
+        ContactMessage.objects.create(name='Asha', email='a@example.org', message='About the watershed')
+
+        results = search('waters')
+        self.assertEqual(results[0].title_html, '<mark>Watershed</mark> restored')
+        self.assertEqual(len(results), 3)
+        self.assertNotIn(ContactMessage, [type(result.object) for result in results])
+
+    def test_the_index_follows_saves_and_deletes(self):
+        from .search import search
+
+        def titles(text):
+            return [result.object.title for result in search(text)]
+
+        news = News.objects.create(title='Mangrove planting', slug='mangrove', content='c')
+        self.assertEqual(titles('mangrove'), ['Mangrove planting'])
+        news.title = 'Coral planting'
+        news.save()
+        self.assertEqual(titles('mangrove'), [])
+        self.assertEqual(titles('coral'), ['Coral planting'])
+        news.delete()
+        self.assertEqual(titles('coral'), [])
+
+
+class BenchmarkTests(TestCase):
+    def test_compare_runs_flags_slower_routes_and_new_queries(self):
+        from .benchmark import compare_runs
+
+        def run(**routes):
+            return {'routes': {
+                name: {'p95_ms': p95, 'queries': queries, 'errors': errors}
+                for name, (p95, queries, errors) in routes.items()
+            }}
+
+        baseline = run(home=(10.0, 3, 0), news_list=(0.4, 2, 0), gallery=(20.0, 1, 0), team=(5.0, 0, 0), about_us=(5.0, 0, 0))
+        current = run(home=(15.0, 3, 0), news_list=(0.8, 2, 0), gallery=(20.0, 2, 0), team=(5.0, 0, 1), search=(9.0, 4, 0))
+        rows, regressions = compare_runs(baseline, current)
+
+        outcomes = {name: outcome for name, _, _, _, outcome in rows}
+        self.assertEqual(outcomes, {
+            'home': 'p95_ms +50%',
+            'news_list': 'ok',  # +100%, but under min_delta_ms
+            'gallery': 'queries 1→2',
+            'team': 'errors 0→1',
+            'search': 'new',
+            'about_us': 'missing',
+        })
+        self.assertEqual(sorted(regressions), ['gallery', 'home', 'team'])
+        self.assertEqual(compare_runs(baseline, current, threshold_pct=60)[1], ['gallery', 'team'])
+
+    def test_routes_without_a_meaningful_visitor_get_are_skipped(self):
+        from .benchmark import SKIP_ROUTES, named_routes
+
+        names = [name for name, _ in named_routes()]
+        self.assertIn('news_list', names)
+        self.assertNotIn('news_detail', names)  # no row to point it at yet
+        self.assertFalse(SKIP_ROUTES & set(names))
+
+        news = News.objects.create(title='Headline', slug='headline', content='c')
+        self.assertIn(('news_detail', reverse('foundation_app:news_detail', args=[news.pk])), named_routes())
+
+    def test_command_logs_in_only_as_an_existing_user(self):
+        from django.core.management.base import CommandError
+
+        report = {'meta': {}, 'routes': {}}
+        with mock.patch('foundation_app.benchmark.run_benchmark', return_value=report) as run:
+            call_command('benchmark_urls', stdout=io.StringIO(), stderr=io.StringIO())
+            self.assertIsNone(run.call_args.kwargs['user'])
+            with self.assertRaisesMessage(CommandError, "No user named 'benchmark'"):
+                call_command('benchmark_urls', username='benchmark', stdout=io.StringIO())
+            self.assertFalse(User.objects.exists())
+
+            donor = User.objects.create_user('donor')
+            call_command('benchmark_urls', username='donor', stdout=io.StringIO(), stderr=io.StringIO())
+            self.assertEqual(run.call_args.kwargs['user'], donor)
+        self.assertEqual(run.call_count, 2)
+
+
+class SeedScaleTests(TestCase):
+    COUNTS = {'user': 4, 'campaign': 3, 'donation': 9, 'news': 6, 'contactmessage': 7}
+
+    def setUp(self):
+        # The seeder writes its placeholder images to default storage.
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = self.settings(MEDIA_ROOT=media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def seed(self, seed=7, **options):
+        call_command(
+            'seed_scale', scale=0, seed=seed, until=datetime.fromisoformat('2026-01-01'), skip_index=True,
+            count=[f'{name}={rows}' for name, rows in self.COUNTS.items()], stdout=io.StringIO(), **options,
+        )
+
+    def snapshot(self):
+        return {
+            'news': list(News.objects.order_by('slug').values_list('slug', 'title', 'created_at')),
+            'messages': list(
+                ContactMessage.objects.order_by('email', 'submitted_at').values_list('email', 'subject', 'submitted_at')
+            ),
+            'donations': list(
+                Donation.objects.order_by('razorpay_order_id').values_list('razorpay_order_id', 'amount', 'status')
+            ),
+        }
+
+    def clear(self):
+        for model in (Donation, Campaign, News, ContactMessage):
+            model.objects.all().delete()
+        User.objects.all().delete()
+
+    def test_scale_zero_seeds_exactly_the_counted_models(self):
+        self.seed(chunk_size=4)
+        self.assertEqual(User.objects.count(), 4)
+        self.assertEqual(Campaign.objects.count(), 3)
+        self.assertEqual(Donation.objects.count(), 9)
+        self.assertEqual(News.objects.count(), 6)
+        self.assertEqual(ContactMessage.objects.count(), 7)
+        self.assertFalse(Volunteer.objects.exists())
+        self.assertFalse(Project.objects.exists())
+
+    def test_the_same_seed_gives_the_same_rows(self):
+        self.seed()
+        first = self.snapshot()
+        self.clear()
+        self.seed(chunk_size=2)
+        self.assertEqual(self.snapshot(), first)
+        self.clear()
+        self.seed(seed=8)
+        self.assertNotEqual(self.snapshot(), first)
+
+    def test_bad_options_are_rejected(self):
+        from django.core.management.base import CommandError
+
+        with self.assertRaisesMessage(CommandError, "--scale can't be negative"):
+            call_command('seed_scale', scale=-1, stdout=io.StringIO())
+        with self.assertRaisesMessage(CommandError, "Bad --count 'widgets=3'"):
+            call_command('seed_scale', scale=0, count=['widgets=3'], stdout=io.StringIO())
@@ -0,0 +1,196 @@
+# foundation_app/timing.py
+"""
+Per-request timing: SQL, template rendering and external calls.
+
+``PerformanceTimingMiddleware`` puts a :class:`RequestTimings` in a context
+variable for the duration of a request; everything here adds to it when one
+is active and does nothing otherwise, so management commands and workers pay
+no cost. External calls are attributed either explicitly with
+``with timing.track('razorpay'):`` or, for libraries we don't call directly
+(Cloudinary's uploader), by host through a urllib3 hook.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+_current = ContextVar('request_timings', default=None)
+# Name of the external span in progress, so a tracked call isn't counted twice by the urllib3 hook.
+_span = ContextVar('external_span', default=None)
+
+
+class RequestTimings:
+    __slots__ = ('started', 'db_time', 'db_queries', 'template_time', 'template_depth', 'external')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_time = 0.0
+        self.db_queries = 0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.external = {}  # name -> [seconds, calls]
+
+    def add_external(self, name, seconds):
+        entry = self.external.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+
+def current():
+    return _current.get()
+
+
+@contextmanager
+def collect():
+    """Collect timings for the enclosed block; yields the :class:`RequestTimings`."""
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def track(name):
+    """Count the enclosed block as time spent in external service ``name``."""
+    timings = _current.get()
+    if timings is None or _span.get() is not None:
+        yield
+        return
+    token = _span.set(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add_external(name, time.perf_counter() - started)
+        _span.reset(token)
+
+
+def attach_query_timer(sender=None, connection=None, **kwargs):
+    """``connection_created`` receiver adding :func:`query_timer` to new connections."""
+    if query_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_timer)
+
+
+def query_timer(execute, sql, params, many, context):
+    """``connection.execute_wrapper`` that counts queries and their time."""
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.db_time += time.perf_counter() - started
+        timings.db_queries += 1
+
+
+# Templates ----------------------------------------------------------------------
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        timings = _current.get()
+        if timings is None or timings.template_depth:
+            return super().render(context, request)
+        timings.template_depth += 1
+        db_before = timings.db_time
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            # Querysets evaluated inside the template already count as DB time.
+            timings.template_time += time.perf_counter() - started - (timings.db_time - db_before)
+            timings.template_depth -= 1
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The standard Django template backend, with render time reported to the active request."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+# External HTTP ----------------------------------------------------------------------
+
+def service_for_host(host):
+    """Label for an outbound host, from ``PERF_EXTERNAL_HOSTS`` suffixes; 'http' if unknown."""
+    hosts = getattr(settings, 'PERF_EXTERNAL_HOSTS', {})
+    for suffix, name in hosts.items():
+        if host == suffix or host.endswith('.' + suffix):
+            return name
+    return 'http'
+
+
+_http_hook_installed = False
+
+
+def install_http_hook():
+    """Attribute urllib3 requests (requests, Cloudinary) made during a request to their service."""
+    global _http_hook_installed
+    if _http_hook_installed:
+        return
+    try:
+        from urllib3.connectionpool import HTTPConnectionPool
+    except ImportError:
+        return
+
+    urlopen = HTTPConnectionPool.urlopen
+
+    def timed_urlopen(pool, method, url, *args, **kwargs):
+        if _current.get() is None or _span.get() is not None:
+            return urlopen(pool, method, url, *args, **kwargs)
+        with track(service_for_host(pool.host or urlsplit(url).hostname or '')):
+            return urlopen(pool, method, url, *args, **kwargs)
+
+    HTTPConnectionPool.urlopen = timed_urlopen
+    _http_hook_installed = True
+
+
+# Reporting ------------------------------------------------------------------------
+
+def server_timing(timings, total):
+    """``Server-Timing`` header value; 'app' is whatever the other entries don't cover."""
+    external = sum(seconds for seconds, _ in timings.external.values())
+    entries = [f'db;dur={timings.db_time * 1000:.1f};desc="{timings.db_queries} queries"']
+    entries.append(f'tpl;dur={timings.template_time * 1000:.1f}')
+    for name, (seconds, calls) in sorted(timings.external.items()):
+        entries.append(f'{name};dur={seconds * 1000:.1f};desc="{calls} calls"')
+    app = max(0.0, total - timings.db_time - timings.template_time - external)
+    entries.append(f'app;dur={app * 1000:.1f}')
+    entries.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(entries)
+
+
+def record(request, response, timings, total):
+    """The structured log line for one request."""
+    match = getattr(request, 'resolver_match', None)
+    entry = {
+        'ts': round(time.time(), 3),
+        'method': request.method,
+        'path': request.path,
+        'url_name': match.view_name if match else None,
+        'status': response.status_code,
+        'total_ms': round(total * 1000, 2),
+    }
+    if timings is not None:
+        entry.update({
+            'db_ms': round(timings.db_time * 1000, 2),
+            'db_queries': timings.db_queries,
+            'template_ms': round(timings.template_time * 1000, 2),
+            'external': {
+                name: {'ms': round(seconds * 1000, 2), 'calls': calls}
+                for name, (seconds, calls) in sorted(timings.external.items())
+            },
+        })
+    return entry
@@ -0,0 +1,338 @@
+# foundation_app/uploads.py
+"""
+Resumable chunked uploads for large admin files.
+
+The admin widget (``js/chunked_upload.js``) opens an :class:`UploadSession`
+and PUTs the file in pieces of at most ``CHUNKED_UPLOAD_CHUNK_SIZE`` bytes,
+each with its ``Upload-Offset`` and ``Upload-Checksum: sha256 <base64>``.
+Chunks are streamed from the request onto the end of
+``CHUNKED_UPLOAD_DIR/<id>.part`` and hashed on the way through; a wrong
+offset or checksum leaves the file as it was. After a dropped connection the
+client asks for the offset and carries on from there, and since every chunk
+is its own short request a slow link never holds a worker for the whole file.
+
+The finished file reaches the model as an upload with a
+``temporary_file_path()``, which FileSystemStorage moves into ``MEDIA_ROOT``
+with a rename rather than a copy, so keep ``CHUNKED_UPLOAD_DIR`` on the same
+filesystem. The session checksum is a SHA-256 over the chunk checksums (as
+S3 does for multipart uploads), so no request reads the file back to hash it.
+
+Content-addressed storage names files by the SHA-256 of their whole content,
+which can't be carried from one chunk request to the next. Once the last
+chunk is in, a background thread reads the file once and stores that digest
+as the session's ``sha256`` (``CHUNKED_UPLOAD_HASH_ASYNC = False`` does it
+inline); the admin widget waits for it, and storage then trusts it instead of
+reading the file again while the form is saved.
+"""
+import base64
+import binascii
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django import forms
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.db import connections, transaction
+from django.db.models import F
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import format_html
+
+try:
+    import fcntl
+except ImportError:  # Windows: no locking, the offset check still catches most overlaps
+    fcntl = None
+
+# Fields that accept chunked uploads, as "app_label.Model.field".
+CHUNKED_UPLOAD_FIELDS = (
+    'foundation_app.Review.video',
+    'foundation_app.EventPhoto.image',
+    'foundation_app.NewspaperCutting.image',
+)
+
+READ_BLOCK_SIZE = 64 * 1024
+HASH_BLOCK_SIZE = 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def upload_dir():
+    return getattr(settings, 'CHUNKED_UPLOAD_DIR', os.path.join(settings.BASE_DIR, 'var', 'uploads'))
+
+
+def chunk_size():
+    return getattr(settings, 'CHUNKED_UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024)
+
+
+def max_size():
+    return getattr(settings, 'CHUNKED_UPLOAD_MAX_SIZE', 4 * 1024 ** 3)
+
+
+def part_path(session):
+    return os.path.join(upload_dir(), f'{session.pk}.part')
+
+
+def parse_checksum(header):
+    """Raw digest from ``Upload-Checksum: sha256 <base64>``."""
+    algorithm, _, value = (header or '').strip().partition(' ')
+    if algorithm.lower() != 'sha256':
+        raise UploadError("Upload-Checksum must be 'sha256 <base64 digest>'.")
+    try:
+        digest = base64.b64decode(value.strip(), validate=True)
+    except (binascii.Error, ValueError):
+        digest = b''
+    if len(digest) != 32:
+        raise UploadError("Upload-Checksum is not a base64 SHA-256 digest.")
+    return digest
+
+
+def create_session(user, target, filename, size, content_type=''):
+    from .models import UploadSession
+
+    if target not in CHUNKED_UPLOAD_FIELDS:
+        raise UploadError(f"Chunked uploads aren't enabled for {target!r}.")
+    filename = os.path.basename((filename or '').replace('\\', '/'))[:255]
+    if not filename:
+        raise UploadError("A filename is required.")
+    if size < 1 or size > max_size():
+        raise UploadError(f"Size must be between 1 byte and {max_size()} bytes.", status=413)
+
+    session = UploadSession.objects.create(
+        user=user, target=target, filename=filename, size=size, content_type=(content_type or '')[:100],
+    )
+    os.makedirs(upload_dir(), exist_ok=True)
+    open(part_path(session), 'xb').close()
+    return session
+
+
+def write_chunk(session, offset, stream, length, checksum):
+    """
+    Append ``length`` bytes read from ``stream`` at ``offset`` and return the
+    new offset. The chunk is hashed while it is copied and rolled back unless
+    it matches ``checksum`` (a raw SHA-256 digest).
+    """
+    if session.complete:
+        raise UploadError("Upload already complete.", status=409)
+    if offset != session.received:
+        raise UploadError(f"Expected offset {session.received}, got {offset}.", status=409)
+    if length < 1 or length > chunk_size() or offset + length > session.size:
+        raise UploadError(f"Chunks must be 1 to {chunk_size()} bytes and end within the file.", status=413)
+
+    try:
+        fh = open(part_path(session), 'r+b')
+    except FileNotFoundError:
+        raise UploadError("Upload session has no data file; start again.", status=410)
+    with fh:
+        if fcntl is not None:
+            try:
+                fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise UploadError("Another chunk of this upload is in progress.", status=409)
+        # Drop anything a request that died after writing (but before committing) left behind.
+        fh.truncate(offset)
+        fh.seek(offset)
+        digest = hashlib.sha256()
+        remaining = length
+        while remaining:
+            block = stream.read(min(READ_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            digest.update(block)
+            fh.write(block)
+            remaining -= len(block)
+        if remaining or digest.digest() != checksum:
+            fh.truncate(offset)
+            if remaining:
+                raise UploadError("Chunk ended early.")
+            raise UploadError("Chunk checksum mismatch.", status=460)
+        fh.flush()
+
+        session.received = offset + length
+        session.chunk_checksums += digest.hexdigest() + '\n'
+        if session.complete:
+            session.checksum = hashlib.sha256(
+                b''.join(bytes.fromhex(line) for line in session.chunk_checksums.split())
+            ).hexdigest()
+        session.save(update_fields=['received', 'chunk_checksums', 'checksum', 'updated_at'])
+    if session.complete:
+        schedule_hash(session.pk)
+    return session.received
+
+
+def hash_file(session_pk):
+    """Store the SHA-256 of a finished session's whole file as its ``sha256``."""
+    from .models import UploadSession
+
+    session = UploadSession.objects.filter(pk=session_pk).first()
+    if session is None or not session.complete or session.sha256:
+        return
+    digest = hashlib.sha256()
+    try:
+        with open(part_path(session), 'rb') as fh:
+            for block in iter(lambda: fh.read(HASH_BLOCK_SIZE), b''):
+                digest.update(block)
+    except FileNotFoundError:
+        return  # saved or abandoned in the meantime
+    UploadSession.objects.filter(pk=session_pk, received=F('size')).update(sha256=digest.hexdigest())
+
+
+def _hash_in_background(session_pk):
+    try:
+        hash_file(session_pk)
+    except Exception:
+        # Storage hashes the file itself when the digest is missing.
+        logger.exception("Hashing upload session %s failed", session_pk)
+    finally:
+        connections.close_all()
+
+
+_pool_instance = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def _pool():
+    global _pool_instance, _pool_pid
+    pid = os.getpid()
+    if _pool_pid != pid:
+        with _pool_lock:
+            if _pool_pid != pid:
+                _pool_instance = ThreadPoolExecutor(max_workers=1, thread_name_prefix='upload-hash')
+                _pool_pid = pid
+    return _pool_instance
+
+
+def schedule_hash(session_pk):
+    """Hash session ``session_pk``'s file once the current transaction commits."""
+    if getattr(settings, 'CHUNKED_UPLOAD_HASH_ASYNC', True):
+        transaction.on_commit(lambda: _pool().submit(_hash_in_background, session_pk))
+    else:
+        transaction.on_commit(lambda: hash_file(session_pk))
+
+
+def delete_session(session):
+    try:
+        os.remove(part_path(session))
+    except FileNotFoundError:
+        pass
+    session.delete()
+
+
+def clear_expired_sessions(now=None):
+    """Delete sessions untouched for ``CHUNKED_UPLOAD_EXPIRY``; returns how many."""
+    from .models import UploadSession
+
+    expiry = getattr(settings, 'CHUNKED_UPLOAD_EXPIRY', timedelta(hours=24))
+    cutoff = (now or timezone.now()) - expiry
+    deleted = 0
+    for session in UploadSession.objects.filter(updated_at__lt=cutoff).iterator():
+        delete_session(session)
+        deleted += 1
+    return deleted
+
+
+class ChunkedUploadedFile(UploadedFile):
+    """
+    A finished session's file, which storage can move into place instead of
+    copying. ``sha256`` is the whole file's digest, or None if it isn't known yet.
+    """
+
+    def __init__(self, session):
+        self.upload_session = session
+        self.path = part_path(session)
+        self.sha256 = session.sha256 or None
+        super().__init__(
+            open(self.path, 'rb'), session.filename, session.content_type or None, session.size,
+        )
+
+    def temporary_file_path(self):
+        return self.path
+
+    def close(self):
+        try:
+            return self.file.close()
+        except FileNotFoundError:
+            # The file was moved to its final place.
+            pass
+
+
+def completed_file(session_id, target):
+    """:class:`ChunkedUploadedFile` for a finished session for ``target``, or None."""
+    from .models import UploadSession
+
+    try:
+        session = UploadSession.objects.get(pk=session_id, target=target)
+    except (UploadSession.DoesNotExist, ValueError, forms.ValidationError):
+        return None
+    if not session.complete or not os.path.exists(part_path(session)):
+        return None
+    return ChunkedUploadedFile(session)
+
+
+# Admin -------------------------------------------------------------------------------
+
+class ChunkedUploadWidget(forms.ClearableFileInput):
+    """
+    File input that ``js/chunked_upload.js`` uploads in chunks, posting only the
+    session id with the form. Without JavaScript it is a normal file input.
+    """
+
+    class Media:
+        js = ('foundation_app/js/chunked_upload.js',)
+
+    def __init__(self, target, attrs=None):
+        self.target = target
+        super().__init__(attrs)
+
+    def get_context(self, name, value, attrs):
+        attrs = {
+            **(attrs or {}),
+            'data-chunked-upload': reverse('foundation_app:upload_session_create'),
+            'data-target': self.target,
+            'data-chunk-size': chunk_size(),
+        }
+        return super().get_context(name, value, attrs)
+
+    def render(self, name, value, attrs=None, renderer=None):
+        return format_html(
+            '{}<input type="hidden" name="{}__upload" value="">',
+            super().render(name, value, attrs, renderer), name,
+        )
+
+    def value_from_datadict(self, data, files, name):
+        session_id = data.get(f'{name}__upload')
+        if session_id:
+            upload = completed_file(session_id, self.target)
+            if upload is not None:
+                return upload
+        return super().value_from_datadict(data, files, name)
+
+    def value_omitted_from_data(self, data, files, name):
+        return not data.get(f'{name}__upload') and super().value_omitted_from_data(data, files, name)
+
+
+class ChunkedUploadAdminMixin:
+    """Upload ``chunked_upload_fields`` in resumable chunks; list them in CHUNKED_UPLOAD_FIELDS too."""
+    chunked_upload_fields = ()
+
+    def formfield_for_dbfield(self, db_field, request, **kwargs):
+        if db_field.name in self.chunked_upload_fields:
+            kwargs['widget'] = ChunkedUploadWidget(target=f'{self.model._meta.label}.{db_field.name}')
+        return super().formfield_for_dbfield(db_field, request, **kwargs)
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        for name in self.chunked_upload_fields:
+            session = getattr(form.cleaned_data.get(name), 'upload_session', None)
+            if session is not None:
+                transaction.on_commit(lambda session=session: delete_session(session))
@@ -7,8 +7,19 @@ from .views import (
     dashboard, VideoListView, ReviewListView, UserLoginView,
     launch_campaign, PodcastListView, NewspaperCuttingListView, EventPhotoListView,
 )
+from django.conf import settings
 from django.contrib.auth.views import LogoutView
 
+if settings.ASYNC_VIEWS:
+    from . import async_views
+    from .async_views import (
+        NewsListView, AllProjectsView, PodcastListView, VideoListView, NewspaperCuttingListView,
+        EventPhotoListView, ReviewListView,
+    )
+    make_donation = async_views.make_donation
+else:
+    make_donation = views.make_donation
+
 # This app_name variable is what namespaces your URLs.
 # You MUST use this namespace when referencing URLs in your templates and views.
 app_name = 'foundation_app'
@@ -21,11 +32,21 @@ urlpatterns = [
     path('gallery/', views.gallery_view, name='gallery'),
     path('contact/', ContactView.as_view(), name='contact'),
     path("volunteer/", views.volunteer_page, name="volunteer_page"),
+    path('search/', views.search_view, name='search'),
 
     # Dashboard and User Actions
     path("dashboard/", dashboard, name="dashboard"),
+    path("dashboard/campaigns/", views.dashboard_campaigns, name="dashboard_campaigns"),
+    path("dashboard/volunteers/", views.dashboard_volunteers, name="dashboard_volunteers"),
+    path("dashboard/donate/", views.dashboard_donate, name="dashboard_donate"),
     path('launch-campaign/', launch_campaign, name='launch_campaign'),
     path('volunteer/submit/', volunteer_submit, name='volunteer_submit'),
+    path('donate/', make_donation, name='make_donation'),
+    path('payment_success/', views.payment_success, name='payment_success'),
+    path('payments/webhook/', views.payment_webhook, name='payment_webhook'),
+    # Chunked admin uploads
+    path('uploads/', views.upload_session_create, name='upload_session_create'),
+    path('uploads/<uuid:pk>/', views.upload_session_detail, name='upload_session_detail'),
     # Media Centre and News
     path('media-centre/', MediaCentreView.as_view(), name='media_centre'),
     path('news/', NewsListView.as_view(), name='news_list'),
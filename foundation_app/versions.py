@@ -0,0 +1,183 @@
+# foundation_app/versions.py
+"""
+Per-model version stamps and conditional GET for public pages.
+
+Every save or delete of a model listed in ``response_cache.VIEW_DEPENDENCIES``
+bumps its :class:`~foundation_app.models.ModelVersion` row (``invalidate_model``
+calls :func:`bump`). A page's ETag is a hash of the stamps of the models it
+reads, its URL name and arguments, and :func:`page_version`; Last-Modified is
+the newest ``changed_at`` among them. :func:`conditional_page` answers a
+matching ``If-None-Match`` / ``If-Modified-Since`` with 304 before the view
+runs, so an unchanged page costs one cache lookup (one small query when the
+stamps aren't cached) instead of the view's queries and template render.
+"""
+import hashlib
+import json
+import os
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .response_cache import VIEW_DEPENDENCIES, ais_cacheable_request, is_cacheable_request, page_query
+
+KEY_PREFIX = 'pcf:version'
+# Cached stamps expire anyway, in case a reader cached an old one while a bump was committing.
+STAMP_TIMEOUT = 60
+
+_page_version = None
+
+
+def _cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def _key(label):
+    return f'{KEY_PREFIX}:{label}'
+
+
+def bump(*models):
+    """Record that rows of ``models`` changed."""
+    from .models import ModelVersion
+
+    now = timezone.now()
+    for model in models:
+        label = model._meta.label
+        updated = ModelVersion.objects.filter(label=label).update(version=F('version') + 1, changed_at=now)
+        if not updated:
+            try:
+                with transaction.atomic():
+                    ModelVersion.objects.create(label=label, version=1, changed_at=now)
+            except IntegrityError:
+                # Created by a concurrent request in the meantime.
+                ModelVersion.objects.filter(label=label).update(version=F('version') + 1, changed_at=now)
+    # Drop the cached stamps now, and again once the new ones are visible to other connections.
+    keys = [_key(model._meta.label) for model in models]
+    _cache().delete_many(keys)
+    transaction.on_commit(lambda: _cache().delete_many(keys))
+
+
+def stamps(labels):
+    """``{label: (version, changed_at)}``; models never bumped are ``(0, None)``."""
+    from .models import ModelVersion
+
+    if not labels:
+        return {}
+    cache = _cache()
+    cached = cache.get_many([_key(label) for label in labels])
+    result = {label: cached[_key(label)] for label in labels if _key(label) in cached}
+    missing = [label for label in labels if label not in result]
+    if missing:
+        rows = ModelVersion.objects.filter(label__in=missing).values_list('label', 'version', 'changed_at')
+        found = {label: (version, changed_at) for label, version, changed_at in rows}
+        fetched = {label: found.get(label, (0, None)) for label in missing}
+        cache.set_many({_key(label): stamp for label, stamp in fetched.items()}, STAMP_TIMEOUT)
+        result.update(fetched)
+    return result
+
+
+def page_version():
+    """
+    ``PAGE_VERSION`` from settings, or a hash of the template files' names,
+    sizes and modification times, so a deploy that changes markup changes
+    every ETag. Computed once per process.
+    """
+    global _page_version
+    configured = getattr(settings, 'PAGE_VERSION', '')
+    if configured:
+        return str(configured)
+    if _page_version is None:
+        from django.template import engines
+
+        digest = hashlib.md5(usedforsecurity=False)
+        for engine in engines.all():
+            for directory in sorted(str(d) for d in engine.template_dirs):
+                for root, dirs, files in os.walk(directory):
+                    dirs.sort()
+                    for name in sorted(files):
+                        path = os.path.join(root, name)
+                        try:
+                            st = os.stat(path)
+                        except OSError:
+                            continue
+                        digest.update(f'{path}:{st.st_size}:{st.st_mtime_ns}\n'.encode())
+        _page_version = digest.hexdigest()[:12]
+    return _page_version
+
+
+def page_validators(url_name, args=(), kwargs=None, query=()):
+    """``(etag, last_modified)`` for a page; last_modified is None unless every model has been bumped."""
+    labels = VIEW_DEPENDENCIES[url_name]
+    current = stamps(labels)
+    identity = json.dumps(
+        [page_version(), url_name, list(args), sorted((kwargs or {}).items()), list(query),
+         [[label, current[label][0]] for label in sorted(labels)]],
+        default=str,
+    )
+    etag = '"%s"' % hashlib.md5(identity.encode(), usedforsecurity=False).hexdigest()
+    changed = [changed_at for _, changed_at in current.values()]
+    last_modified = None
+    if changed and all(changed):
+        last_modified = int(max(changed).timestamp())
+    return etag, last_modified
+
+
+def _validate(request, url_name, args, kwargs):
+    """``(etag, last_modified, 304 response or None)``."""
+    etag, last_modified = page_validators(url_name, args, kwargs, page_query(request))
+    return etag, last_modified, get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+
+def _add_validators(response, etag, last_modified):
+    # Overwrite, since a page served from the response cache still has the headers it was stored with.
+    response.headers['ETag'] = etag
+    if last_modified is not None:
+        response.headers['Last-Modified'] = http_date(last_modified)
+    if not response.has_header('Cache-Control'):
+        # Browsers may keep the page but must ask whether it changed.
+        patch_cache_control(response, no_cache=True)
+    return response
+
+
+def conditional_page(view_func):
+    """
+    Like ``django.views.decorators.http.condition``, with ETag and Last-Modified
+    taken from the version stamps of the models the view reads. Only anonymous
+    GET/HEAD requests of views listed in VIEW_DEPENDENCIES are handled; put it
+    outside ``cache_anonymous_page`` so a 304 skips the page cache as well.
+    Works on async views too.
+    """
+    if iscoroutinefunction(view_func):
+        async def _wrapped_view(request, *args, **kwargs):
+            match = request.resolver_match
+            url_name = match.url_name if match else None
+            if url_name not in VIEW_DEPENDENCIES or not await ais_cacheable_request(request):
+                return await view_func(request, *args, **kwargs)
+
+            etag, last_modified, response = await sync_to_async(_validate)(request, url_name, args, kwargs)
+            if response is None:
+                response = await view_func(request, *args, **kwargs)
+                if response.status_code != 200 or response.streaming:
+                    return response
+            return _add_validators(response, etag, last_modified)
+    else:
+        def _wrapped_view(request, *args, **kwargs):
+            match = request.resolver_match
+            url_name = match.url_name if match else None
+            if url_name not in VIEW_DEPENDENCIES or not is_cacheable_request(request):
+                return view_func(request, *args, **kwargs)
+
+            etag, last_modified, response = _validate(request, url_name, args, kwargs)
+            if response is None:
+                response = view_func(request, *args, **kwargs)
+                if response.status_code != 200 or response.streaming:
+                    return response
+            return _add_validators(response, etag, last_modified)
+
+    return wraps(view_func)(_wrapped_view)
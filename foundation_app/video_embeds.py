@@ -0,0 +1,243 @@
+# foundation_app/video_embeds.py
+"""
+Video embeds without the player's weight.
+
+Pages show a thumbnail with a play button and only load the provider's
+player (hundreds of kilobytes of script) when the visitor clicks it, see
+``{% video_facade %}`` and ``js/video_facade.js``.
+
+``Video.url`` is parsed into a provider and video id once, in ``pre_save``.
+After the save commits, the provider's oEmbed metadata (title, thumbnail,
+duration) is fetched in a background thread and stored on the row, so
+rendering a page never calls out. ``VIDEO_METADATA_FETCHER`` names the class
+that does the fetching; tests point it at a stub. Rows whose fetch failed or
+predates this module are filled by ``manage.py refresh_video_metadata``.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+import requests
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import response_cache
+
+logger = logging.getLogger(__name__)
+
+METADATA_FIELDS = ('embed_title', 'thumbnail_url', 'duration', 'metadata_fetched_at')
+
+_YOUTUBE_HOSTS = ('youtube.com', 'www.youtube.com', 'm.youtube.com', 'youtube-nocookie.com', 'www.youtube-nocookie.com')
+_YOUTUBE_PATH_PREFIXES = ('embed', 'shorts', 'live', 'v')
+_VIMEO_HOSTS = ('vimeo.com', 'www.vimeo.com', 'player.vimeo.com')
+
+
+class VideoMetadataError(Exception):
+    pass
+
+
+def _youtube_id(value):
+    if len(value) == 11 and all(c.isalnum() or c in '-_' for c in value):
+        return value
+    return ''
+
+
+def parse_video_url(url):
+    """``(provider, video_id)`` for a YouTube or Vimeo URL, ``('', '')`` for anything else."""
+    if not url:
+        return '', ''
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return '', ''
+    host = (parts.hostname or '').lower()
+    segments = [s for s in parts.path.split('/') if s]
+
+    if host == 'youtu.be' and segments:
+        video_id = _youtube_id(segments[0])
+    elif host in _YOUTUBE_HOSTS:
+        if segments[:1] == ['watch']:
+            video_id = _youtube_id(parse_qs(parts.query).get('v', [''])[0])
+        elif len(segments) >= 2 and segments[0] in _YOUTUBE_PATH_PREFIXES:
+            video_id = _youtube_id(segments[1])
+        else:
+            video_id = ''
+    elif host in _VIMEO_HOSTS:
+        # vimeo.com/123, vimeo.com/channels/x/123, player.vimeo.com/video/123
+        video_id = next((s for s in reversed(segments) if s.isdigit()), '')
+        return ('vimeo', video_id) if video_id else ('', '')
+    else:
+        return '', ''
+    return ('youtube', video_id) if video_id else ('', '')
+
+
+def watch_url(provider, video_id):
+    if provider == 'youtube':
+        return f'https://www.youtube.com/watch?v={video_id}'
+    if provider == 'vimeo':
+        return f'https://vimeo.com/{video_id}'
+    return ''
+
+
+def embed_url(provider, video_id):
+    """Player URL loaded when the facade is clicked; starts playing straight away."""
+    if provider == 'youtube':
+        return f'https://www.youtube-nocookie.com/embed/{video_id}?autoplay=1'
+    if provider == 'vimeo':
+        return f'https://player.vimeo.com/video/{video_id}?autoplay=1'
+    return ''
+
+
+def default_thumbnail(provider, video_id):
+    """Thumbnail that exists without asking the provider (YouTube only)."""
+    if provider == 'youtube':
+        return f'https://i.ytimg.com/vi/{video_id}/hqdefault.jpg'
+    return ''
+
+
+def format_duration(seconds):
+    if not seconds:
+        return ''
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f'{hours}:{minutes:02d}:{seconds:02d}' if hours else f'{minutes}:{seconds:02d}'
+
+
+# Fetching ---------------------------------------------------------------------------
+
+class OEmbedFetcher:
+    """Metadata from the providers' public oEmbed endpoints."""
+
+    endpoints = {
+        'youtube': 'https://www.youtube.com/oembed',
+        'vimeo': 'https://vimeo.com/api/oembed.json',
+    }
+
+    def __init__(self):
+        self.session = requests.Session()
+        self.timeout = getattr(settings, 'VIDEO_METADATA_TIMEOUT', (3.05, 5))
+
+    def fetch(self, provider, video_id):
+        """``{'title', 'thumbnail_url', 'duration'}``; raises :class:`VideoMetadataError`."""
+        endpoint = self.endpoints.get(provider)
+        if endpoint is None:
+            raise VideoMetadataError(f"No oEmbed endpoint for {provider!r}")
+        query = urlencode({'url': watch_url(provider, video_id), 'format': 'json'})
+        try:
+            response = self.session.get(f'{endpoint}?{query}', timeout=self.timeout)
+            response.raise_for_status()
+            data = response.json()
+        except (requests.RequestException, ValueError) as exc:
+            raise VideoMetadataError(f"oEmbed lookup for {provider} {video_id} failed: {exc}") from exc
+        return {
+            'title': data.get('title') or '',
+            'thumbnail_url': data.get('thumbnail_url') or '',
+            # Vimeo reports the length; YouTube's oEmbed doesn't.
+            'duration': data.get('duration'),
+        }
+
+
+_fetcher_instance = None
+_fetcher_lock = threading.Lock()
+
+
+def get_fetcher():
+    global _fetcher_instance
+    path = getattr(settings, 'VIDEO_METADATA_FETCHER', 'foundation_app.video_embeds.OEmbedFetcher')
+    with _fetcher_lock:
+        if _fetcher_instance is None or _fetcher_instance[0] != path:
+            _fetcher_instance = (path, import_string(path)())
+        return _fetcher_instance[1]
+
+
+def _metadata_values(provider, video_id, metadata):
+    title = (metadata.get('title') or '')[:300]
+    thumbnail = metadata.get('thumbnail_url') or default_thumbnail(provider, video_id)
+    duration = metadata.get('duration')
+    return {
+        'embed_title': title,
+        'thumbnail_url': thumbnail[:500],
+        'duration': int(duration) if duration else None,
+        'metadata_fetched_at': timezone.now(),
+    }
+
+
+def refresh_metadata(video):
+    """
+    Fetch and store metadata for one ``Video``. Returns False if the fetch
+    failed; the row is left for ``refresh_video_metadata`` to retry.
+    """
+    if not video.provider:
+        return False
+    try:
+        metadata = get_fetcher().fetch(video.provider, video.provider_video_id)
+    except VideoMetadataError as exc:
+        logger.warning("%s", exc)
+        return False
+    values = _metadata_values(video.provider, video.provider_video_id, metadata)
+    # Only if the URL hasn't changed meanwhile; update() keeps the save signals out of it.
+    updated = type(video)._default_manager.filter(
+        pk=video.pk, provider=video.provider, provider_video_id=video.provider_video_id,
+    ).update(**values)
+    for field, value in values.items():
+        setattr(video, field, value)
+    return bool(updated)
+
+
+def _refresh_by_pk(pk):
+    try:
+        Video = apps.get_model('foundation_app', 'Video')
+        video = Video._default_manager.filter(pk=pk).only('pk', 'provider', 'provider_video_id').first()
+        if video is not None and refresh_metadata(video):
+            response_cache.invalidate_model(Video)
+    except Exception:
+        logger.exception("Fetching metadata for video #%s failed", pk)
+    finally:
+        connections.close_all()
+
+
+_pool_instance = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def _pool():
+    global _pool_instance, _pool_pid
+    pid = os.getpid()
+    if _pool_pid != pid:
+        with _pool_lock:
+            if _pool_pid != pid:
+                _pool_instance = ThreadPoolExecutor(max_workers=2, thread_name_prefix='video-metadata')
+                _pool_pid = pid
+    return _pool_instance
+
+
+def schedule_refresh(pk):
+    """Fetch metadata for video ``pk`` once the current transaction commits."""
+    if getattr(settings, 'VIDEO_METADATA_ASYNC', True):
+        transaction.on_commit(lambda: _pool().submit(_refresh_by_pk, pk))
+    else:
+        transaction.on_commit(lambda: _refresh_by_pk(pk))
+
+
+# Signals ------------------------------------------------------------------------------
+
+def parse_on_save(instance):
+    """
+    Set provider and id from ``instance.url``. When they change, the old
+    metadata is cleared and ``True`` returned so the caller fetches anew.
+    """
+    provider, video_id = parse_video_url(instance.url)
+    if (provider, video_id) == (instance.provider, instance.provider_video_id):
+        return bool(provider) and instance.metadata_fetched_at is None
+    instance.provider, instance.provider_video_id = provider, video_id
+    instance.embed_title = ''
+    instance.thumbnail_url = default_thumbnail(provider, video_id)
+    instance.duration = None
+    instance.metadata_fetched_at = None
+    return bool(provider)
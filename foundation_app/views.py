@@ -1,13 +1,35 @@
-from django.shortcuts import render, redirect
-from django.urls import reverse
-from django.views.generic import View, TemplateView, DetailView, ListView
-from django.contrib.auth.mixins import LoginRequiredMixin
-from django.contrib.auth import logout, authenticate, login
+from django.conf import settings
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.auth import logout, authenticate, login
+from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import AuthenticationForm, UserCreationForm
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404, render, redirect
+from django.template.response import TemplateResponse
+from django.urls import reverse
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods, require_POST
+from django.views.generic import View, TemplateView, DetailView, ListView
 
-from .models import News, ContactMessage, Project, Volunteer, Podcast, Video, NewspaperCutting, EventPhoto, Review, Campaign
-from .forms import ContactForm, VolunteerForm, CampaignForm
+from .models import (
+    Campaign, ContactMessage, Donation, EventPhoto, GalleryImage, News, NewspaperCutting, Podcast, Project,
+    Review, UploadSession, Video, Volunteer,
+)
+from .forms import CampaignForm, ContactForm, UserLoginForm, UserSignupForm, VolunteerForm
+from .donations import capture_donation, record_order
+from .pagination import KeysetPaginationMixin, keyset_paginate, CURSOR_PARAM
+from .payments import InvalidSignature, PaymentGatewayError, get_gateway
+from .response_cache import cache_anonymous_page
+from .versions import conditional_page
+from .submissions import save_submission
+from . import search, uploads, webhooks
+
+
+@method_decorator(conditional_page, name='dispatch')
+@method_decorator(cache_anonymous_page, name='dispatch')
 class HomeView(TemplateView):
     template_name = 'foundation_app/home.html'
 
@@ -18,16 +40,22 @@ class HomeView(TemplateView):
         return context
 
 
+@method_decorator(conditional_page, name='dispatch')
+@method_decorator(cache_anonymous_page, name='dispatch')
 class ProjectDetailView(DetailView):
     model = Project
     template_name = 'foundation_app/project_detail.html'
     context_object_name = 'project'
 
 
+@method_decorator(conditional_page, name='dispatch')
+@method_decorator(cache_anonymous_page, name='dispatch')
 class AboutUsView(TemplateView):
     template_name = 'foundation_app/about_us.html'
 
 
+@method_decorator(conditional_page, name='dispatch')
+@method_decorator(cache_anonymous_page, name='dispatch')
 class TeamView(TemplateView):
     template_name = 'foundation_app/team.html'
 
@@ -42,17 +70,13 @@ class ContactView(View):
         form = ContactForm(request.POST)
         if form.is_valid():
             try:
-                ContactMessage.objects.create(
-                    name=form.cleaned_data['name'],
-                    email=form.cleaned_data['email'],
-                    subject=form.cleaned_data['subject'],
-                    message=form.cleaned_data['message']
-                )
-                messages.success(request, 'Your message has been sent successfully!')
-                return redirect('contact')
+                save_submission(form)
             except Exception as e:
                 print(f"Error saving contact message: {e}")
                 messages.error(request, 'There was an error sending your message. Please try again.')
+            else:
+                messages.success(request, 'Your message has been sent successfully!')
+                return redirect('foundation_app:contact')
         else:
             messages.error(request, 'Please correct the errors in the form.')
         return render(request, self.template_name, {'form': form})
@@ -70,13 +94,6 @@ def launch_campaign(request):
     return redirect(reverse('foundation_app:dashboard'))
 
 
-from django.contrib.auth import authenticate, login
-from django.contrib import messages
-from django.shortcuts import redirect, render
-from django.views.generic import TemplateView
-from .forms import UserLoginForm   # import your custom form
-
-
 class UserLoginView(TemplateView):
     template_name = 'foundation_app/login.html'
 
@@ -102,8 +119,6 @@ class UserLoginView(TemplateView):
         return render(request, self.template_name, {'form': form})
 
 
-from .forms import UserSignupForm  # import your custom form
-
 class UserSignupView(TemplateView):
     template_name = 'foundation_app/signup.html'
 
@@ -122,24 +137,34 @@ class UserSignupView(TemplateView):
         return render(request, self.template_name, {'form': form})
 
 
-class NewsListView(ListView):
+@method_decorator(conditional_page, name='dispatch')
+@method_decorator(cache_anonymous_page, name='dispatch')
+class NewsListView(KeysetPaginationMixin, ListView):
     model = News
+    paginate_by = 10
     template_name = 'foundation_app/news_list.html'
     context_object_name = 'news_list'
 
 
+@method_decorator(conditional_page, name='dispatch')
+@method_decorator(cache_anonymous_page, name='dispatch')
 class NewsDetailView(DetailView):
     model = News
     template_name = 'foundation_app/news_detail.html'
     context_object_name = 'news_article'
 
 
-class AllProjectsView(ListView):
+@method_decorator(conditional_page, name='dispatch')
+@method_decorator(cache_anonymous_page, name='dispatch')
+class AllProjectsView(KeysetPaginationMixin, ListView):
     model = Project
+    paginate_by = 12
     template_name = 'foundation_app/all_projects.html'
     context_object_name = 'all_projects'
 
 
+@method_decorator(conditional_page, name='dispatch')
+@method_decorator(cache_anonymous_page, name='dispatch')
 class MediaCentreView(TemplateView):
     template_name = 'foundation_app/media_centre.html'
 
@@ -149,32 +174,47 @@ class MediaCentreView(TemplateView):
         return context
 
 
-class PodcastListView(ListView):
+@method_decorator(conditional_page, name='dispatch')
+@method_decorator(cache_anonymous_page, name='dispatch')
+class PodcastListView(KeysetPaginationMixin, ListView):
     model = Podcast
+    paginate_by = 12
     template_name = "foundation_app/podcast_list.html"
     context_object_name = "podcasts"
 
 
-class VideoListView(ListView):
+@method_decorator(conditional_page, name='dispatch')
+@method_decorator(cache_anonymous_page, name='dispatch')
+class VideoListView(KeysetPaginationMixin, ListView):
     model = Video
+    paginate_by = 9
     template_name = "foundation_app/video_list.html"
     context_object_name = "videos"
 
 
-class NewspaperCuttingListView(ListView):
+@method_decorator(conditional_page, name='dispatch')
+@method_decorator(cache_anonymous_page, name='dispatch')
+class NewspaperCuttingListView(KeysetPaginationMixin, ListView):
     model = NewspaperCutting
+    paginate_by = 18
     template_name = "foundation_app/newspaper_cuttings.html"
     context_object_name = "cuttings"
 
 
-class EventPhotoListView(ListView):
+@method_decorator(conditional_page, name='dispatch')
+@method_decorator(cache_anonymous_page, name='dispatch')
+class EventPhotoListView(KeysetPaginationMixin, ListView):
     model = EventPhoto
+    paginate_by = 24
     template_name = "foundation_app/event_photos.html"
     context_object_name = "photos"
 
 
-class ReviewListView(ListView):
+@method_decorator(conditional_page, name='dispatch')
+@method_decorator(cache_anonymous_page, name='dispatch')
+class ReviewListView(KeysetPaginationMixin, ListView):
     model = Review
+    paginate_by = 12
     template_name = "foundation_app/review_list.html"
     context_object_name = "reviews"
 
@@ -183,7 +223,7 @@ def volunteer_submit(request):
     if request.method == 'POST':
         form = VolunteerForm(request.POST)
         if form.is_valid():
-            form.save()
+            save_submission(form)
             messages.success(request, 'Thank you for volunteering! We will contact you soon.')
         else:
             messages.error(request, 'Please correct the errors in the form.')
@@ -197,21 +237,17 @@ def custom_logout(request):
         return redirect('foundation_app:home')
     return redirect('foundation_app:home')
 
-from django.shortcuts import render, redirect
-from django.contrib.auth.decorators import login_required
-from .forms import CampaignForm
-from .models import Campaign
 
 @login_required
 def dashboard(request):
+    """
+    Light dashboard shell. Campaigns, volunteers and the donation form are
+    fetched per tab from the fragment views below when the tab is opened.
+    """
     # Forms
     campaign_form = CampaignForm()
     volunteer_form = VolunteerForm()
 
-    # Data
-    campaigns = Campaign.objects.all().order_by("-created_at")
-    volunteers = Volunteer.objects.all().order_by("-created_at")
-
     # Handle Campaign Submission
     if request.method == "POST" and "launch_campaign" in request.POST:
         campaign_form = CampaignForm(request.POST)
@@ -227,61 +263,163 @@ def dashboard(request):
     # Context
     context = {
         "campaign_form": campaign_form,
-        "campaigns": campaigns,
-        "volunteers": volunteers,
         "volunteer_form": volunteer_form,
         "personalized_data": {
             "total_donations": "₹5,000",
             "projects_supported": ["Project A", "Project B"],
             "volunteer_hours": "10 hours",
         },
-        "key_id": "rzp_live_RHnSL3uXGp6LQi",  
+        "key_id": settings.RAZORPAY_KEY_ID,
     }
 
     return render(request, "foundation_app/dashboard.html", context)
 
 
+@login_required
+def dashboard_campaigns(request):
+    page = keyset_paginate(
+        Campaign.objects.select_related("user").with_progress(),
+        request.GET.get(CURSOR_PARAM),
+        per_page=10,
+    )
+    return render(request, "foundation_app/dashboard/campaigns.html", {"campaigns": page.object_list, "page_obj": page})
 
-import razorpay
-from django.conf import settings
-from django.shortcuts import render
-from django.views.decorators.csrf import csrf_exempt
 
-def make_donation(request):
-    if request.method == "POST":
+@login_required
+def dashboard_volunteers(request):
+    page = keyset_paginate(Volunteer.objects.all(), request.GET.get(CURSOR_PARAM), per_page=20)
+    return render(request, "foundation_app/dashboard/volunteers.html", {"volunteers": page.object_list, "page_obj": page})
+
+
+@login_required
+def dashboard_donate(request):
+    return render(request, "foundation_app/dashboard/donate.html")
+
+
+def _donation_input(request):
+    """``(amount in rupees, campaign id)`` from the donation form; amount is 0 if it isn't a number."""
+    try:
         amount = int(request.POST.get("amount", 0))  # Get user entered donation
-        if amount <= 0:
-            messages.error(request, "Please enter a valid donation amount.")
-            return redirect("foundation_app:dashboard")
+    except ValueError:
+        amount = 0
+    return amount, request.POST.get("campaign", "")
 
-        client = razorpay.Client(auth=("rzp_test_RCeQhXtvZuW3nm", "8WhtWulOvpImkKNmRM0829Ym"))
 
-        payment = client.order.create({
-            "amount": amount * 100,  # convert to paise
-            "currency": "INR",
-            "payment_capture": "1"
-        })
+def _donation_order(amount, campaign):
+    order = {
+        "amount": amount * 100,  # convert to paise
+        "currency": "INR",
+        "payment_capture": "1"
+    }
+    if campaign:
+        order["notes"] = {"campaign": str(campaign.pk)}
+    return order
+
+
+def _donation_error(request, wants_json, error, status):
+    if wants_json:
+        return JsonResponse({"error": error}, status=status)
+    messages.error(request, error)
+    return redirect("foundation_app:dashboard")
 
-        return render(request, "foundation_app/payment.html", {
-            "key_id": "rzp_test_RCeQhXtvZuW3nm",  # matches your template
-            "payment": payment,           # full payment object
+
+def _donation_response(request, wants_json, gateway, payment):
+    if wants_json:
+        return JsonResponse({
+            "key_id": gateway.key_id,
+            "order_id": payment["id"],
+            "amount": payment["amount"],
+            "currency": payment["currency"],
         })
+    # A TemplateResponse, so an async view gets it rendered in a thread.
+    return TemplateResponse(request, "foundation_app/payment.html", {
+        "key_id": gateway.key_id,  # matches your template
+        "payment": payment,           # full payment object
+    })
+
+
+DONATION_INVALID = "Please enter a valid donation amount."
+DONATION_UNAVAILABLE = "Payments are temporarily unavailable. Please try again in a few minutes."
+
+
+def make_donation(request):
+    """
+    Create a Razorpay order and its ledger row. AJAX callers (the dashboard)
+    get the order as JSON; plain form posts get the payment page.
+    """
+    if request.method != "POST":
+        return redirect("foundation_app:dashboard")
+
+    wants_json = request.headers.get("X-Requested-With") == "XMLHttpRequest"
+    amount, campaign_id = _donation_input(request)
+    campaign = Campaign.objects.filter(pk=campaign_id).first() if campaign_id.isdigit() else None
+    if amount <= 0 or (campaign_id and campaign is None):
+        return _donation_error(request, wants_json, DONATION_INVALID, 400)
+
+    gateway = get_gateway()
+    try:
+        payment = gateway.create_order(_donation_order(amount, campaign))
+    except PaymentGatewayError:
+        return _donation_error(request, wants_json, DONATION_UNAVAILABLE, 503)
+    record_order(payment, amount, campaign=campaign, user=request.user)
+    return _donation_response(request, wants_json, gateway, payment)
 
 
 @csrf_exempt
+@require_POST
 def payment_success(request):
-    return render(request, "foundation_app/success.html")
+    """
+    Razorpay checkout posts here after payment. A valid signature proves the
+    payment went through, so the donation is captured right away; the webhook
+    inbox covers donors who close the tab before getting here.
+    """
+    params = {
+        "razorpay_order_id": request.POST.get("razorpay_order_id", ""),
+        "razorpay_payment_id": request.POST.get("razorpay_payment_id", ""),
+        "razorpay_signature": request.POST.get("razorpay_signature", ""),
+    }
+    try:
+        get_gateway().verify_payment_signature(params)
+    except InvalidSignature:
+        return render(request, "foundation_app/success.html", {"verified": False}, status=400)
+
+    capture_donation(params["razorpay_order_id"], params["razorpay_payment_id"])
+    donation = Donation.objects.select_related("campaign").filter(
+        razorpay_order_id=params["razorpay_order_id"]
+    ).first()
+    return render(request, "foundation_app/success.html", {
+        "verified": True,
+        "donation": donation,
+        "payment_id": params["razorpay_payment_id"],
+    })
+
+
+@csrf_exempt
+@require_POST
+def payment_webhook(request):
+    """
+    Razorpay webhook endpoint: verify, append to the inbox and acknowledge.
+    Nothing else happens here so the reply stays fast even under retries.
+    """
+    secret = webhooks.webhook_secret()
+    if not secret:
+        return HttpResponse("Webhook secret not configured.", status=503)
+    if not webhooks.verify_signature(request.body, request.headers.get("X-Razorpay-Signature"), secret):
+        return HttpResponse("Invalid signature.", status=400)
+    if not webhooks.ingest_event(request.body, request.headers.get("X-Razorpay-Event-Id")):
+        return HttpResponse("Malformed event.", status=400)
+    return HttpResponse(status=200)
 def volunteer_page(request):
     """
     Displays the volunteer form and the list of registered volunteers.
     """
-    volunteers = Volunteer.objects.all().order_by("-created_at")  # latest first
+    page = keyset_paginate(Volunteer.objects.all(), request.GET.get(CURSOR_PARAM), per_page=20)  # latest first
     form = VolunteerForm()
 
     if request.method == "POST":
         form = VolunteerForm(request.POST)
         if form.is_valid():
-            form.save()
+            save_submission(form)
             messages.success(request, "Thank you for volunteering! We will contact you soon.")
             return redirect("foundation_app:volunteer_page")
         else:
@@ -289,12 +427,102 @@ def volunteer_page(request):
 
     return render(request, "foundation_app/volunteer.html", {
         "form": form,
-        "volunteers": volunteers,
+        "volunteers": page.object_list,
+        "page_obj": page,
     })
-from django.shortcuts import render
-from .models import GalleryImage
 
+@conditional_page
+@cache_anonymous_page
 def gallery_view(request):
-    images = GalleryImage.objects.all()
-    return render(request, "foundation_app/gallery.html", {"images": images})
+    page = keyset_paginate(GalleryImage.objects.all(), request.GET.get(CURSOR_PARAM), per_page=24)
+    return render(request, "foundation_app/gallery.html", {"images": page.object_list, "page_obj": page})
+
+
+SEARCH_RESULTS_PER_PAGE = 20
+
+
+@conditional_page
+@cache_anonymous_page
+def search_view(request):
+    """Ranked site search over news, projects, podcasts, videos, gallery and reviews."""
+    query = request.GET.get("q", "").strip()[:200]
+    try:
+        page = max(int(request.GET.get("page", 1)), 1)
+    except ValueError:
+        page = 1
+    offset = (page - 1) * SEARCH_RESULTS_PER_PAGE
+
+    results = []
+    if query:
+        find = search.search if search.search_available() else search.fallback_search
+        # One extra row tells us whether there is a next page.
+        results = find(query, limit=SEARCH_RESULTS_PER_PAGE + 1, offset=offset)
+
+    return render(request, "foundation_app/search.html", {
+        "query": query,
+        "results": results[:SEARCH_RESULTS_PER_PAGE],
+        "page": page,
+        "has_next": len(results) > SEARCH_RESULTS_PER_PAGE,
+        "current_page": "search",
+    })
+
 
+def _upload_status(session, status=200):
+    response = JsonResponse({
+        "id": str(session.pk),
+        "url": reverse("foundation_app:upload_session_detail", args=[session.pk]),
+        "offset": session.received,
+        "size": session.size,
+        "chunk_size": uploads.chunk_size(),
+        "complete": session.complete,
+        "checksum": session.checksum,
+        "sha256": session.sha256,
+    }, status=status)
+    response["Upload-Offset"] = session.received
+    response["Cache-Control"] = "no-store"
+    return response
+
+
+@staff_member_required
+@require_POST
+def upload_session_create(request):
+    """Open a chunked upload for an admin file field, see foundation_app/uploads.py."""
+    try:
+        size = int(request.POST.get("size", ""))
+    except ValueError:
+        return JsonResponse({"error": "size must be an integer."}, status=400)
+    try:
+        session = uploads.create_session(
+            request.user, request.POST.get("target", ""), request.POST.get("filename", ""),
+            size, request.POST.get("content_type", ""),
+        )
+    except uploads.UploadError as exc:
+        return JsonResponse({"error": str(exc)}, status=exc.status)
+    return _upload_status(session, status=201)
+
+
+@staff_member_required
+@require_http_methods(["GET", "HEAD", "PUT", "DELETE"])
+def upload_session_detail(request, pk):
+    """GET/HEAD: where to resume. PUT: the chunk at Upload-Offset. DELETE: abandon the upload."""
+    session = get_object_or_404(UploadSession, pk=pk, user=request.user)
+    if request.method == "DELETE":
+        uploads.delete_session(session)
+        return HttpResponse(status=204)
+    if request.method != "PUT":
+        return _upload_status(session)
+
+    try:
+        offset = int(request.headers.get("Upload-Offset", ""))
+        length = int(request.META.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        return JsonResponse({"error": "Upload-Offset and Content-Length must be integers."}, status=400)
+    try:
+        checksum = uploads.parse_checksum(request.headers.get("Upload-Checksum"))
+        # Read from the request stream, never request.body, so a chunk isn't held in memory.
+        uploads.write_chunk(session, offset, request, length, checksum)
+    except uploads.UploadError as exc:
+        response = JsonResponse({"error": str(exc), "offset": session.received}, status=exc.status)
+        response["Upload-Offset"] = session.received
+        return response
+    return _upload_status(session)
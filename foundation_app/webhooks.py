@@ -0,0 +1,129 @@
+# foundation_app/webhooks.py
+"""
+Razorpay webhook inbox.
+
+The endpoint only checks the signature and appends the raw event to
+``PaymentWebhookEvent`` with a single conflict-ignoring INSERT, so Razorpay
+gets its 200 in constant time and redeliveries of the same event are dropped
+by the unique ``event_id``. ``process_pending_events`` (run by
+``manage.py process_payment_webhooks``) applies the inbox to the donation
+ledger in batches, one transaction per batch, in the order events arrived.
+An event whose handler raises stays pending and is retried by later runs,
+``PAYMENT_WEBHOOK_RETRY_DELAY`` seconds later and twice as long after each
+further failure, up to ``PAYMENT_WEBHOOK_MAX_ATTEMPTS`` times.
+"""
+import hashlib
+import hmac
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .donations import capture_donation
+from .models import PaymentWebhookEvent
+
+logger = logging.getLogger(__name__)
+
+
+def webhook_secret():
+    return getattr(settings, 'RAZORPAY_WEBHOOK_SECRET', '')
+
+
+def verify_signature(body, signature, secret):
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature or '')
+
+
+def ingest_event(body, event_id=None):
+    """
+    Store a verified delivery. Returns False if the body isn't a Razorpay event.
+
+    Razorpay sends the event id in the ``X-Razorpay-Event-Id`` header; without
+    it the body digest stands in, which still collapses identical redeliveries.
+    """
+    try:
+        event_type = json.loads(body)['event']
+    except (ValueError, KeyError, TypeError):
+        return False
+    PaymentWebhookEvent.objects.bulk_create(
+        [PaymentWebhookEvent(
+            event_id=event_id or hashlib.sha256(body).hexdigest()[:64],
+            event_type=str(event_type)[:64],
+            payload=body.decode('utf-8', 'replace'),
+        )],
+        ignore_conflicts=True,
+    )
+    return True
+
+
+def _payment_entity(event):
+    return event['payload']['payment']['entity']
+
+
+def _apply_captured(event):
+    payment = _payment_entity(event)
+    capture_donation(payment['order_id'], payment['id'])
+
+
+# Events we act on; anything else Razorpay is configured to send is just marked processed.
+# That includes payment.failed: it ends one attempt, and the donor can retry on the same order.
+EVENT_HANDLERS = {
+    'payment.captured': _apply_captured,
+    'order.paid': _apply_captured,
+}
+
+
+def max_attempts():
+    return getattr(settings, 'PAYMENT_WEBHOOK_MAX_ATTEMPTS', 5)
+
+
+def retry_delay(attempts):
+    """How long to wait before retrying an event that has failed ``attempts`` times."""
+    return timedelta(seconds=getattr(settings, 'PAYMENT_WEBHOOK_RETRY_DELAY', 60) * 2 ** (attempts - 1))
+
+
+def process_pending_events(batch_size=100):
+    """
+    Apply up to ``batch_size`` unprocessed events that are due, oldest first.
+    Returns ``(applied, failed)``. Workers can run side by side on databases
+    with SKIP LOCKED; the ledger updates are idempotent either way.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(
+            PaymentWebhookEvent.objects.filter(processed_at__isnull=True)
+            .filter(Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now))
+            .select_for_update(skip_locked=True)
+            .order_by('id')[:batch_size]
+        )
+        failed = {}
+        for event in events:
+            handler = EVENT_HANDLERS.get(event.event_type)
+            if handler is None:
+                continue
+            try:
+                with transaction.atomic():
+                    handler(json.loads(event.payload))
+            except Exception as exc:
+                # A bad event must not hold up the rest of the inbox; it is retried after a delay.
+                logger.exception("Could not apply webhook event %s", event.event_id)
+                failed[event] = f"{exc.__class__.__name__}: {exc}"
+
+        PaymentWebhookEvent.objects.filter(pk__in=[e.pk for e in events]).exclude(
+            pk__in=[e.pk for e in failed]
+        ).update(processed_at=now, next_attempt_at=None, error='')
+        for event, error in failed.items():
+            attempts = event.attempts + 1
+            given_up = attempts >= max_attempts()
+            if given_up:
+                logger.error("Giving up on webhook event %s after %d attempts", event.event_id, attempts)
+            PaymentWebhookEvent.objects.filter(pk=event.pk).update(
+                attempts=F('attempts') + 1, error=error,
+                processed_at=now if given_up else None,
+                next_attempt_at=None if given_up else now + retry_delay(attempts),
+            )
+    return len(events) - len(failed), len(failed)
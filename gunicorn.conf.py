@@ -0,0 +1,36 @@
+# gunicorn.conf.py
+"""
+gunicorn settings for the Render web service: ``gunicorn -c gunicorn.conf.py``.
+
+The app is loaded and warmed in the master (PCF/startup.py) and frozen out of
+garbage collection before workers are forked, so each worker starts with
+compiled templates and shares the master's memory instead of copying it.
+"""
+import os
+
+wsgi_app = 'PCF.wsgi:application'
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '3'))
+threads = int(os.environ.get('GUNICORN_THREADS', '1'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '30'))
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') != '0'
+# Recycled workers are cheap to replace when they are forked from a warm master.
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '2000'))
+max_requests_jitter = max_requests // 10
+accesslog = '-'
+
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        from PCF import startup
+
+        startup.warm_up()
+        startup.freeze()
+
+
+def post_worker_init(worker):
+    # Without preloading every worker warms itself before taking requests.
+    if not worker.cfg.preload_app:
+        from PCF import startup
+
+        startup.warm_up()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+"""
+Start gunicorn with gunicorn.conf.py and report how long it takes to answer
+its first request, how slow each page is the first and second time, and how
+much memory the master and every worker use (Linux; read from
+/proc/<pid>/smaps_rollup). PSS divides shared pages between the processes
+that share them, so the sum of PSS is what the instance actually pays.
+
+    python scripts/measure_startup.py --workers 3
+    python scripts/measure_startup.py --compare   # preloaded vs. not
+
+Run it from a checkout with a migrated database; it only needs the standard
+library and gunicorn.
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PATHS = ['/', '/news/', '/gallery/', '/projects/', '/media-centre/', '/videos/', '/login/']
+
+
+def fetch(url, timeout=30):
+    started = time.perf_counter()
+    request = urllib.request.Request(url, headers={'Host': 'localhost'})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as exc:
+        status = exc.code
+    return status, (time.perf_counter() - started) * 1000
+
+
+def wait_for_first_response(url, process, deadline):
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"gunicorn exited with status {process.returncode}")
+        try:
+            return fetch(url, timeout=5)
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.02)
+    raise SystemExit(f"No response from {url} in time")
+
+
+def children(pid):
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as fh:
+            return [int(child) for child in fh.read().split()]
+    except FileNotFoundError:
+        return []
+
+
+def memory(pid):
+    """``{'Rss': kB, 'Pss': kB, 'Shared': kB, 'Private': kB}`` for a process."""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as fh:
+        for line in fh:
+            key, _, rest = line.partition(':')
+            if rest.strip().endswith('kB'):
+                values[key] = int(rest.split()[0])
+    return {
+        'Rss': values.get('Rss', 0),
+        'Pss': values.get('Pss', 0),
+        'Shared': values.get('Shared_Clean', 0) + values.get('Shared_Dirty', 0),
+        'Private': values.get('Private_Clean', 0) + values.get('Private_Dirty', 0),
+    }
+
+
+def run(options, preload):
+    env = dict(
+        os.environ,
+        PORT=str(options.port),
+        WEB_CONCURRENCY=str(options.workers),
+        GUNICORN_PRELOAD='1' if preload else '0',
+    )
+    base = f'http://127.0.0.1:{options.port}'
+    label = 'preloaded' if preload else 'not preloaded'
+    print(f"\n== {label}, {options.workers} worker(s) ==")
+
+    started = time.monotonic()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--access-logfile', ''],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        status, _ = wait_for_first_response(base + options.paths[0], process, started + options.timeout)
+        print(f"first response: HTTP {status} after {(time.monotonic() - started) * 1000:.0f} ms")
+
+        print(f"{'path':<20} {'first ms':>9} {'second ms':>10}")
+        for path in options.paths:
+            # Sequential requests land on whichever worker is free, like a visitor's would.
+            _, first = fetch(base + path)
+            _, second = fetch(base + path)
+            print(f"{path:<20} {first:>9.1f} {second:>10.1f}")
+
+        # Let every worker take a few requests so its memory reflects real use.
+        for _ in range(options.workers * 5):
+            for path in options.paths:
+                fetch(base + path)
+
+        print(f"{'process':<12} {'RSS MiB':>8} {'PSS MiB':>8} {'shared':>8} {'private':>8}")
+        total_pss = 0
+        for name, pid in [('master', process.pid)] + [(f'worker {pid}', pid) for pid in children(process.pid)]:
+            try:
+                usage = memory(pid)
+            except FileNotFoundError:
+                continue
+            total_pss += usage['Pss']
+            print(
+                f"{name:<12} {usage['Rss'] / 1024:>8.1f} {usage['Pss'] / 1024:>8.1f} "
+                f"{usage['Shared'] / 1024:>8.1f} {usage['Private'] / 1024:>8.1f}"
+            )
+        print(f"{'total PSS':<12} {'':>8} {total_pss / 1024:>8.1f}")
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--timeout', type=float, default=60, help="Seconds to wait for the first response.")
+    parser.add_argument('--path', dest='paths', action='append', help="Page to time (repeatable).")
+    parser.add_argument('--no-preload', action='store_true', help="Start without preloading the app.")
+    parser.add_argument('--compare', action='store_true', help="Measure with and without preloading.")
+    options = parser.parse_args()
+    options.paths = options.paths or DEFAULT_PATHS
+
+    if not os.path.exists('/proc/self/smaps_rollup'):
+        print("Memory figures need Linux 4.14+; only timings will be accurate.", file=sys.stderr)
+    if options.compare:
+        run(options, preload=True)
+        run(options, preload=False)
+    else:
+        run(options, preload=not options.no_preload)
+
+
+if __name__ == '__main__':
+    main()